@@ -0,0 +1,157 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from cachetools import TTLCache
+
+from embedding_service import normalize_query
+
+
+class MemoryBackend:
+    """Backend cache di memori proses (LRU + TTL). Hilang saat server restart."""
+
+    def __init__(self, max_entries: int = 2048, ttl: float = 86400):
+        self._cache = TTLCache(maxsize=max_entries, ttl=ttl)
+
+    def get(self, key: str) -> str | None:
+        return self._cache.get(key)
+
+    def set(self, key: str, value: str):
+        self._cache[key] = value
+
+
+class SQLiteBackend:
+    """
+    Backend cache di file SQLite lokal. Bertahan saat restart dan bisa dipakai
+    bersama oleh beberapa worker di mesin yang sama.
+    Entri kedaluwarsa setelah `ttl` detik; jika lebih dari `max_entries`,
+    entri yang paling lama tidak dipakai dibuang (LRU).
+    """
+
+    def __init__(self, path: str = "answer_cache.sqlite3", max_entries: int = 20000, ttl: float = 7 * 86400):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS answers_last_access ON answers(last_access)")
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM answers WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM answers WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE answers SET last_access = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answers (key, value, created, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, now, now)
+            )
+            self._conn.execute(
+                "DELETE FROM answers WHERE key IN ("
+                "SELECT key FROM answers ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+
+class AnswerCache:
+    """
+    Cache jawaban RAG di depan run_rag_generation.
+    Kunci = (kasus, referensi ayat yang dipakai sebagai konteks, pertanyaan ternormalisasi),
+    jadi jawaban hanya dipakai ulang jika konteksnya PERSIS sama.
+
+    Jika `similarity_threshold` diisi (dan `embedder` tersedia), pertanyaan yang mirip
+    (cosine >= threshold) dengan konteks yang sama juga dianggap hit.
+    """
+
+    def __init__(self, backend, embedder=None, similarity_threshold: float | None = None,
+                 max_semantic_entries: int = 4096):
+        self.backend = backend
+        self.embedder = embedder
+        self.similarity_threshold = similarity_threshold
+        self.max_semantic_entries = max_semantic_entries
+        # (kasus, refs) -> {key: vektor pertanyaan}, hanya untuk pencocokan semantik
+        self._semantic_entries: OrderedDict[str, dict[str, np.ndarray]] = OrderedDict()
+        self._semantic_count = 0
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _context_key(case: str, refs: list[str]) -> str:
+        return json.dumps([case, list(refs)], ensure_ascii=False)
+
+    @staticmethod
+    def make_key(case: str, refs: list[str], question: str) -> str:
+        raw = json.dumps([case, list(refs), normalize_query(question)], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @property
+    def _semantic_enabled(self) -> bool:
+        return self.embedder is not None and self.similarity_threshold is not None
+
+    async def get(self, case: str, refs: list[str], question: str) -> str | None:
+        key = self.make_key(case, refs, question)
+        answer = self.backend.get(key)
+        if answer is not None:
+            self.hits += 1
+            return answer
+
+        if self._semantic_enabled:
+            candidates = self._semantic_entries.get(self._context_key(case, refs))
+            if candidates:
+                vector = await self.embedder.encode(question)
+                best_key, best_score = max(
+                    ((k, float(np.dot(vector, v))) for k, v in candidates.items()),
+                    key=lambda item: item[1]
+                )
+                if best_score >= self.similarity_threshold:
+                    answer = self.backend.get(best_key)
+                    if answer is not None:
+                        self.hits += 1
+                        self.semantic_hits += 1
+                        return answer
+
+        self.misses += 1
+        return None
+
+    async def set(self, case: str, refs: list[str], question: str, answer: str):
+        key = self.make_key(case, refs, question)
+        self.backend.set(key, answer)
+
+        if self._semantic_enabled:
+            context_key = self._context_key(case, refs)
+            entries = self._semantic_entries.setdefault(context_key, {})
+            self._semantic_entries.move_to_end(context_key)
+            if key not in entries:
+                entries[key] = await self.embedder.encode(question)
+                self._semantic_count += 1
+            # Buang grup konteks yang paling lama tidak dipakai jika sudah terlalu banyak
+            while self._semantic_count > self.max_semantic_entries and len(self._semantic_entries) > 1:
+                _, dropped = self._semantic_entries.popitem(last=False)
+                self._semantic_count -= len(dropped)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
@@ -0,0 +1,154 @@
+import json
+import os
+import sys
+import time
+from collections.abc import Iterable, Iterator
+
+# =====================================================================
+# Normalisasi teks Arab (satu-satunya versi, dipakai main.py & build_index.py)
+# Sinkron dengan normalizeArabicJS di frontend-react/src/utils/arabicText.js,
+# dibuktikan lewat vektor uji di arabic_text_vectors.json.
+#
+# Aturannya sama persis dengan 7 langkah re.sub versi lama:
+#   1. Hapus harakat, dagger alif, tanda anotasi, alif wasl, madda
+#   2. Hapus tatweel
+#   3. أ إ آ -> ا
+#   4. ى -> ي
+#   5. ة -> ه
+#   6. Hapus semua selain huruf Arab (U+0621..U+064A) dan spasi
+#   7. Rapikan spasi berlebih
+# Langkah 1-6 semuanya per karakter, jadi cukup SATU str.translate.
+# Langkah 1 sebenarnya sudah tercakup langkah 6 (kecuali tatweel U+0640).
+# =====================================================================
+
+_LETTER_MAP = {
+    0x0622: 0x0627,  # آ -> ا
+    0x0623: 0x0627,  # أ -> ا
+    0x0625: 0x0627,  # إ -> ا
+    0x0649: 0x064A,  # ى -> ي
+    0x0629: 0x0647,  # ة -> ه
+}
+_TATWEEL = 0x0640
+
+
+class _NormalizationTable(dict):
+    """
+    Tabel str.translate yang diisi sendiri saat karakter baru pertama kali muncul.
+    Nilai None = karakter dihapus. Spasi (str.isspace, sama dengan \\s di re)
+    dibiarkan dulu, nanti dirapikan dengan split/join.
+    """
+
+    def __missing__(self, codepoint: int):
+        if codepoint in _LETTER_MAP:
+            value = _LETTER_MAP[codepoint]
+        elif 0x0621 <= codepoint <= 0x064A and codepoint != _TATWEEL:
+            value = codepoint
+        elif chr(codepoint).isspace():
+            value = codepoint
+        else:
+            value = None
+        self[codepoint] = value
+        return value
+
+
+_TABLE = _NormalizationTable()
+# Isi di depan karakter yang paling sering muncul, supaya tabel langsung "hangat"
+for _codepoint in list(range(0x0600, 0x0700)) + list(range(0x0080)):
+    _TABLE[_codepoint]
+
+
+def normalize_arabic(text: str) -> str:
+    """
+    Fungsi Normalisasi Master.
+    Sinkron dengan normalizeArabicJS di frontend.
+    """
+    if not text:
+        return ""
+    return " ".join(text.translate(_TABLE).split())
+
+
+def normalize_arabic_many(texts: Iterable[str]) -> Iterator[str]:
+    """
+    Versi batch/streaming untuk build: menormalisasi banyak teks satu per satu
+    tanpa membuat list perantara (bisa dipakai langsung di loop atau list()).
+    """
+    table = _TABLE
+    join = " ".join
+    for text in texts:
+        yield join(text.translate(table).split()) if text else ""
+
+
+# =====================================================================
+# Self-check + microbenchmark:
+#   python arabic_text.py
+# Mengecek semua vektor uji di arabic_text_vectors.json, lalu
+# membandingkan kecepatan dengan versi lama (7x re.sub).
+# =====================================================================
+VECTORS_FILENAME = os.path.join(os.path.dirname(os.path.abspath(__file__)), "arabic_text_vectors.json")
+
+
+def load_vectors(path: str = VECTORS_FILENAME) -> list[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["vectors"]
+
+
+def _legacy_normalize_arabic(text: str) -> str:
+    """Versi lama (7x re.sub), hanya untuk pembanding di self-check."""
+    import re
+    text = re.sub(r'[\u064B-\u065F\u0610-\u061A\u0670\u0671\u0653]', '', text)
+    text = re.sub(r'\u0640', '', text)
+    text = re.sub(r'[\u0622\u0623\u0625]', '\u0627', text)
+    text = re.sub(r'\u0649', '\u064A', text)
+    text = re.sub(r'\u0629', '\u0647', text)
+    text = re.sub(r'[^\u0621-\u064A\s]', '', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def _best_time(run, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    failures = 0
+    vectors = load_vectors()
+    for vector in vectors:
+        for result in (normalize_arabic(vector["input"]), _legacy_normalize_arabic(vector["input"])):
+            if result != vector["expected"]:
+                failures += 1
+                print(f"GAGAL [{vector['name']}]: {result!r} != {vector['expected']!r}")
+    if list(normalize_arabic_many(v["input"] for v in vectors)) != [v["expected"] for v in vectors]:
+        failures += 1
+        print("GAGAL: normalize_arabic_many tidak sama dengan normalize_arabic")
+
+    # Semua karakter Unicode satu per satu harus diperlakukan sama dengan versi lama
+    for codepoint in range(sys.maxunicode + 1):
+        if 0xD800 <= codepoint <= 0xDFFF:
+            continue
+        sample = f"ب{chr(codepoint)}ت"
+        if normalize_arabic(sample) != _legacy_normalize_arabic(sample):
+            failures += 1
+            print(f"GAGAL: U+{codepoint:04X} beda dengan versi lama")
+
+    if failures:
+        print(f"{failures} kegagalan.")
+        sys.exit(1)
+    print(f"OK: {len(vectors)} vektor uji + semua karakter Unicode cocok dengan versi lama.")
+
+    # Microbenchmark: korpus kalau ada, kalau tidak pakai vektor uji yang diulang
+    samples = [v["input"] for v in vectors if v["input"]] * 500
+    corpus_path = sys.argv[1] if len(sys.argv) > 1 else "quran_search_index.json"
+    if os.path.exists(corpus_path):
+        with open(corpus_path, "r", encoding="utf-8") as f:
+            samples = [verse["text_arab"] for verse in json.load(f)]
+    for label, run in (
+        ("re.sub x7 (lama)", lambda: [_legacy_normalize_arabic(t) for t in samples]),
+        ("normalize_arabic", lambda: [normalize_arabic(t) for t in samples]),
+        ("normalize_arabic_many", lambda: list(normalize_arabic_many(samples))),
+    ):
+        best = _best_time(run)
+        print(f"{label:<24} {len(samples)} teks: {best * 1000:8.2f} ms ({best / len(samples) * 1e6:.2f} us/teks)")
@@ -0,0 +1,82 @@
+import argparse
+import json
+import sys
+
+# =====================================================================
+# Bandingkan dua hasil bench/run.py (misal sebelum & sesudah perubahan):
+#   python -m bench.compare bench/results/A.json bench/results/B.json --threshold 10
+# Exit code 1 jika ada p95 yang naik lebih dari --threshold persen
+# (atau rasio error naik), supaya bisa dipakai sebagai gerbang di CI.
+# =====================================================================
+
+
+def load_report(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def pct_change(before: float | None, after: float | None) -> float | None:
+    if before is None or after is None or before == 0:
+        return None
+    return (after - before) / before * 100
+
+
+def error_rate(summary: dict) -> float:
+    return summary["errors"] / summary["requests"] if summary["requests"] else 0.0
+
+
+def compare(base: dict, head: dict, threshold: float, metric: str = "p95") -> tuple[list[dict], bool]:
+    rows = []
+    regressed = False
+    for scenario, levels in head["results"].items():
+        for concurrency, after in levels.items():
+            before = base["results"].get(scenario, {}).get(concurrency)
+            if before is None:
+                continue
+            change = pct_change(before["latency_ms"][metric], after["latency_ms"][metric])
+            # Jumlah request bisa beda (mode --duration), jadi yang dibandingkan rasio error-nya
+            row_regressed = (change is not None and change > threshold) or error_rate(after) > error_rate(before)
+            regressed = regressed or row_regressed
+            rows.append({
+                "scenario": scenario,
+                "concurrency": concurrency,
+                "before": before["latency_ms"][metric],
+                "after": after["latency_ms"][metric],
+                "change": change,
+                "rps_before": before["rps"],
+                "rps_after": after["rps"],
+                "error_rate": (error_rate(before), error_rate(after)),
+                "regressed": row_regressed
+            })
+    return rows, regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bandingkan dua hasil benchmark.")
+    parser.add_argument("base", help="Hasil acuan (sebelum)")
+    parser.add_argument("head", help="Hasil baru (sesudah)")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Batas kenaikan latensi (persen)")
+    parser.add_argument("--metric", default="p95", choices=("p50", "p95", "p99", "mean", "max"))
+    args = parser.parse_args(argv)
+
+    base, head = load_report(args.base), load_report(args.head)
+    print(f"Acuan: {base['meta']['git_commit']} ({base['meta']['timestamp']})")
+    print(f"Baru : {head['meta']['git_commit']} ({head['meta']['timestamp']})")
+    rows, regressed = compare(base, head, args.threshold, args.metric)
+    print(f"{'skenario':<15} {'c':>3} {args.metric + ' lama':>10} {args.metric + ' baru':>10} {'ubah':>8} "
+          f"{'rps lama':>9} {'rps baru':>9} error")
+    for row in rows:
+        change = f"{row['change']:+.1f}%" if row["change"] is not None else "-"
+        flag = "  <-- REGRESI" if row["regressed"] else ""
+        print(f"{row['scenario']:<15} {row['concurrency']:>3} {row['before'] or 0:>10.1f} {row['after'] or 0:>10.1f} "
+              f"{change:>8} {row['rps_before'] or 0:>9.1f} {row['rps_after'] or 0:>9.1f} "
+              f"{row['error_rate'][0]:.1%}->{row['error_rate'][1]:.1%}{flag}")
+
+    if regressed:
+        print(f"!!! PERINGATAN: Ada regresi {args.metric} > {args.threshold:.0f}% atau rasio error naik !!!")
+        sys.exit(1)
+    print("OK: tidak ada regresi.")
+
+
+if __name__ == "__main__":
+    main()
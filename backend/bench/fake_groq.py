@@ -0,0 +1,67 @@
+import asyncio
+import random
+from types import SimpleNamespace
+
+# =====================================================================
+# Pengganti AsyncGroq untuk benchmark: bentuk respons sama dengan SDK groq
+# (choices[0].message.content, atau stream chunk choices[0].delta.content),
+# tapi tanpa jaringan dan dengan latensi yang bisa diatur.
+# =====================================================================
+
+DEFAULT_ANSWER = (
+    "Ayat ini mengajarkan bahwa Allah Maha Kuasa atas segala sesuatu, dan manusia diuji "
+    "untuk melihat siapa yang paling baik amalnya. Karena itu kita dianjurkan untuk sabar, "
+    "bersyukur, dan terus memperbaiki diri."
+)
+
+
+class _Completions:
+    def __init__(self, fake: "FakeAsyncGroq"):
+        self._fake = fake
+
+    async def create(self, messages, model, stream: bool = False, **kwargs):
+        fake = self._fake
+        fake.calls += 1
+        fake.prompt_chars += sum(len(message.get("content", "")) for message in messages)
+        await asyncio.sleep(fake.first_token_delay())
+        if stream:
+            return fake.stream_chunks()
+        await asyncio.sleep(fake.generation_time())
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=fake.answer))])
+
+
+class FakeAsyncGroq:
+    """
+    latency_ms        : waktu sampai token pertama (antrian + prefill), +/- jitter_ms
+    tokens_per_second : kecepatan generate; total waktu = latency + jumlah_token / tokens_per_second
+    """
+
+    def __init__(self, latency_ms: float = 300.0, jitter_ms: float = 50.0,
+                 tokens_per_second: float = 250.0, answer: str = DEFAULT_ANSWER):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.tokens_per_second = tokens_per_second
+        self.answer = answer
+        self.calls = 0
+        self.prompt_chars = 0
+        self.chat = SimpleNamespace(completions=_Completions(self))
+
+    def _tokens(self) -> list[str]:
+        # Satu kata ~ satu token, cukup untuk meniru pola streaming
+        words = self.answer.split(" ")
+        return [word if i == 0 else f" {word}" for i, word in enumerate(words)]
+
+    def first_token_delay(self) -> float:
+        return max(0.0, self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+
+    def generation_time(self) -> float:
+        if self.tokens_per_second <= 0:
+            return 0.0
+        return len(self._tokens()) / self.tokens_per_second
+
+    async def stream_chunks(self):
+        per_token = 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        for token in self._tokens():
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token))])
+            if per_token:
+                await asyncio.sleep(per_token)
@@ -0,0 +1,158 @@
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+from bench.run import BACKEND_DIR, load_queries
+from message_router import MANUAL_ALIASES, MessageRouter
+
+# =====================================================================
+# Benchmark tahap routing chatbot (tanpa server): MessageRouter (Aho-Corasick,
+# satu lintasan) vs deteksi lama (regex angka + cek nama surah per kata & per
+# pasangan kata + cek `in` per kata kunci). Sekalian menampilkan pesan yang
+# keputusannya berubah (surah / nomor ayat / niat RAG).
+#
+# Jalankan dari folder backend (butuh quran_surahs.json hasil build_index.py):
+#   python -m bench.routing
+#   python -m bench.routing --repeat 20 --show-diff 30
+# =====================================================================
+
+SURAHS_FILE = os.path.join(BACKEND_DIR, "quran_surahs.json")
+
+TEMPLATES = (
+    "rangkuman surah {name}",
+    "jelaskan {name} ayat {a}-{b}",
+    "tafsir {name} {a}",
+    "apa pelajaran dari surah {name} ayat {a} sampai {b}",
+    "bagaimana hubungan ayat {a} dan {b} dalam {name}?",
+    "tolong tunjukkan qs. {name} {a}",
+    "apa pelajaran tentang manusia dan cahaya dalam surah {name}",  # Arti nama surah lain ikut disebut
+)
+
+
+def load_surahs(path: str) -> list[dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)["surahs"]
+    except FileNotFoundError:
+        print(f"{path} tidak ada (jalankan build_index.py); hanya memakai MANUAL_ALIASES.", file=sys.stderr)
+        return []
+
+
+def build_messages(queries: dict, surahs: list[dict]) -> list[str]:
+    """Pertanyaan chatbot dari queries.json + variasi template untuk semua nama surah."""
+    messages = [text.lower() for text in queries["chatbot"]]
+    names = [surah["name"]["transliteration"]["id"] for surah in surahs] or list(MANUAL_ALIASES)
+    for i, name in enumerate(names):
+        template = TEMPLATES[i % len(TEMPLATES)]
+        a = i % 7 + 1
+        messages.append(template.format(name=name, a=a, b=a + 4).lower())
+    return messages
+
+
+# --- Deteksi lama (sebelum MessageRouter), hanya untuk pembanding ---
+
+def legacy_alias_map(surahs: list[dict]) -> dict[str, int]:
+    name_to_number = {}
+    for surah in surahs:
+        for name in (surah["name"]["transliteration"]["id"].lower(), surah["name"]["short"].lower(),
+                     surah["name"]["translation"]["id"].lower()):
+            if not name:
+                continue
+            name_to_number[name] = surah["number"]
+            name_to_number[name.replace("-", "").replace(" ", "")] = surah["number"]
+            name_to_number[re.sub(r'[^a-z0-9]', '', name)] = surah["number"]
+    for alias, number in MANUAL_ALIASES.items():
+        name_to_number[re.sub(r'[^a-z0-9]', '', alias)] = number
+    return name_to_number
+
+
+def legacy_route(message: str, name_to_number: dict[str, int]) -> tuple[int | None, list[int], bool]:
+    rag_keywords = ["hubungan", "jelaskan", "apa", "kenapa", "mengapa", "ringkasan", "rangkuman", "tentang", "bagaimana", "pelajaran"]
+    is_rag_question = bool(any(word in message for word in rag_keywords) or re.search(r'\d+-\d+', message))
+
+    numbers = set()
+    for match in re.finditer(r'\b(\d+)\b', message):
+        if int(match.group(1)) > 0:
+            numbers.add(int(match.group(1)))
+    for match in re.finditer(r'(\d+)\s*-\s*(\d+)', message):
+        start, end = int(match.group(1)), int(match.group(2))
+        if start < end:
+            numbers.update(range(start, end + 1))
+
+    lookup = lambda name: name_to_number.get(re.sub(r'[^a-z0-9]', '', name.lower()))
+    query = message.lower().replace("surat", "").replace("surah", "").strip()
+    surah = lookup(query)
+    parts = re.split(r'\s+|-', query)
+    for part in parts:
+        if surah:
+            break
+        surah = lookup(part)
+    for i in range(len(parts) - 1):
+        if surah:
+            break
+        surah = lookup(f"{parts[i]}{parts[i + 1]}")
+    return surah, sorted(numbers), is_rag_question
+
+
+def time_per_message(route, messages: list[str], repeat: int) -> list[float]:
+    """Durasi per pesan (detik), median dari `repeat` putaran."""
+    rounds = []
+    for _ in range(repeat):
+        timings = []
+        for message in messages:
+            start = time.perf_counter()
+            route(message)
+            timings.append(time.perf_counter() - start)
+        rounds.append(timings)
+    return np.median(np.array(rounds), axis=0).tolist()
+
+
+def summary_us(timings: list[float]) -> dict:
+    return {
+        "mean": round(float(np.mean(timings)) * 1e6, 2),
+        "p50": round(float(np.percentile(timings, 50)) * 1e6, 2),
+        "p99": round(float(np.percentile(timings, 99)) * 1e6, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark routing chatbot: MessageRouter vs deteksi lama.")
+    parser.add_argument("--surahs", default=SURAHS_FILE, help="quran_surahs.json hasil build_index.py")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--show-diff", type=int, default=20, help="Jumlah contoh pesan yang keputusannya berubah")
+    args = parser.parse_args()
+
+    surahs = load_surahs(args.surahs)
+    messages = build_messages(load_queries(), surahs)
+
+    start = time.perf_counter()
+    router = MessageRouter.from_surahs(surahs)
+    build_ms = (time.perf_counter() - start) * 1000
+    name_to_number = legacy_alias_map(surahs)
+
+    legacy = summary_us(time_per_message(lambda m: legacy_route(m, name_to_number), messages, args.repeat))
+    new = summary_us(time_per_message(router.route, messages, args.repeat))
+    print(f"{len(messages)} pesan, {router.alias_count} alias, automaton dibangun {build_ms:.1f} ms")
+    print(f"{'':<14}{'mean':>10}{'p50':>10}{'p99':>10}  (mikrodetik/pesan)")
+    for label, stats in (("lama", legacy), ("aho-corasick", new)):
+        print(f"{label:<14}{stats['mean']:>10}{stats['p50']:>10}{stats['p99']:>10}")
+
+    diffs = []
+    for message in messages:
+        route = router.route(message)
+        before = legacy_route(message, name_to_number)
+        after = (route.surah, route.numbers, route.is_rag_question)
+        if before != after:
+            diffs.append((message, before, after))
+    print(f"\n{len(diffs)} pesan dengan keputusan berbeda (surah, ayat, rag):")
+    for message, before, after in diffs[:args.show_diff]:
+        print(f"  {message!r}\n    lama: {before}\n    baru: {after}")
+
+
+if __name__ == "__main__":
+    main()
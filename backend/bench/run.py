@@ -0,0 +1,297 @@
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import httpx
+import numpy as np
+
+# =====================================================================
+# Load test endpoint backend dengan kueri realistis (bench/queries.json).
+#
+# Default-nya menjalankan sendiri stub QURAN API + backend (Groq palsu), lalu
+# menembak tiap skenario di beberapa level konkurensi. Hasil disimpan ke
+# bench/results/<waktu>-<commit>.json supaya bisa dibandingkan antar commit
+# dengan bench/compare.py.
+#
+# Jalankan dari folder backend:
+#   python -m bench.run                                   # semua skenario, konkurensi 1,8,32
+#   python -m bench.run --scenarios search,ayah --duration 20
+#   python -m bench.run --base-url http://127.0.0.1:8000  # pakai server yang sudah jalan
+# =====================================================================
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+QUERIES_FILE = os.path.join(BENCH_DIR, "queries.json")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+SCENARIOS = ("search", "search_by_text", "chatbot", "chatbot_stream", "ayah")
+
+
+def load_queries(path: str = QUERIES_FILE) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def build_requests(scenario: str, queries: dict) -> list[dict]:
+    """Daftar request (method, path, params/json) untuk satu skenario, dipakai bergiliran."""
+    if scenario == "search":
+        return [{"method": "GET", "url": "/search", "params": {"q": q}} for q in queries["search"]]
+    if scenario == "search_by_text":
+        return [{"method": "POST", "url": "/search-by-text", "json": {"text": t}} for t in queries["search_by_text"]]
+    if scenario == "chatbot":
+        return [{"method": "POST", "url": "/chatbot", "json": {"text": t}} for t in queries["chatbot"]]
+    if scenario == "chatbot_stream":
+        return [{"method": "POST", "url": "/chatbot/stream", "json": {"text": t}, "stream": True}
+                for t in queries["chatbot"]]
+    if scenario == "ayah":
+        requests = []
+        for ref in queries["ayah"]:
+            surah, ayah = ref.split(":")
+            requests.append({"method": "GET", "url": f"/surah/{surah}/{ayah}"})
+        return requests
+    raise ValueError(f"Skenario tidak dikenal: {scenario}")
+
+
+async def send(http: httpx.AsyncClient, spec: dict) -> tuple[int, float, float | None]:
+    """Kirim satu request. Hasil: (status, latensi total, TTFB untuk stream)."""
+    start = time.perf_counter()
+    if spec.get("stream"):
+        ttfb = None
+        async with http.stream(spec["method"], spec["url"], json=spec.get("json")) as response:
+            async for _ in response.aiter_bytes():
+                if ttfb is None:
+                    ttfb = time.perf_counter() - start
+        return response.status_code, time.perf_counter() - start, ttfb
+    response = await http.request(spec["method"], spec["url"], params=spec.get("params"), json=spec.get("json"))
+    return response.status_code, time.perf_counter() - start, None
+
+
+def percentile_ms(values: list[float], q: float) -> float | None:
+    if not values:
+        return None
+    return round(float(np.percentile(values, q)) * 1000, 2)
+
+
+def summarize(latencies: list[float], ttfbs: list[float], statuses: dict, errors: int, elapsed: float) -> dict:
+    summary = {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "status": {str(code): count for code, count in sorted(statuses.items())},
+        "rps": round(len(latencies) / elapsed, 2) if elapsed > 0 else None,
+        "latency_ms": {
+            "p50": percentile_ms(latencies, 50),
+            "p95": percentile_ms(latencies, 95),
+            "p99": percentile_ms(latencies, 99),
+            "mean": round(float(np.mean(latencies)) * 1000, 2) if latencies else None,
+            "max": round(max(latencies) * 1000, 2) if latencies else None
+        }
+    }
+    if ttfbs:
+        summary["ttfb_ms"] = {"p50": percentile_ms(ttfbs, 50), "p95": percentile_ms(ttfbs, 95),
+                              "p99": percentile_ms(ttfbs, 99)}
+    return summary
+
+
+async def run_scenario(http: httpx.AsyncClient, specs: list[dict], concurrency: int,
+                       duration: float | None, total_requests: int | None, warmup: int) -> dict:
+    """
+    `concurrency` worker berbagi satu antrian request (round-robin dari `specs`).
+    Berhenti setelah `total_requests` request atau setelah `duration` detik.
+    Status non-2xx/3xx dan exception dihitung sebagai error.
+    """
+    for spec in specs[:warmup]:
+        try:
+            await send(http, spec)
+        except httpx.HTTPError:
+            pass
+
+    cycle = itertools.cycle(specs)
+    remaining = [total_requests]
+    latencies, ttfbs = [], []
+    statuses: dict[int, int] = {}
+    errors = 0
+    start = time.perf_counter()
+    deadline = start + duration if duration else None
+
+    def next_spec():
+        if remaining[0] is not None:
+            if remaining[0] <= 0:
+                return None
+            remaining[0] -= 1
+        if deadline is not None and time.perf_counter() >= deadline:
+            return None
+        return next(cycle)
+
+    async def worker():
+        nonlocal errors
+        while (spec := next_spec()) is not None:
+            try:
+                status, latency, ttfb = await send(http, spec)
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            statuses[status] = statuses.get(status, 0) + 1
+            if status >= 400:
+                errors += 1
+                continue
+            latencies.append(latency)
+            if ttfb is not None:
+                ttfbs.append(ttfb)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, ttfbs, statuses, errors, time.perf_counter() - start)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def git_dirty() -> bool:
+    try:
+        output = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=BACKEND_DIR,
+                                capture_output=True, text=True, check=True).stdout
+        return bool(output.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return False
+
+
+def start_process(args: list[str]) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, "-m", *args], cwd=BACKEND_DIR)
+
+
+async def wait_until_ready(base_url: str, timeout: float, process: subprocess.Popen | None = None,
+                           path: str = "/openapi.json"):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url, timeout=2) as http:
+        while time.monotonic() < deadline:
+            if process is not None and process.poll() is not None:
+                raise RuntimeError(f"Proses untuk {base_url} berhenti (exit {process.returncode}).")
+            try:
+                if (await http.get(path)).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.25)
+    raise RuntimeError(f"{base_url} tidak siap setelah {timeout:.0f} detik.")
+
+
+async def run_benchmark(args) -> dict:
+    queries = load_queries(args.queries)
+    processes = []
+    base_url = args.base_url
+    try:
+        if base_url is None:
+            stub_url = f"http://127.0.0.1:{args.stub_port}"
+            stub = start_process(["bench.stub_quran_api", "--port", str(args.stub_port),
+                                  "--latency-ms", str(args.upstream_latency_ms),
+                                  "--jitter-ms", str(args.upstream_jitter_ms)])
+            processes.append(stub)
+            await wait_until_ready(stub_url, 30, stub)
+
+            app_args = ["bench.serve_app", "--port", str(args.app_port), "--quran-api-url", stub_url,
+                        "--groq-latency-ms", str(args.groq_latency_ms),
+                        "--groq-tokens-per-second", str(args.groq_tokens_per_second)]
+            if args.upstream_only:
+                app_args.append("--upstream-only")
+            if args.no_answer_cache:
+                app_args.append("--no-answer-cache")
+            app = start_process(app_args)
+            processes.append(app)
+            base_url = f"http://127.0.0.1:{args.app_port}"
+            # Backend langsung menerima request, tapi data & model dimuat di background.
+            # Tunggu semuanya (full=true) supaya yang terukur bukan masa pemanasan.
+            await wait_until_ready(base_url, args.startup_timeout, app, "/readyz?full=true")
+
+        results = {}
+        limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+        async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as http:
+            for scenario in args.scenarios:
+                specs = build_requests(scenario, queries)
+                results[scenario] = {}
+                for concurrency in args.concurrency:
+                    summary = await run_scenario(http, specs, concurrency, args.duration, args.requests, args.warmup)
+                    results[scenario][str(concurrency)] = summary
+                    latency = summary["latency_ms"]
+                    print(f"{scenario:<15} c={concurrency:<3} {summary['requests']:>6} req  "
+                          f"{summary['rps'] or 0:>8.1f} rps  p50={latency['p50']} p95={latency['p95']} "
+                          f"p99={latency['p99']} ms  error={summary['errors']}")
+        return results
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load test backend Qur'an.")
+    parser.add_argument("--base-url", default=None, help="Pakai server yang sudah jalan (tanpa stub & Groq palsu)")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Pilihan: {','.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", default="1,8,32", help="Daftar level konkurensi, dipisah koma")
+    parser.add_argument("--duration", type=float, default=None, help="Lama tiap run (detik)")
+    parser.add_argument("--requests", type=int, default=None, help="Jumlah request tiap run (default 200)")
+    parser.add_argument("--warmup", type=int, default=5, help="Request pemanasan (tidak diukur) sebelum tiap run")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--queries", default=QUERIES_FILE)
+    parser.add_argument("--output", default=None, help="File hasil (default bench/results/<waktu>-<commit>.json)")
+    parser.add_argument("--app-port", type=int, default=8010)
+    parser.add_argument("--stub-port", type=int, default=8100)
+    parser.add_argument("--startup-timeout", type=float, default=300.0)
+    parser.add_argument("--upstream-latency-ms", type=float, default=50.0)
+    parser.add_argument("--upstream-jitter-ms", type=float, default=10.0)
+    parser.add_argument("--groq-latency-ms", type=float, default=300.0)
+    parser.add_argument("--groq-tokens-per-second", type=float, default=250.0)
+    parser.add_argument("--upstream-only", action="store_true", help="Detail ayat selalu lewat QURAN API (stub)")
+    parser.add_argument("--no-answer-cache", action="store_true", help="Matikan cache jawaban RAG")
+    args = parser.parse_args(argv)
+
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = [s for s in args.scenarios if s not in SCENARIOS]
+    if unknown:
+        parser.error(f"Skenario tidak dikenal: {', '.join(unknown)}")
+    args.concurrency = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    if args.duration is None and args.requests is None:
+        args.requests = 200
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    started_at = datetime.now(timezone.utc)
+    results = asyncio.run(run_benchmark(args))
+
+    commit = git_commit()
+    report = {
+        "meta": {
+            "git_commit": commit,
+            "git_dirty": git_dirty(),
+            "timestamp": started_at.isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": {k: v for k, v in vars(args).items() if k != "queries"}
+        },
+        "results": results
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{started_at:%Y%m%dT%H%M%SZ}-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"INFO:    Hasil disimpan ke {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import argparse
+import os
+import sys
+
+# =====================================================================
+# Menjalankan backend (main.py) untuk benchmark, tanpa jaringan keluar:
+#   - QURAN API diarahkan ke stub lokal (bench/stub_quran_api.py)
+#   - klien Groq diganti FakeAsyncGroq (latensi & kecepatan token bisa diatur)
+# Jalankan dari folder backend:
+#   python -m bench.serve_app --port 8000 --quran-api-url http://127.0.0.1:8100
+# Biasanya tidak perlu dipanggil manual, bench/run.py yang menjalankannya.
+# =====================================================================
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Jalankan backend dengan upstream palsu untuk benchmark.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--quran-api-url", default="http://127.0.0.1:8100")
+    parser.add_argument("--groq-latency-ms", type=float, default=300.0, help="Waktu sampai token pertama")
+    parser.add_argument("--groq-tokens-per-second", type=float, default=250.0)
+    parser.add_argument("--upstream-only", action="store_true",
+                        help="Kosongkan VERSE_STORE supaya detail ayat selalu lewat QURAN API (stub)")
+    parser.add_argument("--no-answer-cache", action="store_true",
+                        help="Matikan cache jawaban RAG supaya setiap request chatbot benar-benar memanggil LLM")
+    args = parser.parse_args()
+
+    # Harus di-set SEBELUM main di-import (URL dibaca saat modul dimuat)
+    os.environ["QURAN_API_BASE_URL"] = args.quran_api_url
+    os.chdir(BACKEND_DIR)  # main.py membuka file data dengan path relatif
+    sys.path.insert(0, BACKEND_DIR)
+
+    import uvicorn
+
+    import main as backend
+    from bench.fake_groq import FakeAsyncGroq
+
+    # Loader subsistem diganti sebelum server start (lifespan yang menjalankannya)
+    def load_fake_groq():
+        backend.client = FakeAsyncGroq(latency_ms=args.groq_latency_ms,
+                                       tokens_per_second=args.groq_tokens_per_second)
+
+    backend.READINESS.register("groq", load_fake_groq, required=False)
+    print(f"INFO:    Groq diganti FakeAsyncGroq ({args.groq_latency_ms:.0f} ms, "
+          f"{args.groq_tokens_per_second:.0f} token/detik).")
+    if args.upstream_only:
+        backend.READINESS.register("verses", lambda: None)
+        print("INFO:    VERSE_STORE tidak dimuat, detail ayat diambil dari QURAN API.")
+    if args.no_answer_cache:
+        backend.ANSWER_CACHE = None
+        print("INFO:    Cache jawaban RAG dimatikan.")
+
+    uvicorn.run(backend.app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
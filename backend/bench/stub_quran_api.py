@@ -0,0 +1,133 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+
+from fastapi import FastAPI, HTTPException
+
+# =====================================================================
+# Stub lokal pengganti quran-api-id.vercel.app untuk benchmark.
+# Jalankan dari folder backend:
+#   python -m bench.stub_quran_api --port 8100 --latency-ms 80
+# lalu arahkan backend ke sini: QURAN_API_BASE_URL=http://127.0.0.1:8100
+#
+# Data diambil dari quran_verse_store.json & quran_surahs.json (hasil build_index.py)
+# jika ada, supaya payload-nya realistis. Jika tidak ada, dibuat data sintetis.
+# =====================================================================
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VERSE_STORE_FILE = os.path.join(BACKEND_DIR, "quran_verse_store.json")
+SURAH_META_FILE = os.path.join(BACKEND_DIR, "quran_surahs.json")
+
+
+def synthetic_data(verses_per_surah: int = 7) -> tuple[list[dict], dict, dict]:
+    """114 surah x `verses_per_surah` ayat, bentuknya sama dengan API asli."""
+    surah_list = []
+    surahs = {}
+    verses = {}
+    for number in range(1, 115):
+        info = {
+            "number": number,
+            "sequence": number,
+            "numberOfVerses": verses_per_surah,
+            "name": {
+                "short": "سورة",
+                "long": "سُورَةُ",
+                "transliteration": {"en": f"Surah-{number}", "id": f"Surah-{number}"},
+                "translation": {"en": f"Surah {number}", "id": f"Surat {number}"}
+            },
+            "revelation": {"arab": "مكة", "en": "Meccan", "id": "Makkiyyah"},
+            "tafsir": {"id": f"Ringkasan surat {number}."}
+        }
+        surah_list.append(info)
+        surahs[number] = {**info, "preBismillah": None}
+        for ayah in range(1, verses_per_surah + 1):
+            verses[f"{number}:{ayah}"] = {
+                "number": {"inQuran": (number - 1) * verses_per_surah + ayah, "inSurah": ayah},
+                "meta": {"juz": min(30, (number + 3) // 4), "page": number, "manzil": 1, "ruku": 1,
+                         "hizbQuarter": 1, "sajda": {"recommended": False, "obligatory": False}},
+                "text": {"arab": "بِسْمِ اللَّهِ الرَّحْمَٰنِ الرَّحِيمِ", "transliteration": {"en": "bismillah"}},
+                "translation": {"en": "In the name of Allah", "id": f"Terjemahan {number}:{ayah}"},
+                "audio": {"primary": "", "secondary": []},
+                "tafsir": {"id": {"short": "Tafsir pendek.", "long": f"Tafsir panjang {number}:{ayah}. " * 20}}
+            }
+    return surah_list, surahs, verses
+
+
+def load_data() -> tuple[list[dict], dict, dict]:
+    try:
+        with open(VERSE_STORE_FILE, "r", encoding="utf-8") as f:
+            store = json.load(f)
+        surahs = {int(number): info for number, info in store["surahs"].items()}
+        verses = store["verses"]
+        try:
+            with open(SURAH_META_FILE, "r", encoding="utf-8") as f:
+                surah_list = json.load(f)["surahs"]
+        except (OSError, ValueError, KeyError):
+            surah_list = [{k: v for k, v in surahs[n].items() if k != "preBismillah"} for n in sorted(surahs)]
+        print(f"INFO:    Stub memakai data asli ({len(verses)} ayat).")
+        return surah_list, surahs, verses
+    except (OSError, ValueError, KeyError):
+        print("INFO:    quran_verse_store.json tidak ada, stub memakai data sintetis.")
+        return synthetic_data()
+
+
+def create_app(latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0) -> FastAPI:
+    """
+    App stub dengan latensi buatan (latency_ms +/- jitter_ms) dan,
+    opsional, sebagian request dibuat gagal 503 untuk menguji jalur error.
+    """
+    surah_list, surahs, verses = load_data()
+    app = FastAPI()
+
+    async def simulate_network():
+        delay = latency_ms + random.uniform(-jitter_ms, jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if error_rate and random.random() < error_rate:
+            raise HTTPException(status_code=503, detail="Stub: error buatan.")
+
+    @app.get("/surah")
+    async def get_surah_list():
+        await simulate_network()
+        return {"code": 200, "status": "OK.", "message": "Success fetching all surah.", "data": surah_list}
+
+    @app.get("/surah/{surah_number}")
+    async def get_surah(surah_number: int):
+        await simulate_network()
+        if surah_number not in surahs:
+            raise HTTPException(status_code=404, detail="Surah is not found.")
+        surah_verses = []
+        ayah = 1
+        while f"{surah_number}:{ayah}" in verses:
+            surah_verses.append(verses[f"{surah_number}:{ayah}"])
+            ayah += 1
+        return {"code": 200, "status": "OK.", "message": "Success fetching surah.",
+                "data": {**surahs[surah_number], "verses": surah_verses}}
+
+    @app.get("/surah/{surah_number}/{ayah_number}")
+    async def get_ayah(surah_number: int, ayah_number: int):
+        await simulate_network()
+        verse = verses.get(f"{surah_number}:{ayah_number}")
+        if verse is None:
+            raise HTTPException(status_code=404, detail="Verse is not found.")
+        return {"code": 200, "status": "OK.", "message": "Success fetching ayah.",
+                "data": {**verse, "surah": surahs[surah_number]}}
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Stub lokal API Qur'an untuk benchmark.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Latensi buatan per request")
+    parser.add_argument("--jitter-ms", type=float, default=10.0, help="Variasi latensi (+/-)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Porsi request yang dibuat gagal 503 (0-1)")
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(args.latency_ms, args.jitter_ms, args.error_rate),
+                host=args.host, port=args.port, log_level="warning")
@@ -3,130 +3,369 @@ import json
 import pyarabic.araby as araby
 import time
 import sys
-import re  # <--- INI PENTING WOK
+import os
+import random
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from corpus_store import write_corpus
+from arabic_text import normalize_arabic_many
 
 # URL dasar dari API eksternal
 QURAN_API_BASE_URL = "https://quran-api-id.vercel.app"
 
 # Nama file output kita
 OUTPUT_FILENAME = "quran_search_index.json"
+# File payload ayat lengkap (audio, tafsir pendek/panjang, meta juz/halaman)
+# untuk melayani /surah/{s}/{a} tanpa memanggil API eksternal
+VERSE_STORE_FILENAME = "quran_verse_store.json"
+# Korpus biner (mmap) yang dimuat main.py saat startup, isinya sama dengan OUTPUT_FILENAME
+CORPUS_FILENAME = "quran_corpus.bin"
+# Snapshot daftar 114 surah (format sama dengan API /surah), dimuat main.py
+# saat startup supaya tidak perlu memanggil API dan dilayani di /surahs
+SURAH_META_FILENAME = "quran_surahs.json"
+SURAH_META_SCHEMA_VERSION = 1
+# Folder checkpoint: satu file per surah (payload API + hash + ETag),
+# supaya build yang terputus bisa dilanjutkan tanpa mengunduh ulang
+CHECKPOINT_DIR = "build_checkpoints"
+TOTAL_SURAHS = 114
 
-def normalize_arabic(text: str) -> str:
+# Status HTTP yang layak dicoba ulang (server sibuk / sementara error)
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+def content_hash(*chunks: bytes) -> str:
+    digest = hashlib.sha256()
+    for chunk in chunks:
+        digest.update(chunk)
+    return digest.hexdigest()
+
+def payload_hash(data) -> str:
+    """Hash isi payload API (urutan key tidak berpengaruh)."""
+    return content_hash(json.dumps(data, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+
+def stage_bytes(path: str, data: bytes) -> str:
+    """Tulis ke file sementara (path + ".tmp") lalu fsync; file asli belum disentuh."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    return tmp_path
+
+def commit_staged(paths: list[str]):
+    """Rename semua file sementara ke tujuannya, sesuai urutan `paths`."""
+    for path in paths:
+        os.replace(f"{path}.tmp", path)
+
+def discard_staged(paths: list[str]):
+    for path in paths:
+        try:
+            os.remove(f"{path}.tmp")
+        except FileNotFoundError:
+            pass
+
+def write_bytes_atomic(path: str, data: bytes):
+    """
+    Tulis ke file sementara dulu, fsync, lalu rename.
+    File lama baru tergantikan jika file baru sudah utuh di disk.
+    """
+    stage_bytes(path, data)
+    commit_staged([path])
+
+def write_json_atomic(path: str, data, **dump_kwargs):
+    write_bytes_atomic(path, json.dumps(data, ensure_ascii=False, **dump_kwargs).encode("utf-8"))
+
+
+class RateLimiter:
+    """Membatasi jumlah request per detik, dipakai bersama oleh semua thread."""
+
+    def __init__(self, requests_per_second: float):
+        self.interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class QuranApiFetcher:
+    """
+    GET ke API Qur'an dengan rate limit, retry + exponential backoff (dengan jitter),
+    dan conditional request (If-None-Match) jika ETag lama diketahui.
+    Satu requests.Session per thread (Session tidak aman dipakai bersama).
+    """
+
+    def __init__(self, base_url: str, rate_limit: float = 10.0, retries: int = 5,
+                 backoff: float = 0.5, timeout: float = 30.0):
+        self.base_url = base_url
+        self.limiter = RateLimiter(rate_limit)
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _sleep_before_retry(self, attempt: int, retry_after: str | None = None):
+        delay = self.backoff * (2 ** attempt) * (1 + random.random())
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+        time.sleep(delay)
+
+    def get(self, path: str, etag: str | None = None) -> tuple[int, dict | None, str | None]:
+        """
+        Mengembalikan (status, json, etag). status 304 = tidak berubah sejak `etag`.
+        Melempar requests.RequestException jika semua percobaan gagal.
+        """
+        headers = {"If-None-Match": etag} if etag else {}
+        for attempt in range(self.retries + 1):
+            self.limiter.wait()
+            try:
+                response = self._session().get(f"{self.base_url}{path}", headers=headers, timeout=self.timeout)
+                if response.status_code == 304:
+                    return 304, None, etag
+                if response.status_code in RETRYABLE_STATUS and attempt < self.retries:
+                    self._sleep_before_retry(attempt, response.headers.get("Retry-After"))
+                    continue
+                response.raise_for_status()  # Error jika status code bukan 2xx
+                return response.status_code, response.json(), response.headers.get("ETag")
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt >= self.retries:
+                    raise
+                self._sleep_before_retry(attempt)
+        raise requests.exceptions.RetryError(f"Gagal mengambil {path} setelah {self.retries + 1} percobaan")
+
+
+def checkpoint_path(checkpoint_dir: str, surah_number: int) -> str:
+    return os.path.join(checkpoint_dir, f"surah_{surah_number:03d}.json")
+
+def load_checkpoint(checkpoint_dir: str, surah_number: int) -> dict | None:
+    """Checkpoint yang rusak/tidak lengkap dianggap tidak ada (surah diunduh ulang)."""
+    try:
+        with open(checkpoint_path(checkpoint_dir, surah_number), "r", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        if checkpoint.get("surah") != surah_number or payload_hash(checkpoint["data"]) != checkpoint.get("content_hash"):
+            return None
+        return checkpoint
+    except (OSError, ValueError, KeyError):
+        return None
+
+def sync_surah(fetcher: QuranApiFetcher, checkpoint_dir: str, surah_number: int, refresh: bool) -> tuple[str, dict]:
+    """
+    Memastikan checkpoint surah ada dan terbaru. Mengembalikan (status, checkpoint):
+    - "cache"       : checkpoint lama dipakai tanpa request (mode lanjut/resume)
+    - "tidak berubah": dicek ke API (--refresh), isinya sama -> tidak ditulis ulang
+    - "baru"/"berubah": diunduh dan checkpoint ditulis
+    """
+    checkpoint = load_checkpoint(checkpoint_dir, surah_number)
+    if checkpoint is not None and not refresh:
+        return "cache", checkpoint
+
+    status, body, etag = fetcher.get(f"/surah/{surah_number}", etag=checkpoint.get("etag") if checkpoint else None)
+    if status == 304:
+        return "tidak berubah", checkpoint
+
+    data = (body or {}).get("data", {})
+    if not data.get("verses"):
+        raise ValueError(f"Tidak ada data ayat ditemukan untuk Surah {surah_number}.")
+
+    new_hash = payload_hash(data)
+    if checkpoint is not None and checkpoint["content_hash"] == new_hash:
+        return "tidak berubah", checkpoint
+
+    new_checkpoint = {
+        "surah": surah_number,
+        "content_hash": new_hash,
+        "etag": etag,
+        "fetched_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "data": data
+    }
+    write_json_atomic(checkpoint_path(checkpoint_dir, surah_number), new_checkpoint)
+    return ("berubah" if checkpoint is not None else "baru"), new_checkpoint
+
+def fetch_surah_list(fetcher: QuranApiFetcher, fallback_surahs: dict) -> list[dict]:
     """
-    Fungsi Normalisasi Master BARU.
-    Sinkron dengan normalizeArabicJS di frontend.
+    Daftar surah dari API /surah. Jika gagal, dibentuk dari info surah
+    yang sudah diunduh (tanpa preBismillah, supaya formatnya sama).
     """
     try:
-        # 1. Hapus Harakat, Dagger Alif, Annotations, Alif Wasl, Madda
-        text = re.sub(r'[\u064B-\u065F\u0610-\u061A\u0670\u0671\u0653]', '', text)
-        
-        # 2. Hapus Tatweel
-        text = re.sub(r'\u0640', '', text)
-        
-        # 3. Normalisasi Alif (أ, إ, آ -> ا)
-        text = re.sub(r'[\u0622\u0623\u0625]', '\u0627', text)
-        
-        # 4. Normalisasi Ya (ى -> ي)
-        text = re.sub(r'\u0649', '\u064A', text)
-        
-        # 5. Normalisasi Ta Marbuta (ة -> ه)
-        text = re.sub(r'\u0629', '\u0647', text)
-
-        # 6. Hapus semua sisa non-huruf Arab dan non-spasi
-        text = re.sub(r'[^\u0621-\u064A\s]', '', text)
-        
-        # 7. Hapus spasi berlebih
-        text = re.sub(r'\s+', ' ', text).strip()
-        
-        return text
-    except Exception as e:
-        print(f"Error normalisasi teks: {e}")
-        return text
-
-def build_index():
+        _, body, _ = fetcher.get("/surah")
+        surahs = (body or {}).get("data", [])
+        if len(surahs) == TOTAL_SURAHS:
+            return surahs
+        print(f" PERINGATAN: API /surah hanya mengembalikan {len(surahs)} surah, memakai data per surah.")
+    except requests.exceptions.RequestException as e:
+        print(f" PERINGATAN: Gagal mengambil daftar surah ({e}), memakai data per surah.")
+    return [
+        {k: v for k, v in fallback_surahs[number].items() if k != "preBismillah"}
+        for number in sorted(fallback_surahs, key=int)
+    ]
+
+def build_index(workers: int = 8, rate_limit: float = 10.0, retries: int = 5, backoff: float = 0.5,
+                timeout: float = 30.0, checkpoint_dir: str = CHECKPOINT_DIR, refresh: bool = False):
     """
-    Fungsi utama untuk men-download semua data surah,
+    Fungsi utama untuk men-download semua data surah (paralel, dengan checkpoint),
     menormalisasinya, dan menyimpannya ke file JSON lokal.
     """
     print("Memulai proses pembuatan indeks pencarian Al-Qur'an...")
-    print(f"Data akan disimpan di: {OUTPUT_FILENAME}\n")
-    
+    print(f"Data akan disimpan di: {OUTPUT_FILENAME}")
+    print(f"Checkpoint per surah : {checkpoint_dir}/ ({'cek ulang ke API' if refresh else 'lanjutkan dari checkpoint'})\n")
+    os.makedirs(checkpoint_dir, exist_ok=True)
+
+    fetcher = QuranApiFetcher(QURAN_API_BASE_URL, rate_limit=rate_limit, retries=retries, backoff=backoff, timeout=timeout)
+
+    # 1. Ambil/cek semua surah secara paralel; error satu surah tidak menghentikan yang lain
+    checkpoints = {}
+    status_counts = {}
+    failures = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fetch-surah") as executor:
+        futures = {
+            executor.submit(sync_surah, fetcher, checkpoint_dir, surah_number, refresh): surah_number
+            for surah_number in range(1, TOTAL_SURAHS + 1)
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            surah_number = futures[future]
+            try:
+                status, checkpoint = future.result()
+                checkpoints[surah_number] = checkpoint
+                status_counts[status] = status_counts.get(status, 0) + 1
+                print(f"[{done:3d}/{TOTAL_SURAHS}] Surah {surah_number}: {status} ({len(checkpoint['data']['verses'])} ayat)")
+            except Exception as e:
+                failures[surah_number] = e
+                print(f"[{done:3d}/{TOTAL_SURAHS}] Surah {surah_number}: GAGAL! {e}")
+
+    print("\nRingkasan: " + ", ".join(f"{count} {status}" for status, count in sorted(status_counts.items())))
+    if failures:
+        # File output lama TIDAK disentuh. Checkpoint yang berhasil tetap tersimpan,
+        # jadi menjalankan ulang script hanya mengunduh surah yang gagal.
+        print(f"GAGAL mengambil {len(failures)} surah: {sorted(failures)}")
+        print("File output tidak diubah. Jalankan ulang script untuk melanjutkan.")
+        sys.exit(1)
+
     # Ini adalah list yang akan menyimpan semua 6236 ayat
     search_index = []
-    
-    # Loop untuk 114 surah
-    for surah_number in range(1, 115):
-        api_url = f"{QURAN_API_BASE_URL}/surah/{surah_number}"
-        
-        print(f"Mengambil data Surah {surah_number}/114...", end="")
-        
-        try:
-            # 1. Mengambil data dari API
-            response = requests.get(api_url)
-            response.raise_for_status()  # Error jika status code bukan 2xx
-            
-            data = response.json().get("data", {})
-            verses = data.get("verses", [])
-            
-            if not verses:
-                print(f" GAGAL! Tidak ada data ayat ditemukan untuk Surah {surah_number}.")
-                continue
-
-            # 2. Memproses setiap ayat dalam surah
-            for verse in verses:
-                try:
-                    ayah_number = verse["number"]["inSurah"]
-                    arabic_text_original = verse["text"]["arab"]
-
-                    translation_text = verse["translation"]["id"]
-                    tafsir_text = verse["tafsir"]["id"]["long"] # Ambil tafsir Kemenag
-                    
-                    # Normalisasi teks Arab
-                    normalized_text = normalize_arabic(arabic_text_original)
-                    
-                    # 3. Menyimpan data yang kita butuhkan saja
-                    search_index.append({
-                        "surah": surah_number,
-                        "ayah": ayah_number,
-                        "text_normalized": normalized_text, # <-- Teks bersih untuk dicari
-                        "text_arab": arabic_text_original, # <-- Teks asli untuk ditampilkan
-                        "translation": translation_text, # <-- FIELD BARU
-                        "tafsir": tafsir_text       # <-- FIELD BARU
-                    })
-                except KeyError as e:
-                # Ini untuk menangani jika ada ayat yang tidak punya tafsir/terjemahan
-                    print(f"\nError parsing data (KeyError): {e} di Surah {surah_number}, Ayat {verse.get('number', {}).get('inSurah', '?')}")
-                except Exception as e:
-                    print(f"\nError tidak diketahui saat memproses ayat: {e}")
-
-            print(f" SELESAI ({len(verses)} ayat diproses)")
-            
-            # 4. Beri jeda agar tidak membebani API
-            time.sleep(0.1) # Jeda 0.1 detik antar surah
-
-        except requests.exceptions.RequestException as e:
-            print(f" GAGAL! Error mengambil data Surah {surah_number}: {e}")
-            print("Proses dihentikan.")
-            sys.exit(1) # Keluar dari script jika ada error API
-            
-    # 5. Menyimpan hasil akhir ke file JSON
+
+    # Ini menyimpan payload ASLI dari API (format sama dengan /surah/{s}/{a})
+    verse_store = {"surahs": {}, "verses": {}}
+
+    # 2. Memproses setiap surah sesuai urutan mushaf
+    for surah_number in range(1, TOTAL_SURAHS + 1):
+        data = checkpoints[surah_number]["data"]
+        verses = data["verses"]
+
+        # Simpan info surah (tanpa daftar ayat) untuk dilampirkan di tiap ayat
+        verse_store["surahs"][str(surah_number)] = {k: v for k, v in data.items() if k != "verses"}
+
+        for verse in verses:
+            try:
+                ayah_number = verse["number"]["inSurah"]
+                arabic_text_original = verse["text"]["arab"]
+
+                translation_text = verse["translation"]["id"]
+                tafsir_text = verse["tafsir"]["id"]["long"] # Ambil tafsir Kemenag
+
+                # 3. Menyimpan data yang kita butuhkan saja
+                search_index.append({
+                    "surah": surah_number,
+                    "ayah": ayah_number,
+                    "text_normalized": "", # <-- Teks bersih untuk dicari (diisi batch di bawah)
+                    "text_arab": arabic_text_original, # <-- Teks asli untuk ditampilkan
+                    "translation": translation_text, # <-- FIELD BARU
+                    "tafsir": tafsir_text       # <-- FIELD BARU
+                })
+
+                # Simpan payload lengkap ayat apa adanya
+                verse_store["verses"][f"{surah_number}:{ayah_number}"] = verse
+            except KeyError as e:
+            # Ini untuk menangani jika ada ayat yang tidak punya tafsir/terjemahan
+                print(f"Error parsing data (KeyError): {e} di Surah {surah_number}, Ayat {verse.get('number', {}).get('inSurah', '?')}")
+            except Exception as e:
+                print(f"Error tidak diketahui saat memproses ayat: {e}")
+
+    # Normalisasi teks Arab semua ayat sekaligus (satu tabel translate, tanpa regex)
+    for entry, normalized_text in zip(search_index, normalize_arabic_many(entry["text_arab"] for entry in search_index)):
+        entry["text_normalized"] = normalized_text
+
+    # Daftar surah diambil SEBELUM menulis apa pun: request jaringan terakhir tidak
+    # boleh terjadi di antara penulisan file data dan snapshot versinya
+    surahs = fetch_surah_list(fetcher, verse_store["surahs"])
+
+    # 4. Menyimpan hasil akhir. Semua file ditulis ke .tmp dulu, baru di-rename
+    # bersama setelah semuanya utuh di disk; snapshot surah (berisi data_version
+    # untuk ETag) di-rename paling akhir, supaya versi tidak pernah mendahului datanya.
     print(f"\nTotal {len(search_index)} ayat telah diproses.")
     print(f"Menyimpan indeks ke {OUTPUT_FILENAME}...")
-    
+
+    outputs = [OUTPUT_FILENAME, CORPUS_FILENAME, VERSE_STORE_FILENAME, SURAH_META_FILENAME]
     try:
-        with open(OUTPUT_FILENAME, 'w', encoding='utf-8') as f:
-            # ensure_ascii=False sangat penting untuk menyimpan teks Arab
-            json.dump(search_index, f, ensure_ascii=False, indent=2)
-        
+        # ensure_ascii=False sangat penting untuk menyimpan teks Arab
+        search_index_bytes = json.dumps(search_index, ensure_ascii=False, indent=2).encode("utf-8")
+        verse_store_bytes = json.dumps(verse_store, ensure_ascii=False).encode("utf-8")
+
+        stage_bytes(OUTPUT_FILENAME, search_index_bytes)
+
+        print(f"Menyimpan korpus biner ke {CORPUS_FILENAME}...")
+        write_corpus(CORPUS_FILENAME, search_index, commit=False)
+
+        print(f"Menyimpan payload ayat lengkap ke {VERSE_STORE_FILENAME}...")
+        stage_bytes(VERSE_STORE_FILENAME, verse_store_bytes)
+
+        # Snapshot metadata surah + versi data (dipakai main.py untuk ETag)
+        print(f"Menyimpan snapshot daftar surah ke {SURAH_META_FILENAME}...")
+        stage_bytes(SURAH_META_FILENAME, json.dumps({
+            "schema_version": SURAH_META_SCHEMA_VERSION,
+            "version": payload_hash(surahs),
+            "data_version": content_hash(search_index_bytes, verse_store_bytes),
+            "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "source": f"{QURAN_API_BASE_URL}/surah",
+            "surahs": surahs
+        }, ensure_ascii=False).encode("utf-8"))
+
+        commit_staged(outputs)
+
         print("\n=============================================")
         print("🎉 SUKSES! File indeks pencarian telah dibuat.")
         print("=============================================")
-        
+
     except IOError as e:
+        # File sementara yang belum sempat di-rename dibuang
+        discard_staged(outputs)
         print(f" GAGAL menyimpan file: {e}")
         sys.exit(1)
 
 # Ini memastikan fungsi build_index() hanya berjalan
 # saat kita menjalankan file ini secara langsung
 if __name__ == "__main__":
-    build_index()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Membangun indeks pencarian & korpus Al-Qur'an dari API.")
+    parser.add_argument("--workers", type=int, default=8, help="Jumlah request paralel")
+    parser.add_argument("--rate-limit", type=float, default=10.0, help="Maksimal request per detik (0 = tanpa batas)")
+    parser.add_argument("--retries", type=int, default=5, help="Jumlah percobaan ulang per request")
+    parser.add_argument("--backoff", type=float, default=0.5, help="Jeda awal (detik) sebelum percobaan ulang, naik 2x tiap percobaan")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Timeout per request (detik)")
+    parser.add_argument("--checkpoint-dir", default=CHECKPOINT_DIR, help="Folder checkpoint per surah")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Cek ulang semua surah ke API (surah yang isinya tidak berubah tidak ditulis ulang)")
+    args = parser.parse_args()
+
+    build_index(
+        workers=args.workers,
+        rate_limit=args.rate_limit,
+        retries=args.retries,
+        backoff=args.backoff,
+        timeout=args.timeout,
+        checkpoint_dir=args.checkpoint_dir,
+        refresh=args.refresh
+    )
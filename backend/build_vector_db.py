@@ -1,26 +1,218 @@
+import hashlib
 import json
 import numpy as np
 import faiss
-from sentence_transformers import SentenceTransformer
 import time
+import os
+from embedding_cache import EmbeddingCache, content_key
+from encoder_backend import ENCODER_BACKENDS, QUANTIZATION_CONFIGS, backend_label, detect_quantization, load_sentence_encoder
+import argparse
 
 # Nama file sumber dan file output
 SOURCE_INDEX = "quran_search_index.json"
 OUTPUT_INDEX_FILE = "quran_faiss.index"
 OUTPUT_MAP_FILE = "verse_references.json"
+# Metadata indeks (model, dimensi, metrik, normalisasi) yang divalidasi main.py saat load
+OUTPUT_META_FILE = "quran_faiss.meta.json"
+# Tetangga terdekat tiap ayat ("ayat terkait"), dihitung sekali saat build.
+# Baris ke-i = ayat verse_references[i]; isinya nomor baris ayat lain (int32) & skor cosine (float16)
+OUTPUT_RELATED_IDS_FILE = "verse_related_ids.npy"
+OUTPUT_RELATED_SCORES_FILE = "verse_related_scores.npy"
+
+# Jenis indeks yang bisa dipilih saat build (semua memakai inner product di atas vektor ternormalisasi = cosine)
+# - flat-ip : brute force, hasil eksak (default)
+# - hnsw    : graf HNSW, pencarian sangat cepat, ukuran sedikit lebih besar
+# - ivf-pq  : IVF + Product Quantization, indeks paling kecil
+# - ivf-sq8 : IVF + Scalar Quantization 8-bit, ~4x lebih kecil dari flat
+INDEX_TYPES = ("flat-ip", "hnsw", "ivf-pq", "ivf-sq8")
 
 # Kita akan menggunakan model 'MiniLM' multilingual. 
 # Model ini cepat, kecil, dan bagus dalam memahami makna lintas bahasa.
 MODEL_NAME = 'paraphrase-multilingual-MiniLM-L12-v2'
 
-def build_vector_database():
+# Cache embedding per teks (content hash + nama model), supaya rebuild hanya
+# meng-encode ayat yang baru/berubah
+EMBEDDING_CACHE_DIR = "embedding_cache"
+# Di bawah jumlah teks ini, biaya menyalakan proses worker lebih mahal daripada encode-nya
+MIN_TEXTS_FOR_POOL = 512
+
+def encode_texts(model, texts: list[str], batch_size: int = 32, processes: int = 1) -> np.ndarray:
+    """
+    Encode teks jadi vektor ternormalisasi (float32).
+    Jika processes > 1 dan teksnya cukup banyak, kerja CPU dibagi ke beberapa proses
+    lewat multi-process pool milik sentence-transformers.
+    """
+    if processes > 1 and len(texts) >= MIN_TEXTS_FOR_POOL:
+        print(f"Menyalakan {processes} proses encoder...")
+        pool = model.start_multi_process_pool(target_devices=["cpu"] * processes)
+        try:
+            # chunk kecil = pembagian kerja antar proses lebih rata
+            chunk_size = max(batch_size, len(texts) // (processes * 4))
+            embeddings = model.encode(texts, pool=pool, batch_size=batch_size, chunk_size=chunk_size,
+                                      normalize_embeddings=True, show_progress_bar=True)
+        finally:
+            model.stop_multi_process_pool(pool)
+    else:
+        # normalize_embeddings=True -> inner product = cosine similarity (sama dengan kueri di main.py)
+        embeddings = model.encode(texts, batch_size=batch_size, normalize_embeddings=True, show_progress_bar=True)
+    return np.ascontiguousarray(embeddings, dtype='float32')
+
+def verse_embedding_text(verse: dict) -> str:
+    # Kita gabungkan teks terjemahan dan tafsir untuk 'makna' yang lebih kaya
+    return f"Terjemahan: {verse['translation']} Tafsir: {verse['tafsir']}"
+
+def model_loader(encoder_backend: str = "torch", quantization: str | None = None):
+    """
+    Fungsi pemuat model untuk embed_with_cache. Backend ONNX di sini TIDAK jatuh ke PyTorch
+    diam-diam: vektornya disimpan di cache & metadata dengan label backend yang diminta.
+    """
+    def load_model():
+        print(f"Memuat model AI ({backend_label(encoder_backend, quantization)}, mungkin butuh beberapa saat saat pertama kali)...")
+        model, _ = load_sentence_encoder(MODEL_NAME, encoder_backend, quantization, fallback=False)
+        print("Model berhasil dimuat.")
+        return model
+    return load_model
+
+def embed_with_cache(load_model, texts: list[str], cache: EmbeddingCache | None,
+                     batch_size: int = 32, processes: int = 1) -> np.ndarray:
+    """
+    Vektor untuk semua teks, urutan sama dengan `texts`.
+    Teks yang sudah ada di cache diambil dari file mmap; hanya sisanya yang di-encode.
+    Model baru dimuat (load_model()) jika memang ada teks yang perlu di-encode.
+    """
+    keys = [content_key(text) for text in texts]
+    rows = cache.lookup(keys) if cache is not None else np.full(len(texts), -1, dtype=np.int64)
+    missing = np.flatnonzero(rows < 0)
+    print(f"{len(texts) - len(missing)} teks diambil dari cache, {len(missing)} teks perlu di-encode.")
+
+    new_embeddings = None
+    if len(missing):
+        start_time = time.time()
+        new_embeddings = encode_texts(load_model(), [texts[i] for i in missing], batch_size, processes)
+        print(f"Proses encoding selesai dalam {time.time() - start_time:.2f} detik.")
+
+    dim = new_embeddings.shape[1] if new_embeddings is not None else cache.vectors.shape[1]
+    embeddings = np.empty((len(texts), dim), dtype='float32')
+    hits = np.flatnonzero(rows >= 0)
+    if len(hits):
+        embeddings[hits] = cache.vectors[rows[hits]]
+    if new_embeddings is not None:
+        embeddings[missing] = new_embeddings
+
+    # Simpan ulang cache hanya jika isinya berubah (ada teks baru, atau ada teks yang sudah tidak dipakai)
+    if cache is not None and (len(missing) or len(cache) != len(set(keys))):
+        cache.save(keys, embeddings)
+        print(f"Cache embedding diperbarui: {cache.meta_path}")
+    return embeddings
+
+def build_faiss_index(embeddings: np.ndarray, index_type: str, nlist: int = 64, hnsw_m: int = 32,
+                      pq_m: int = 48, pq_nbits: int = 6, nprobe: int = 16, ef_search: int = 64):
+    """
+    Membuat indeks FAISS sesuai jenis yang dipilih.
+    Mengembalikan (indeks, parameter_pencarian) -- parameter pencarian ikut disimpan
+    di metadata supaya main.py memakai nilai yang sama saat query.
+    """
+    d = embeddings.shape[1]
+    metric = faiss.METRIC_INNER_PRODUCT
+
+    if index_type == "flat-ip":
+        index = faiss.IndexFlatIP(d)
+        search_params = {}
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(d, hnsw_m, metric)
+        index.hnsw.efConstruction = 200
+        search_params = {"efSearch": ef_search}
+    elif index_type in ("ivf-pq", "ivf-sq8"):
+        quantizer = faiss.IndexFlatIP(d)
+        if index_type == "ivf-pq":
+            # pq_nbits=6 (64 centroid per sub-kuantizer): 6236 ayat cukup untuk melatihnya,
+            # 8 bit butuh ~10 ribu vektor latih
+            index = faiss.IndexIVFPQ(quantizer, d, nlist, pq_m, pq_nbits, metric)
+        else:
+            index = faiss.IndexIVFScalarQuantizer(quantizer, d, nlist, faiss.ScalarQuantizer.QT_8bit, metric)
+        print(f"Melatih indeks {index_type} (nlist={nlist})...")
+        index.train(embeddings)
+        search_params = {"nprobe": nprobe}
+    else:
+        raise ValueError(f"Jenis indeks tidak dikenal: {index_type} (pilihan: {', '.join(INDEX_TYPES)})")
+
+    index.add(embeddings)
+    apply_search_params(index, search_params)
+    return index, search_params
+
+def apply_search_params(index, search_params: dict):
+    """Menerapkan parameter pencarian (nprobe / efSearch) ke indeks."""
+    parameter_space = faiss.ParameterSpace()
+    for name, value in search_params.items():
+        parameter_space.set_index_parameter(index, name, value)
+
+def measure_recall(index, embeddings: np.ndarray, k: int = 10, sample_size: int = 200) -> float:
+    """
+    Mengukur recall@k indeks dibanding pencarian eksak (flat inner product),
+    memakai sampel vektor ayat sebagai kueri.
+    """
+    exact = faiss.IndexFlatIP(embeddings.shape[1])
+    exact.add(embeddings)
+
+    rng = np.random.default_rng(42)
+    sample = embeddings[rng.choice(len(embeddings), size=min(sample_size, len(embeddings)), replace=False)]
+    _, expected = exact.search(sample, k)
+    _, found = index.search(sample, k)
+
+    hits = sum(len(set(e) & set(f)) for e, f in zip(expected, found))
+    return hits / expected.size
+
+def compute_related_verses(embeddings: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Top-k tetangga (cosine, pencarian eksak) untuk SEMUA ayat, tanpa ayat itu sendiri.
+    Mengembalikan (nomor baris int32 [n, k], skor float16 [n, k]), terurut dari yang paling mirip.
+    """
+    n = len(embeddings)
+    k = min(k, n - 1)
+    exact = faiss.IndexFlatIP(embeddings.shape[1])
+    exact.add(embeddings)
+    scores, ids = exact.search(embeddings, k + 1)
+
+    # Buang ayat itu sendiri. Jika tidak ada di hasil (kalah seri dengan ayat yang teksnya sama persis),
+    # buang kandidat terakhir supaya tiap baris tetap berisi k tetangga
+    keep = ids != np.arange(n)[:, None]
+    keep[keep.all(axis=1), -1] = False
+    ids = ids[keep].reshape(n, k).astype(np.int32)
+    scores = scores[keep].reshape(n, k).astype(np.float16)
+    return ids, scores
+
+def save_array(path: str, array: np.ndarray):
+    # Hanya file sementara; rename-nya lewat commit_outputs() bersama file lain
+    with open(f"{path}.tmp", "wb") as f:
+        np.save(f, array)
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def commit_outputs(paths: list[str]):
+    """
+    Rename semua file sementara ke tempatnya, metadata PALING AKHIR. Metadata menyimpan
+    hash indeks, jadi jika proses mati di tengah, main.py menolak pasangan indeks/metadata
+    yang tidak cocok (bukan diam-diam memakai metadata lama).
+    """
+    for path in paths + [OUTPUT_META_FILE]:
+        os.replace(f"{path}.tmp", path)
+
+def build_vector_database(index_type: str = "flat-ip", batch_size: int = 32, processes: int = 1,
+                          use_cache: bool = True, encoder_backend: str = "torch", quantization: str | None = None,
+                          related_k: int = 20, **index_params):
+    if encoder_backend == "onnx":
+        quantization = quantization or detect_quantization()
+    encoder = backend_label(encoder_backend, quantization)
     print(f"Memulai pembangunan database vektor...")
-    print(f"Model yang digunakan: {MODEL_NAME}")
+    print(f"Model yang digunakan: {MODEL_NAME} (backend {encoder})")
+    print(f"Jenis indeks: {index_type}")
     
-    # 1. Muat model Sentence Transformer
-    print("Memuat model AI (mungkin butuh beberapa saat saat pertama kali)...")
-    model = SentenceTransformer(MODEL_NAME)
-    print("Model berhasil dimuat.")
+    # 1. Model Sentence Transformer baru dimuat jika ada teks yang belum ada di cache (lihat embed_with_cache)
 
     # 2. Muat data JSON kita
     try:
@@ -39,42 +231,83 @@ def build_vector_database():
     verse_references = [] # Ini adalah "peta" kita
     
     for verse in data:
-        # Kita gabungkan teks terjemahan dan tafsir untuk 'makna' yang lebih kaya
-        combined_text = f"Terjemahan: {verse['translation']} Tafsir: {verse['tafsir']}"
-        texts_to_embed.append(combined_text)
+        texts_to_embed.append(verse_embedding_text(verse))
         
         # Simpan referensi: Indeks ke-0 -> "1:1", Indeks ke-1 -> "1:2", dst.
         verse_references.append(f"{verse['surah']}:{verse['ayah']}")
 
-    # 4. Enkode semua teks menjadi vektor (Ini adalah bagian yang butuh kerja CPU)
-    print(f"Memulai proses encoding {len(texts_to_embed)} teks. Ini mungkin butuh waktu beberapa menit...")
-    start_time = time.time()
-    
-    # show_progress_bar=True akan menampilkan status
-    embeddings = model.encode(texts_to_embed, show_progress_bar=True)
-    
-    end_time = time.time()
-    print(f"Proses encoding selesai dalam {end_time - start_time:.2f} detik.")
+    # 4. Enkode teks menjadi vektor (Ini adalah bagian yang butuh kerja CPU)
+    # Hanya teks yang belum ada di cache yang di-encode
+    # Vektor ONNX int8 disimpan di cache terpisah, tidak tercampur dengan vektor PyTorch
+    cache_name = MODEL_NAME if encoder == "torch" else f"{MODEL_NAME}@{encoder}"
+    cache = EmbeddingCache(EMBEDDING_CACHE_DIR, cache_name) if use_cache else None
+    embeddings = embed_with_cache(model_loader(encoder_backend, quantization), texts_to_embed, cache,
+                                  batch_size=batch_size, processes=processes)
 
     # 5. Buat dan simpan indeks FAISS
     try:
         # Ambil dimensi vektor (misal: 384 untuk model ini)
+        embeddings = np.ascontiguousarray(embeddings, dtype='float32') # FAISS butuh float32
         d = embeddings.shape[1]
         
-        # Buat indeks FAISS
-        index = faiss.IndexFlatL2(d)
-        
-        # Tambahkan vektor ke indeks
-        index.add(np.array(embeddings).astype('float32')) # FAISS butuh float32
-        
-        # Simpan indeks ke disk
-        faiss.write_index(index, OUTPUT_INDEX_FILE)
-        print(f"Database vektor berhasil disimpan ke: {OUTPUT_INDEX_FILE}")
+        # Buat indeks FAISS dan tambahkan vektor ke indeks
+        index, search_params = build_faiss_index(embeddings, index_type, **index_params)
+
+        # Ukur kualitas indeks aproksimasi dibanding pencarian eksak
+        recall = measure_recall(index, embeddings)
+        print(f"Recall@10 indeks '{index_type}' dibanding pencarian eksak: {recall:.4f}")
         
-        # Simpan "peta" referensi kita
-        with open(OUTPUT_MAP_FILE, 'w', encoding='utf-8') as f:
+        # Baris ke-i indeks FAISS HARUS = verse_references[i]
+        if index.ntotal != len(verse_references):
+            raise ValueError(f"Jumlah vektor ({index.ntotal}) tidak sama dengan jumlah referensi ({len(verse_references)}).")
+
+        # Semua output ditulis ke file sementara dulu, lalu di-rename sekaligus di akhir
+        staged = [OUTPUT_INDEX_FILE, OUTPUT_MAP_FILE]
+        faiss.write_index(index, f"{OUTPUT_INDEX_FILE}.tmp")
+        with open(f"{OUTPUT_MAP_FILE}.tmp", 'w', encoding='utf-8') as f:
             json.dump(verse_references, f, ensure_ascii=False)
+
+        # Hitung & simpan "ayat terkait" (dilayani main.py tanpa query model/indeks)
+        related = None
+        if related_k > 0:
+            start_time = time.time()
+            related_ids, related_scores = compute_related_verses(embeddings, related_k)
+            save_array(OUTPUT_RELATED_IDS_FILE, related_ids)
+            save_array(OUTPUT_RELATED_SCORES_FILE, related_scores)
+            staged += [OUTPUT_RELATED_IDS_FILE, OUTPUT_RELATED_SCORES_FILE]
+            related = {
+                "k": int(related_ids.shape[1]),
+                "version": hashlib.sha256(related_ids.tobytes() + related_scores.tobytes()).hexdigest()[:16]
+            }
+            print(f"{related['k']} ayat terkait per ayat dihitung dalam {time.time() - start_time:.2f} detik, "
+                  f"disimpan ke: {OUTPUT_RELATED_IDS_FILE} & {OUTPUT_RELATED_SCORES_FILE}")
+
+        # Simpan metadata, divalidasi oleh main.py saat memuat indeks
+        metadata = {
+            "model_name": MODEL_NAME,
+            "encoder_backend": encoder,
+            "dim": d,
+            "metric": "inner_product",
+            "normalized": True,
+            "index_type": index_type,
+            "ntotal": index.ntotal,
+            "index_sha256": file_sha256(f"{OUTPUT_INDEX_FILE}.tmp"),
+            "search_params": search_params,
+            "recall_at_10": recall,
+            "related": related
+        }
+        with open(f"{OUTPUT_META_FILE}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, indent=2)
+
+        commit_outputs(staged)
+        if related is None:
+            # Array dari build lama tidak lagi sesuai indeks ini
+            for path in (OUTPUT_RELATED_IDS_FILE, OUTPUT_RELATED_SCORES_FILE):
+                if os.path.exists(path):
+                    os.remove(path)
+        print(f"Database vektor berhasil disimpan ke: {OUTPUT_INDEX_FILE}")
         print(f"Peta referensi berhasil disimpan ke: {OUTPUT_MAP_FILE}")
+        print(f"Metadata indeks berhasil disimpan ke: {OUTPUT_META_FILE}")
 
         print("\n=============================================")
         print("🎉 SUKSES! Database vektor RAG telah dibuat.")
@@ -85,4 +318,40 @@ def build_vector_database():
 
 # Jalankan fungsi saat script dipanggil
 if __name__ == "__main__":
-    build_vector_database()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Membangun database vektor FAISS untuk RAG.")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default="flat-ip", help="Jenis indeks FAISS")
+    parser.add_argument("--nlist", type=int, default=64, help="Jumlah cluster IVF (ivf-pq / ivf-sq8)")
+    parser.add_argument("--nprobe", type=int, default=16, help="Cluster yang dicek saat query (ivf-pq / ivf-sq8)")
+    parser.add_argument("--pq-m", type=int, default=48, help="Jumlah sub-kuantizer PQ, harus membagi dimensi (ivf-pq)")
+    parser.add_argument("--pq-nbits", type=int, default=6, help="Bit per kode PQ (ivf-pq)")
+    parser.add_argument("--hnsw-m", type=int, default=32, help="Jumlah tetangga per node (hnsw)")
+    parser.add_argument("--ef-search", type=int, default=64, help="Lebar pencarian saat query (hnsw)")
+    parser.add_argument("--batch-size", type=int, default=32, help="Ukuran batch encode per proses")
+    parser.add_argument("--processes", type=int, default=max(1, (os.cpu_count() or 1) // 2),
+                        help="Jumlah proses encoder (1 = tanpa multi-process pool)")
+    parser.add_argument("--no-cache", action="store_true", help="Encode ulang semua teks, abaikan cache embedding")
+    parser.add_argument("--related-k", type=int, default=20, help="Jumlah ayat terkait per ayat (0 = tidak dihitung)")
+    parser.add_argument("--encoder-backend", choices=ENCODER_BACKENDS, default="torch",
+                        help="Backend encoder: torch (PyTorch) atau onnx (ONNX Runtime int8)")
+    parser.add_argument("--quantization", choices=QUANTIZATION_CONFIGS, default=None,
+                        help="Konfigurasi kuantisasi ONNX (default: dideteksi dari CPU)")
+    args = parser.parse_args()
+
+    # Pesan ekspor ONNX dari encoder_backend.py memakai logging
+    from log_config import setup_logging
+    setup_logging()
+    build_vector_database(
+        args.index_type,
+        batch_size=args.batch_size,
+        processes=args.processes,
+        use_cache=not args.no_cache,
+        encoder_backend=args.encoder_backend,
+        quantization=args.quantization,
+        related_k=args.related_k,
+        nlist=args.nlist,
+        nprobe=args.nprobe,
+        pq_m=args.pq_m,
+        pq_nbits=args.pq_nbits,
+        hnsw_m=args.hnsw_m,
+        ef_search=args.ef_search
+    )
\ No newline at end of file
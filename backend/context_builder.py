@@ -0,0 +1,50 @@
+import faiss
+import numpy as np
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Perkiraan jumlah token untuk teks Indonesia/Latin (~4 karakter per token).
+    Sengaja dibulatkan ke atas supaya budget tidak terlewati.
+    """
+    return (len(text) + 3) // 4
+
+
+def make_search_params(index, selector):
+    """Membuat parameter pencarian FAISS dengan filter ID, sesuai jenis indeksnya."""
+    if isinstance(index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=index.hnsw.efSearch)
+    if isinstance(index, faiss.IndexIVF):
+        return faiss.SearchParametersIVF(sel=selector, nprobe=index.nprobe)
+    return faiss.SearchParameters(sel=selector)
+
+
+def rank_rows_by_relevance(index, query_vector: np.ndarray, start: int, end: int) -> list[int]:
+    """
+    Mengurutkan baris [start, end) di indeks FAISS berdasarkan kemiripan dengan kueri.
+    Pencarian dibatasi ke rentang itu saja (misal: semua ayat satu surah).
+    Baris yang tidak terjangkau indeks aproksimasi ditambahkan di belakang sesuai urutan.
+    """
+    params = make_search_params(index, faiss.IDSelectorRange(start, end))
+    _, ids = index.search(query_vector.reshape(1, -1), end - start, params=params)
+    ranked = [int(i) for i in ids[0] if i >= 0]
+    seen = set(ranked)
+    ranked.extend(i for i in range(start, end) if i not in seen)
+    return ranked
+
+
+def assemble_context(entries: list[tuple[str, str]], token_budget: int) -> tuple[list[tuple[str, str]], int]:
+    """
+    Memilih entri (ref, baris_konteks) sesuai urutan prioritas sampai budget token habis.
+    Mengembalikan (entri_terpilih, token_terpakai). Entri pertama selalu diambil
+    supaya konteks tidak pernah kosong.
+    """
+    selected = []
+    used_tokens = 0
+    for ref, line in entries:
+        line_tokens = estimate_tokens(line) + 1  # +1 untuk baris baru
+        if selected and used_tokens + line_tokens > token_budget:
+            continue  # Baris ini terlalu panjang, coba baris berikutnya yang lebih pendek
+        selected.append((ref, line))
+        used_tokens += line_tokens
+    return selected, used_tokens
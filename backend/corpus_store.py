@@ -0,0 +1,246 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Mapping, Sequence
+
+# =====================================================================
+# Format korpus biner (little-endian), bisa di-mmap dan dipakai bersama
+# oleh banyak worker lewat page cache OS:
+#
+#   header   : MAGIC (8 byte) | jumlah_ayat (u32) | jumlah_field (u32) | posisi_refs (u64)
+#   tabel    : per field -> nama (16 byte) | posisi_offset (u64) | posisi_blob (u64) | panjang_blob (u64)
+#   refs     : per ayat -> surah (u16) | ayah (u16)
+#   offset   : per field -> (jumlah_ayat + 1) x u32, posisi byte di dalam blob
+#   blob     : per field -> teks UTF-8 semua ayat, disambung tanpa pemisah
+#
+# Selain TEXT_FIELDS, ada field turunan versi lowercase (LOWERED_FIELDS) untuk
+# verifikasi indeks kata, supaya tiap worker tidak perlu menyimpan salinannya sendiri.
+# =====================================================================
+
+MAGIC = b"QRNCORP1"
+TEXT_FIELDS = ("text_arab", "text_normalized", "translation", "tafsir")
+LOWERED_FIELDS = {"translation_lc": "translation", "tafsir_lc": "tafsir"}  # field turunan -> sumber
+
+_HEADER = struct.Struct("<8sIIQ")
+_FIELD_ENTRY = struct.Struct("<16sQQQ")
+
+
+def _align(pos: int, boundary: int = 8) -> int:
+    return (pos + boundary - 1) // boundary * boundary
+
+
+def write_corpus(path: str, verses: list[dict], commit: bool = True) -> str:
+    """
+    Menulis list ayat (format quran_search_index.json) ke file korpus biner.
+    File ditulis ke file sementara dulu lalu di-rename, supaya atomik.
+    commit=False: berhenti di file sementara (path + ".tmp", dikembalikan), rename
+    dilakukan pemanggil bersama file output lain.
+    """
+    if sys.byteorder != "little":
+        raise RuntimeError("Format korpus biner hanya didukung di mesin little-endian.")
+
+    count = len(verses)
+    refs = array("H")
+    for verse in verses:
+        refs.extend((verse["surah"], verse["ayah"]))
+
+    fields = TEXT_FIELDS + tuple(LOWERED_FIELDS)
+    for field in fields:
+        if len(field.encode("utf-8")) > 16:
+            raise ValueError(f"Nama field '{field}' lebih dari 16 byte.")
+    blobs = {}
+    offsets = {}
+    for field in fields:
+        field_offsets = array("I", [0])
+        chunks = []
+        total = 0
+        for verse in verses:
+            text = verse[LOWERED_FIELDS[field]].lower() if field in LOWERED_FIELDS else verse[field]
+            encoded = text.encode("utf-8")
+            chunks.append(encoded)
+            total += len(encoded)
+            field_offsets.append(total)
+        blobs[field] = b"".join(chunks)
+        offsets[field] = field_offsets
+
+    # Hitung tata letak file
+    pos = _HEADER.size + _FIELD_ENTRY.size * len(fields)
+    refs_pos = _align(pos)
+    pos = refs_pos + len(refs) * refs.itemsize
+    layout = []
+    for field in fields:
+        offsets_pos = _align(pos)
+        blob_pos = offsets_pos + len(offsets[field]) * offsets[field].itemsize
+        layout.append((field, offsets_pos, blob_pos, len(blobs[field])))
+        pos = blob_pos + len(blobs[field])
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, count, len(fields), refs_pos))
+        for field, offsets_pos, blob_pos, blob_len in layout:
+            f.write(_FIELD_ENTRY.pack(field.encode("utf-8"), offsets_pos, blob_pos, blob_len))
+        f.write(b"\0" * (refs_pos - f.tell()))
+        refs.tofile(f)
+        for field, offsets_pos, blob_pos, blob_len in layout:
+            f.write(b"\0" * (offsets_pos - f.tell()))
+            offsets[field].tofile(f)
+            f.write(blobs[field])
+        f.flush()
+        os.fsync(f.fileno())
+    if not commit:
+        return tmp_path
+    os.replace(tmp_path, path)
+    return path
+
+
+class VerseRecord(Mapping):
+    """Satu ayat di korpus. Teks baru di-decode dari mmap saat field-nya diakses."""
+
+    __slots__ = ("_corpus", "_index")
+    _KEYS = ("surah", "ayah") + TEXT_FIELDS
+
+    def __init__(self, corpus: "CorpusView", index: int):
+        self._corpus = corpus
+        self._index = index
+
+    def __getitem__(self, key):
+        if key == "surah":
+            return self._corpus.refs[2 * self._index]
+        if key == "ayah":
+            return self._corpus.refs[2 * self._index + 1]
+        return self._corpus.text(key, self._index)
+
+    def __iter__(self):
+        return iter(self._KEYS)
+
+    def __len__(self):
+        return len(self._KEYS)
+
+    def __repr__(self):
+        return f"VerseRecord({self['surah']}:{self['ayah']})"
+
+
+class FieldView(Sequence):
+    """
+    Teks satu field untuk semua ayat (urutan mushaf) sebagai sequence read-only.
+    Tiap item di-decode dari mmap saat diakses, jadi tidak ada salinan korpus di heap worker.
+    """
+
+    __slots__ = ("_offsets", "_blob")
+
+    def __init__(self, offsets: memoryview, blob: memoryview):
+        self._offsets = offsets
+        self._blob = blob
+
+    def __getitem__(self, index: int) -> str:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return str(self._blob[self._offsets[index]:self._offsets[index + 1]], "utf-8")
+
+    def __iter__(self):
+        blob, offsets = self._blob, self._offsets
+        for i in range(len(offsets) - 1):
+            yield str(blob[offsets[i]:offsets[i + 1]], "utf-8")
+
+    def take(self, indices) -> list[str]:
+        """Teks beberapa ayat sekaligus (lebih murah daripada __getitem__ satu per satu)."""
+        blob, offsets = self._blob, self._offsets
+        return [str(blob[offsets[i]:offsets[i + 1]], "utf-8") for i in indices]
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+
+class CorpusView(Mapping):
+    """
+    Pengganti dictionary QURAN_TEXT_MAP ("2:255" -> data ayat) yang membaca
+    langsung dari file korpus biner lewat mmap, tanpa parsing JSON.
+    """
+
+    def __init__(self, path: str):
+        if sys.byteorder != "little":
+            raise RuntimeError("Format korpus biner hanya didukung di mesin little-endian.")
+
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self._mmap)
+
+        magic, count, n_fields, refs_pos = _HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} bukan file korpus yang valid.")
+        self._count = count
+        self.refs = buffer[refs_pos:refs_pos + 4 * count].cast("H")
+
+        self._offsets = {}
+        self._blobs = {}
+        for i in range(n_fields):
+            name, offsets_pos, blob_pos, blob_len = _FIELD_ENTRY.unpack_from(buffer, _HEADER.size + i * _FIELD_ENTRY.size)
+            field = name.rstrip(b"\0").decode("utf-8")
+            self._offsets[field] = buffer[offsets_pos:offsets_pos + 4 * (count + 1)].cast("I")
+            self._blobs[field] = buffer[blob_pos:blob_pos + blob_len]
+
+        # Posisi ayat pertama tiap surah, supaya "s:a" bisa langsung dihitung indeksnya
+        self._surah_start = {}
+        for i in range(count):
+            self._surah_start.setdefault(self.refs[2 * i], i)
+
+    def text(self, field: str, index: int) -> str:
+        offsets = self._offsets[field]
+        return str(self._blobs[field][offsets[index]:offsets[index + 1]], "utf-8")
+
+    def has_field(self, field: str) -> bool:
+        return field in self._blobs
+
+    def field(self, field: str) -> FieldView:
+        """Semua teks satu field (termasuk field turunan, misal "tafsir_lc") tanpa menyalinnya."""
+        return FieldView(self._offsets[field], self._blobs[field])
+
+    def record(self, index: int) -> VerseRecord:
+        return VerseRecord(self, index)
+
+    def _index_of(self, key) -> int:
+        try:
+            surah, ayah = (int(part) for part in key.split(":"))
+            index = self._surah_start[surah] + ayah - 1
+        except (AttributeError, ValueError, KeyError):
+            raise KeyError(key)
+        if ayah < 1 or index >= self._count or self.refs[2 * index] != surah or self.refs[2 * index + 1] != ayah:
+            raise KeyError(key)
+        return index
+
+    def __getitem__(self, key) -> VerseRecord:
+        return VerseRecord(self, self._index_of(key))
+
+    def __contains__(self, key):
+        try:
+            self._index_of(key)
+            return True
+        except KeyError:
+            return False
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield f"{self.refs[2 * i]}:{self.refs[2 * i + 1]}"
+
+    def __len__(self):
+        return self._count
+
+    def records(self) -> list[VerseRecord]:
+        """Semua ayat sesuai urutan mushaf (lebih murah daripada lewat key string)."""
+        return [VerseRecord(self, i) for i in range(self._count)]
+
+
+# Konversi manual dari quran_search_index.json yang sudah ada:
+#   python corpus_store.py [sumber.json] [tujuan.bin]
+if __name__ == "__main__":
+    source = sys.argv[1] if len(sys.argv) > 1 else "quran_search_index.json"
+    target = sys.argv[2] if len(sys.argv) > 2 else "quran_corpus.bin"
+    with open(source, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    write_corpus(target, data)
+    print(f"Berhasil menulis {len(data)} ayat ke {target} ({os.path.getsize(target)} byte).")
@@ -0,0 +1,92 @@
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+
+
+def content_key(text: str) -> str:
+    """Kunci cache = hash isi teks. Teks yang sama selalu dapat vektor yang sama."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Cache embedding di disk untuk build_vector_db.py, satu pasang file per model:
+      <dir>/<model>.json         : nama model, normalisasi, dimensi, nama file vektor,
+                                   dan daftar content_key sesuai urutan baris
+      <dir>/<model>.<versi>.npy  : matriks float32 (baris ke-i = vektor untuk keys[i]), dibaca lewat mmap
+    Ganti model (atau normalisasi) = cache lain, jadi vektor beda model tidak pernah tercampur.
+    """
+
+    def __init__(self, cache_dir: str, model_name: str, normalized: bool = True):
+        self.cache_dir = cache_dir
+        self.model_name = model_name
+        self.normalized = normalized
+        self._slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+        self.meta_path = os.path.join(cache_dir, f"{self._slug}.json")
+        self.vectors_file = None
+        self.vectors = None
+        self._rows: dict[str, int] = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta["model_name"] != self.model_name or meta["normalized"] != self.normalized:
+                return
+            vectors = np.load(os.path.join(self.cache_dir, meta["vectors_file"]), mmap_mode="r")
+            if vectors.shape != (len(meta["keys"]), meta["dim"]) or vectors.dtype != np.float32:
+                return
+        except (OSError, ValueError, KeyError):
+            return
+        self.vectors = vectors
+        self.vectors_file = meta["vectors_file"]
+        self._rows = {key: row for row, key in enumerate(meta["keys"])}
+
+    def __len__(self):
+        return len(self._rows)
+
+    def lookup(self, keys: list[str]) -> np.ndarray:
+        """Nomor baris cache untuk tiap key, -1 jika belum ada (harus di-encode)."""
+        return np.fromiter((self._rows.get(key, -1) for key in keys), dtype=np.int64, count=len(keys))
+
+    def save(self, keys: list[str], embeddings: np.ndarray):
+        """
+        Menulis ulang cache berisi tepat `keys` (entri yang tidak dipakai lagi ikut terbuang).
+        Vektor ditulis ke file .npy baru dulu; cache baru "berlaku" saat file .json
+        (yang menunjuk ke file itu) di-rename. Build yang terputus tidak merusak cache lama.
+        """
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        keys = list(keys)
+        version = hashlib.sha256("\n".join(keys).encode("utf-8")).hexdigest()[:16]
+        vectors_file = f"{self._slug}.{version}.npy"
+        tmp_vectors = os.path.join(self.cache_dir, f"{vectors_file}.tmp")
+        with open(tmp_vectors, "wb") as f:
+            np.save(f, embeddings)
+        os.replace(tmp_vectors, os.path.join(self.cache_dir, vectors_file))
+
+        meta = {
+            "model_name": self.model_name,
+            "normalized": self.normalized,
+            "dim": int(embeddings.shape[1]),
+            "vectors_file": vectors_file,
+            "keys": keys
+        }
+        tmp_meta = f"{self.meta_path}.tmp"
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_meta, self.meta_path)
+
+        # Hapus file vektor versi lama
+        old_file = self.vectors_file
+        self.vectors = None
+        if old_file and old_file != vectors_file:
+            try:
+                os.remove(os.path.join(self.cache_dir, old_file))
+            except OSError:
+                pass
+        self._load()
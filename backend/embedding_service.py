@@ -0,0 +1,80 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from cachetools import LRUCache
+
+
+def normalize_query(text: str) -> str:
+    """Kunci cache: lowercase + spasi dirapikan, supaya 'Apa itu  sabar' == 'apa itu sabar'."""
+    return " ".join(text.lower().split())
+
+
+class EmbeddingService:
+    """
+    Pembungkus RAG_MODEL.encode untuk dipakai dari endpoint async.
+    - encode dijalankan di executor (thread terpisah), event loop tidak ikut macet
+    - kueri yang datang bersamaan dalam jendela waktu kecil digabung jadi SATU panggilan encode
+    - hasil disimpan di cache LRU (kueri ternormalisasi -> vektor)
+    """
+
+    def __init__(self, model, batch_window: float = 0.01, max_batch_size: int = 32, cache_size: int = 1024):
+        self.model = model
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self._cache = LRUCache(maxsize=cache_size)
+        # Satu thread saja: model tidak dipanggil paralel, paralelisme ada di dalam torch
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rag-encode")
+        self._pending: dict[str, asyncio.Future] = {}
+        self._flush_handle: asyncio.TimerHandle | None = None
+
+    def _encode_batch(self, texts: list[str]) -> np.ndarray:
+        vectors = self.model.encode(texts, normalize_embeddings=True, batch_size=len(texts))
+        return np.asarray(vectors, dtype="float32")
+
+    async def encode(self, text: str) -> np.ndarray:
+        """Mengembalikan vektor ternormalisasi (float32, 1 dimensi) untuk satu kueri."""
+        key = normalize_query(text)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        # Kueri yang sama sudah menunggu di batch berikutnya? Ikut menunggu saja.
+        future = self._pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._pending[key] = future
+            if len(self._pending) >= self.max_batch_size:
+                self._flush()
+            elif self._flush_handle is None:
+                self._flush_handle = loop.call_later(self.batch_window, self._flush)
+        return await asyncio.shield(future)
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, {}
+        if batch:
+            asyncio.get_running_loop().create_task(self._run_batch(batch))
+
+    async def _run_batch(self, batch: dict[str, asyncio.Future]):
+        texts = list(batch)
+        try:
+            vectors = await asyncio.get_running_loop().run_in_executor(self._executor, self._encode_batch, texts)
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+                    future.exception()  # Tandai sudah dibaca, supaya tidak ada warning jika tidak ada yang menunggu
+            return
+
+        for text, vector in zip(texts, vectors):
+            vector.setflags(write=False)  # Dipakai bersama lewat cache, jangan diubah
+            self._cache[text] = vector
+            if not batch[text].done():
+                batch[text].set_result(vector)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
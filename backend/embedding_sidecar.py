@@ -0,0 +1,254 @@
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import struct
+
+import numpy as np
+from cachetools import LRUCache
+
+from embedding_service import EmbeddingService, normalize_query
+
+# =====================================================================
+# Sidecar embedding: SATU proses yang memegang model SentenceTransformer,
+# dipakai bersama oleh semua worker uvicorn lewat Unix socket.
+# Tanpa sidecar, tiap worker memuat MiniLM sendiri (RAM naik linear dengan jumlah worker).
+#
+#   python embedding_sidecar.py --socket /tmp/quran-embed.sock
+#   EMBEDDING_SIDECAR_SOCKET=/tmp/quran-embed.sock FAISS_MMAP=1 uvicorn main:app --workers 4
+#
+# Request dari semua worker masuk ke satu EmbeddingService, jadi kueri yang datang
+# bersamaan (dari worker mana pun) di-encode dalam satu batch.
+#
+# Protokol (setiap frame = panjang 4 byte big-endian + isi):
+#   request : frame JSON {"id": n, "op": "encode", "texts": [...]} atau {"id": n, "op": "info"}
+#   respons : frame JSON {"id": n, "shape": [k, d]} diikuti frame biner float32 (k x d),
+#             atau {"id": n, "info": {...}}, atau {"id": n, "error": "..."}
+# =====================================================================
+
+logger = logging.getLogger("quran_api.embedding_sidecar")
+
+DEFAULT_SOCKET = "/tmp/quran-embed.sock"
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+_HEADER = struct.Struct(">I")
+
+
+async def read_frame(reader: asyncio.StreamReader) -> bytes:
+    (length,) = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    if length > MAX_FRAME_BYTES:
+        raise ValueError(f"Frame terlalu besar ({length} byte)")
+    return await reader.readexactly(length)
+
+
+def write_frame(writer: asyncio.StreamWriter, payload: bytes):
+    writer.write(_HEADER.pack(len(payload)) + payload)
+
+
+def write_json_frame(writer: asyncio.StreamWriter, message: dict):
+    write_frame(writer, json.dumps(message, ensure_ascii=False).encode("utf-8"))
+
+
+# === SISI SERVER ===
+
+class EmbeddingSidecarServer:
+    def __init__(self, model, model_name: str, batch_window: float = 0.005, max_batch_size: int = 64,
+                 backend: str = "torch"):
+        self.model_name = model_name
+        self.backend = backend
+        self.dim = int(model.get_sentence_embedding_dimension())
+        self.service = EmbeddingService(model, batch_window=batch_window, max_batch_size=max_batch_size)
+        self._writers: set[asyncio.StreamWriter] = set()
+
+    async def _handle_request(self, request: dict, writer: asyncio.StreamWriter):
+        request_id = request.get("id")
+        try:
+            if request.get("op") == "info":
+                write_json_frame(writer, {"id": request_id, "info": {"model_name": self.model_name, "dim": self.dim, "backend": self.backend}})
+            else:
+                vectors = await asyncio.gather(*(self.service.encode(text) for text in request["texts"]))
+                matrix = np.ascontiguousarray(np.stack(vectors) if vectors else np.zeros((0, self.dim)), dtype="<f4")
+                # Header + isi ditulis tanpa await di antaranya, jadi tidak tercampur respons lain
+                write_json_frame(writer, {"id": request_id, "shape": list(matrix.shape)})
+                write_frame(writer, matrix.tobytes())
+        except Exception as e:
+            write_json_frame(writer, {"id": request_id, "error": str(e)})
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        tasks = set()
+        self._writers.add(writer)
+        try:
+            while True:
+                request = json.loads(await read_frame(reader))
+                # Request dalam satu koneksi boleh tumpang tindih (dijawab sesuai id)
+                task = asyncio.create_task(self._handle_request(request, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except ValueError as e:
+            logger.warning(f"Koneksi ditutup, frame tidak valid: {e}")
+        finally:
+            for task in tasks:
+                task.cancel()
+            self._writers.discard(writer)
+            writer.close()
+
+    async def serve(self, socket_path: str):
+        if os.path.exists(socket_path):
+            os.remove(socket_path)  # Sisa proses sebelumnya
+        server = await asyncio.start_unix_server(self.handle_connection, path=socket_path)
+        os.chmod(socket_path, 0o660)
+        logger.info(f"Sidecar embedding '{self.model_name}' (dim {self.dim}) siap di {socket_path}.")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            # server.close() tidak memutus koneksi yang sudah ada; putus manual supaya
+            # klien langsung tahu dan menyambung ulang ke sidecar yang baru
+            for writer in list(self._writers):
+                writer.close()
+            self.service.close()
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+
+
+# === SISI KLIEN (dipakai main.py di tiap worker) ===
+
+class EmbeddingSidecarClient:
+    """
+    Pengganti EmbeddingService di worker: encode() dikirim ke sidecar lewat Unix socket.
+    Satu koneksi per worker, request boleh tumpang tindih (dicocokkan lewat id).
+    Hasil juga disimpan di cache LRU lokal, sama seperti EmbeddingService.
+    Koneksi yang putus dibuka ulang otomatis pada request berikutnya.
+    """
+
+    def __init__(self, socket_path: str, timeout: float = 10.0, cache_size: int = 1024):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.model_name: str | None = None
+        self.dim: int | None = None
+        self.backend: str | None = None
+        self._cache = LRUCache(maxsize=cache_size)
+        self._ids = itertools.count(1)
+        self._pending: dict[int, asyncio.Future] = {}
+        self._reader_task: asyncio.Task | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._connect_lock = asyncio.Lock()
+
+    async def start(self):
+        """Membuka koneksi dan mengambil info model (nama & dimensi) dari sidecar."""
+        info = (await self._request({"op": "info"}))["info"]
+        self.model_name = info["model_name"]
+        self.dim = info["dim"]
+        self.backend = info.get("backend", "torch")
+
+    async def _ensure_connected(self) -> tuple[asyncio.StreamWriter, dict[int, asyncio.Future]]:
+        """Koneksi aktif (dibuka ulang jika putus): writer & daftar request yang menunggu jawabannya."""
+        async with self._connect_lock:
+            if self._writer is None or self._writer.is_closing():
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_unix_connection(self.socket_path), self.timeout
+                )
+                # Tiap koneksi punya daftar pending sendiri: loop koneksi lama yang baru
+                # selesai tidak boleh menggagalkan request yang dikirim lewat koneksi baru
+                self._writer, self._pending = writer, {}
+                self._reader_task = asyncio.get_running_loop().create_task(
+                    self._read_loop(reader, writer, self._pending)
+                )
+            return self._writer, self._pending
+
+    async def _read_loop(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                         pending: dict[int, asyncio.Future]):
+        error: Exception = ConnectionError("Koneksi ke sidecar embedding terputus")
+        try:
+            while True:
+                header = json.loads(await read_frame(reader))
+                body = await read_frame(reader) if "shape" in header else None
+                future = pending.pop(header.get("id"), None)
+                if future is not None and not future.done():
+                    future.set_result((header, body))
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError) as e:
+            error = ConnectionError(f"Koneksi ke sidecar embedding terputus: {e}")
+        finally:
+            writer.close()
+            if self._writer is writer:
+                self._writer = None
+            # Semua request yang masih menunggu di koneksi ini dianggap gagal
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(error)
+            pending.clear()
+
+    async def _request(self, message: dict):
+        writer, pending = await self._ensure_connected()
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        pending[request_id] = future
+        try:
+            # Koneksi bisa putus di antara _ensure_connected dan sini (loop-nya sudah selesai,
+            # jadi tidak ada yang akan menjawab/menggagalkan request ini)
+            if writer.is_closing():
+                raise ConnectionError("Koneksi ke sidecar embedding terputus")
+            write_json_frame(writer, {"id": request_id, **message})
+            await writer.drain()
+            header, body = await asyncio.wait_for(future, self.timeout)
+        finally:
+            pending.pop(request_id, None)
+        if "error" in header:
+            raise RuntimeError(f"Sidecar embedding gagal: {header['error']}")
+        if body is None:
+            return header
+        return np.frombuffer(body, dtype="<f4").reshape(header["shape"])
+
+    async def encode_many(self, texts: list[str]) -> np.ndarray:
+        return await self._request({"op": "encode", "texts": texts})
+
+    async def encode(self, text: str) -> np.ndarray:
+        """Mengembalikan vektor ternormalisasi (float32, 1 dimensi) untuk satu kueri."""
+        key = normalize_query(text)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        vector = (await self.encode_many([key]))[0]
+        vector.setflags(write=False)  # Dipakai bersama lewat cache, jangan diubah
+        self._cache[key] = vector
+        return vector
+
+    def close(self):
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            self._reader_task = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+if __name__ == "__main__":
+    from encoder_backend import ENCODER_BACKENDS, QUANTIZATION_CONFIGS, load_sentence_encoder
+    from log_config import setup_logging
+
+    parser = argparse.ArgumentParser(description="Sidecar embedding bersama untuk semua worker backend.")
+    parser.add_argument("--socket", default=os.environ.get("EMBEDDING_SIDECAR_SOCKET", DEFAULT_SOCKET))
+    parser.add_argument("--model", default="paraphrase-multilingual-MiniLM-L12-v2")
+    parser.add_argument("--batch-window-ms", type=float, default=5.0, help="Jendela penggabungan request jadi satu batch")
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--backend", choices=ENCODER_BACKENDS, default=os.environ.get("ENCODER_BACKEND", "torch"),
+                        help="Backend encoder (onnx = ONNX Runtime int8, jatuh ke torch jika gagal)")
+    parser.add_argument("--quantization", choices=QUANTIZATION_CONFIGS, default=os.environ.get("ONNX_QUANTIZATION"))
+    args = parser.parse_args()
+
+    setup_logging()
+    logger.info(f"Memuat model '{args.model}' (backend {args.backend})...")
+    model, backend = load_sentence_encoder(args.model, args.backend, args.quantization)
+    sidecar = EmbeddingSidecarServer(model, args.model, batch_window=args.batch_window_ms / 1000,
+                                     max_batch_size=args.max_batch_size, backend=backend)
+    try:
+        asyncio.run(sidecar.serve(args.socket))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,239 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import re
+import shutil
+import sys
+import time
+
+import numpy as np
+
+# =====================================================================
+# Pilihan backend encoder kueri/ayat (SentenceTransformer):
+#   torch : model PyTorch biasa (default, selalu jadi cadangan)
+#   onnx  : graf ONNX int8 (dynamic quantization) dijalankan ONNX Runtime.
+#           Di node CPU jauh lebih cepat & RSS worker jauh lebih kecil.
+#           Butuh: pip install "sentence-transformers[onnx]"
+#
+# Model ONNX diekspor SEKALI ke ONNX_MODEL_DIR/<model>/onnx/model_qint8_<kuantisasi>.onnx,
+# start berikutnya tinggal memuat file itu. ONNX Runtime sendiri sudah menerapkan
+# optimasi graf (fusi operator, constant folding) saat sesi dibuat.
+#
+#   python encoder_backend.py export                  # ekspor + kuantisasi (otomatis sesuai CPU)
+#   python encoder_backend.py parity --sample 500     # cek cosine ONNX vs vektor PyTorch di quran_faiss.index
+# =====================================================================
+
+logger = logging.getLogger("quran_api.encoder")
+
+ENCODER_BACKENDS = ("torch", "onnx")
+QUANTIZATION_CONFIGS = ("arm64", "avx2", "avx512", "avx512_vnni")
+ONNX_MODEL_DIR = "onnx_models"
+
+
+def detect_quantization() -> str:
+    """Konfigurasi kuantisasi yang cocok dengan CPU mesin ini."""
+    if platform.machine().lower() in ("arm64", "aarch64"):
+        return "arm64"
+    try:
+        with open("/proc/cpuinfo", "r", encoding="utf-8") as f:
+            flags = f.read()
+    except OSError:
+        return "avx2"
+    if "avx512_vnni" in flags or "avx512vnni" in flags:
+        return "avx512_vnni"
+    if "avx512f" in flags:
+        return "avx512"
+    return "avx2"
+
+
+def backend_label(backend: str, quantization: str | None = None) -> str:
+    """Label backend yang dicatat di metadata indeks & nama cache, misal 'torch' / 'onnx-qint8-avx2'."""
+    if backend == "torch":
+        return "torch"
+    return f"onnx-qint8-{quantization}"
+
+
+def onnx_model_path(model_name: str, quantization: str, onnx_dir: str = ONNX_MODEL_DIR) -> tuple[str, str]:
+    """(folder model, nama file ONNX relatif terhadap folder itu)."""
+    model_dir = os.path.join(onnx_dir, re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name))
+    return model_dir, f"onnx/model_qint8_{quantization}.onnx"
+
+
+def export_quantized_onnx(model_name: str, quantization: str, onnx_dir: str = ONNX_MODEL_DIR,
+                          force: bool = False) -> tuple[str, str]:
+    """
+    Mengekspor model ke ONNX lalu meng-kuantisasi bobotnya ke int8, sekali saja.
+    Ditulis ke folder sementara lalu di-rename: beberapa worker yang start bersamaan
+    tidak saling menimpa, dan ekspor yang terputus tidak meninggalkan model setengah jadi.
+    """
+    model_dir, file_name = onnx_model_path(model_name, quantization, onnx_dir)
+    if os.path.exists(os.path.join(model_dir, file_name)) and not force:
+        return model_dir, file_name
+
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    logger.info(f"Mengekspor '{model_name}' ke ONNX int8 ({quantization})... (sekali saja)")
+    start = time.perf_counter()
+    tmp_dir = f"{model_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    try:
+        # Memakai onnx/model.onnx dari repo model jika ada, jika tidak diekspor dari bobot PyTorch
+        model = SentenceTransformer(model_name, backend="onnx", device="cpu")
+        model.save_pretrained(tmp_dir)
+        export_dynamic_quantized_onnx_model(model, quantization, tmp_dir, file_suffix=f"qint8_{quantization}")
+        if not os.path.exists(os.path.join(tmp_dir, file_name)):
+            raise RuntimeError(f"hasil kuantisasi tidak ditemukan di {os.path.join(tmp_dir, file_name)}")
+        if force:
+            shutil.rmtree(model_dir, ignore_errors=True)
+        os.makedirs(onnx_dir, exist_ok=True)
+        try:
+            os.rename(tmp_dir, model_dir)
+        except OSError:
+            # Folder sudah dibuat proses lain (atau ekspor kuantisasi lain untuk model yang sama)
+            os.makedirs(os.path.join(model_dir, "onnx"), exist_ok=True)
+            os.replace(os.path.join(tmp_dir, file_name), os.path.join(model_dir, file_name))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    logger.info(f"Model ONNX int8 disimpan di {os.path.join(model_dir, file_name)} ({time.perf_counter() - start:.1f} detik).")
+    return model_dir, file_name
+
+
+def load_sentence_encoder(model_name: str, backend: str = "torch", quantization: str | None = None,
+                          onnx_dir: str = ONNX_MODEL_DIR, fallback: bool = True):
+    """
+    Memuat SentenceTransformer dengan backend yang dipilih. Mengembalikan (model, label backend).
+    Jika backend ONNX gagal (paket onnxruntime/optimum tidak ada, ekspor gagal, dll):
+    fallback=True -> kembali ke PyTorch, fallback=False -> exception diteruskan.
+    Kedua backend punya .encode() yang sama, jadi pemanggil tidak perlu tahu bedanya.
+    """
+    if backend not in ENCODER_BACKENDS:
+        raise ValueError(f"Backend encoder tidak dikenal: {backend} (pilihan: {', '.join(ENCODER_BACKENDS)})")
+    # Import di sini: torch sendiri butuh beberapa detik untuk di-import
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "onnx":
+        quantization = quantization or detect_quantization()
+        try:
+            model_dir, file_name = export_quantized_onnx(model_name, quantization, onnx_dir)
+            model = SentenceTransformer(model_dir, backend="onnx", device="cpu", model_kwargs={"file_name": file_name})
+            return model, backend_label("onnx", quantization)
+        except Exception as e:
+            if not fallback:
+                raise
+            logger.warning(f"Backend ONNX tidak bisa dipakai ({e}), kembali ke PyTorch.")
+    return SentenceTransformer(model_name), "torch"
+
+
+# === CEK PARITAS (ONNX vs PyTorch) ===
+
+def cosine_parity(candidate: np.ndarray, reference: np.ndarray) -> dict:
+    """Statistik cosine similarity per baris antara dua matriks vektor."""
+    candidate = candidate / np.linalg.norm(candidate, axis=1, keepdims=True)
+    reference = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    cosines = np.einsum("ij,ij->i", candidate, reference)
+    return {
+        "count": int(len(cosines)),
+        "mean": float(cosines.mean()),
+        "p01": float(np.percentile(cosines, 1)),
+        "min": float(cosines.min()),
+        "worst_rows": np.argsort(cosines)[:5].tolist()
+    }
+
+
+def neighbor_agreement(index, candidate: np.ndarray, reference: np.ndarray, k: int = 10) -> float:
+    """Porsi top-k tetangga di indeks yang sama jika kueri memakai vektor kandidat vs vektor referensi."""
+    _, expected = index.search(np.ascontiguousarray(reference, dtype="float32"), k)
+    _, found = index.search(np.ascontiguousarray(candidate, dtype="float32"), k)
+    return sum(len(set(e) & set(f)) for e, f in zip(expected, found)) / expected.size
+
+
+def reference_vectors(rows: np.ndarray, texts: list[str], index, meta: dict, model_name: str):
+    """
+    Vektor PyTorch untuk baris-baris sampel. Dari quran_faiss.index jika indeksnya menyimpan
+    vektor utuh (flat-ip / hnsw); untuk indeks terkompresi (ivf-pq / ivf-sq8) dari cache embedding.
+    Mengembalikan (vektor, baris yang punya referensi, sumber).
+    """
+    if meta.get("index_type", "flat-ip") in ("flat-ip", "hnsw"):
+        return index.reconstruct_batch(rows.astype("int64")), rows, "quran_faiss.index"
+
+    from build_vector_db import EMBEDDING_CACHE_DIR
+    from embedding_cache import EmbeddingCache, content_key
+    cache = EmbeddingCache(EMBEDDING_CACHE_DIR, model_name)
+    cache_rows = cache.lookup([content_key(texts[row]) for row in rows])
+    found = cache_rows >= 0
+    if not found.any():
+        raise RuntimeError(f"indeks '{meta.get('index_type')}' terkompresi dan cache embedding kosong, tidak ada vektor referensi")
+    return np.asarray(cache.vectors[cache_rows[found]]), rows[found], EMBEDDING_CACHE_DIR
+
+
+def run_parity_check(model_name: str, backend: str = "onnx", quantization: str | None = None,
+                     sample: int = 500, min_cosine: float = 0.98, batch_size: int = 32) -> bool:
+    """
+    Meng-encode sampel teks ayat (teks yang sama dengan build_vector_db.py) dengan backend
+    kandidat, lalu membandingkannya dengan vektor PyTorch yang sudah ada di indeks.
+    Lulus jika rata-rata cosine >= min_cosine.
+    """
+    import faiss
+    from build_vector_db import OUTPUT_INDEX_FILE, OUTPUT_META_FILE, SOURCE_INDEX, verse_embedding_text
+
+    with open(OUTPUT_META_FILE, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("model_name") != model_name:
+        raise ValueError(f"indeks dibuat dengan model '{meta.get('model_name')}', bukan '{model_name}'")
+    if meta.get("encoder_backend", "torch") != "torch":
+        raise ValueError(f"indeks dibuat dengan backend '{meta['encoder_backend']}', bukan PyTorch; build ulang dengan --encoder-backend torch")
+    index = faiss.read_index(OUTPUT_INDEX_FILE)
+    with open(SOURCE_INDEX, "r", encoding="utf-8") as f:
+        texts = [verse_embedding_text(verse) for verse in json.load(f)]
+    if len(texts) != index.ntotal:
+        raise ValueError(f"{SOURCE_INDEX} ({len(texts)} ayat) tidak sesuai dengan indeks ({index.ntotal} vektor); build ulang indeks")
+
+    rng = np.random.default_rng(42)
+    rows = np.sort(rng.choice(len(texts), size=min(sample, len(texts)), replace=False))
+    reference, rows, source = reference_vectors(rows, texts, index, meta, model_name)
+
+    model, label = load_sentence_encoder(model_name, backend, quantization, fallback=False)
+    start = time.perf_counter()
+    candidate = model.encode([texts[row] for row in rows], batch_size=batch_size, normalize_embeddings=True)
+    elapsed = time.perf_counter() - start
+
+    stats = cosine_parity(np.asarray(candidate, dtype="float32"), reference)
+    agreement = neighbor_agreement(index, candidate, reference)
+    print(f"Backend       : {label} (referensi PyTorch dari {source})")
+    print(f"Sampel        : {stats['count']} ayat, encode {elapsed:.2f} detik ({elapsed / stats['count'] * 1000:.1f} ms/teks)")
+    print(f"Cosine        : rata-rata {stats['mean']:.5f}, p01 {stats['p01']:.5f}, min {stats['min']:.5f}")
+    print(f"Top-10 sama   : {agreement:.4f}")
+    print(f"Terburuk      : {', '.join(str(int(rows[i])) for i in stats['worst_rows'])} (baris indeks)")
+    passed = stats["mean"] >= min_cosine
+    print(f"{'LULUS' if passed else 'GAGAL'} (batas rata-rata cosine {min_cosine})")
+    return passed
+
+
+if __name__ == "__main__":
+    from log_config import setup_logging
+
+    parser = argparse.ArgumentParser(description="Ekspor & cek paritas backend encoder ONNX int8.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Ekspor model ke ONNX int8 (ke folder onnx_models)")
+    parity_parser = subparsers.add_parser("parity", help="Bandingkan vektor backend kandidat dengan vektor PyTorch di indeks")
+    for sub in (export_parser, parity_parser):
+        sub.add_argument("--model", default="paraphrase-multilingual-MiniLM-L12-v2")
+        sub.add_argument("--quantization", choices=QUANTIZATION_CONFIGS, default=None,
+                         help="Konfigurasi kuantisasi (default: dideteksi dari CPU)")
+    export_parser.add_argument("--force", action="store_true", help="Ekspor ulang walau file ONNX sudah ada")
+    parity_parser.add_argument("--backend", choices=ENCODER_BACKENDS, default="onnx")
+    parity_parser.add_argument("--sample", type=int, default=500, help="Jumlah ayat yang dibandingkan")
+    parity_parser.add_argument("--min-cosine", type=float, default=0.98, help="Batas minimal rata-rata cosine")
+    parity_parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    setup_logging()
+    quantization = args.quantization or detect_quantization()
+    if args.command == "export":
+        export_quantized_onnx(args.model, quantization, force=args.force)
+    else:
+        ok = run_parity_check(args.model, args.backend, quantization, args.sample, args.min_cosine, args.batch_size)
+        sys.exit(0 if ok else 1)
@@ -0,0 +1,108 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from datetime import datetime, timezone
+
+# =====================================================================
+# Logging terstruktur & non-blocking untuk backend.
+# Handler yang dipasang di logger hanya memasukkan record ke antrian; penulisan
+# ke stdout dikerjakan thread QueueListener. Jadi request tidak pernah menunggu
+# stdout (yang bisa macet saat terminal/pipe lambat).
+#
+# Env:
+#   LOG_LEVEL  : DEBUG / INFO (default) / WARNING / ERROR
+#   LOG_FORMAT : "text" (default, mirip log uvicorn) atau "json" (satu objek JSON per baris)
+# Field tambahan dikirim lewat extra, misal:
+#   logger.info("Pencarian selesai", extra={"matches": 3, "duration_ms": 12.5})
+# =====================================================================
+
+QUEUE_SIZE = 10000
+# Logger pihak ketiga yang menulis satu baris per request HTTP keluar (terlalu ramai di hot path)
+NOISY_LOGGERS = ("httpx", "httpcore")
+
+# Atribut bawaan LogRecord; sisanya dianggap field dari `extra`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+
+def record_fields(record: logging.LogRecord) -> dict:
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS}
+
+
+class TextFormatter(logging.Formatter):
+    """'INFO:     pesan key=value ...' (sejajar dengan log uvicorn)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = f"{record.levelname + ':':<9} {record.getMessage()}"
+        fields = record_fields(record)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            **record_fields(record)
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler dengan antrian terbatas: jika antrian penuh (stdout macet parah),
+    record dibuang dan dihitung, bukan membuat request ikut menunggu.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_LISTENER: logging.handlers.QueueListener | None = None
+
+
+def setup_logging(level: str | None = None, fmt: str | None = None) -> logging.handlers.QueueListener:
+    """
+    Memasang handler antrian di root logger (sekali saja, panggilan berikutnya
+    mengembalikan listener yang sama). Listener dihentikan otomatis saat proses keluar,
+    sisa record di antrian tetap ditulis.
+    """
+    global _LISTENER
+    if _LISTENER is not None:
+        return _LISTENER
+
+    level = (level or os.environ.get("LOG_LEVEL", "INFO")).upper()
+    fmt = (fmt or os.environ.get("LOG_FORMAT", "text")).lower()
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+
+    log_queue = queue.Queue(maxsize=QUEUE_SIZE)
+    root = logging.getLogger()
+    root.addHandler(DroppingQueueHandler(log_queue))
+    root.setLevel(level)
+    for name in NOISY_LOGGERS:
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    _LISTENER = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _LISTENER.start()
+    atexit.register(_LISTENER.stop)
+    return _LISTENER
@@ -1,48 +1,69 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware #Untuk menghubungkan ke frontend
-import requests
+from starlette.concurrency import run_in_threadpool # Untuk menjalankan scan CPU di luar event loop
+from contextlib import asynccontextmanager
+import asyncio
+import httpx
+import logging
+import time
 import pyarabic.araby as araby # Import library yang baru diinstall
 from pydantic import BaseModel # Untuk mendefinisikan body request
+from dataclasses import dataclass
 import re  # <--- INI PENTING WOK
+import base64
+import hashlib
 import json  # <--- INI JUGA PENTING WOK
-from thefuzz import fuzz
 import os
 from dotenv import load_dotenv
 from groq import AsyncGroq # Kita pakai versi Async
 import numpy as np
 import faiss
-from sentence_transformers import SentenceTransformer
-
-
-# === KAMUS ALIAS MANUAL (Untuk Typo/Ejaan Umum) ===
-MANUAL_ALIASES = {
-    "yasin": 36,
-    "yaasin": 36,
-    "yaseen": 36,
-    "alfatihah": 1,
-    "al fatihah": 1,
-    "fatihah": 1,
-    "annaba": 78,
-    "an naba": 78,
-    "annisa": 4,
-    "an nisa": 4,
-    "alanam": 6,
-    "al anam": 6,
-    "alkahfi": 18,
-    "alkahf": 18,
-    "al mulk": 67,
-    "almulk": 67,
-    "arrahman": 55,
-    "ar rahman": 55
-    # Tambahkan lainnya sesuai kebutuhan
-}
+from search_index import ArabicNgramIndex, BatchFuzzyScorer, PhraseIndex, TopKMatches
+from mushaf_index import MushafSuffixIndex, SpanMatch
+from arabic_text import normalize_arabic
+from upstream_client import UpstreamClient
+from corpus_store import CorpusView
+from embedding_service import EmbeddingService
+from embedding_sidecar import EmbeddingSidecarClient
+from encoder_backend import load_sentence_encoder
+from answer_cache import AnswerCache, MemoryBackend, SQLiteBackend
+from context_builder import assemble_context, rank_rows_by_relevance
+from metrics import HTTP_REQUEST_SECONDS, STAGE_SECONDS, render_metrics, stage_timer
+from log_config import setup_logging
+from message_router import MANUAL_ALIASES, MessageRouter
+from readiness import Readiness
+
+# Log lewat antrian (non-blocking), level & format diatur lewat env LOG_LEVEL / LOG_FORMAT
+setup_logging()
+logger = logging.getLogger("quran_api")
+
 
 # === Model untuk menerima data dari frontend ===
 class VoiceSearchRequest(BaseModel):
     text: str
+
+class VerseBatchRequest(BaseModel):
+    refs: list[str] # "2:255" atau rentang "1:1-7"
+    fields: list[str] | None = None
     
+# === Siklus hidup aplikasi (startup & shutdown) ===
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Buka connection pool ke API Qur'an, lalu mulai muat semua subsistem secara paralel
+    # di background. Tidak ditunggu: server langsung melayani request (lihat /readyz).
+    await QURAN_API.start()
+    for name in CORE_SUBSYSTEMS + (ML_SUBSYSTEMS if PRELOAD_ML else ()):
+        READINESS.start(name)
+    yield
+    await READINESS.shutdown()
+    await QURAN_API.close()
+    if EMBEDDING_SERVICE is not None:
+        EMBEDDING_SERVICE.close()
+
 #Inisialisasi aplikasi FastAPI
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # == Middleware CORS ==
 # ini WAJIB agar frontend (yang berjalan di domain berbeda) bisa mengakses API ini
@@ -54,146 +75,524 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-#Definisikan URL dasar dari QURAN API
-QURAN_API_BASE_URL = "https://quran-api-id.vercel.app"
+# == Middleware metrik ==
+# Mencatat durasi tiap request per endpoint. Label route memakai template
+# (misal "/surah/{surah_number}"), bukan URL mentah, supaya jumlah seri tetap kecil.
+# Untuk StreamingResponse, yang terukur adalah waktu sampai header dikirim.
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=getattr(route, "path", "<unmatched>"),
+            status=status
+        )
 
 # =====================================================================
 # === BLOK STARTUP APLIKASI ===
+# Di sini hanya konfigurasi & nilai awal (kosong). Pemuatan data, indeks dan model
+# dikerjakan loader di bawah, yang dijalankan paralel di background oleh lifespan.
+# Jadi server langsung menerima request; endpoint yang datanya belum siap membalas
+# 503 + Retry-After (atau memakai jalur cadangan), lihat /healthz & /readyz.
 # =====================================================================
 
 # --- 1. Muat Variabel Lingkungan (.env) ---
 load_dotenv()
 
+#Definisikan URL dasar dari QURAN API
+# Bisa diganti lewat env QURAN_API_BASE_URL (misal ke stub lokal di bench/stub_quran_api.py)
+QURAN_API_BASE_URL = os.getenv("QURAN_API_BASE_URL", "https://quran-api-id.vercel.app")
+
+# Klien async bersama (connection pool + cache) untuk semua panggilan ke QURAN API
+QURAN_API = UpstreamClient(QURAN_API_BASE_URL)
+
+# Status pemuatan semua subsistem (dibaca /healthz, /readyz dan require_ready)
+READINESS = Readiness()
+
+# PRELOAD_ML=1 (default): model RAG & FAISS langsung dimuat di background saat startup.
+# PRELOAD_ML=0: baru dimuat saat pertama kali dibutuhkan (hemat RAM untuk worker non-RAG).
+PRELOAD_ML = os.environ.get("PRELOAD_ML", "1") != "0"
+
 # --- 2. Konfigurasi Model AI (Groq) ---
-try:
+client = None
+
+def load_groq_client():
+    global client
     client = AsyncGroq(api_key=os.environ["GROQ_API_KEY"])
-    print("INFO:    Klien Groq (Model Llama 3) berhasil dikonfigurasi.")
-except Exception as e:
-    client = None
-    print(f"!!! ERROR FATAL: Gagal mengkonfigurasi Groq: {e} !!!")
+    logger.info("Klien Groq (Model Llama 3) berhasil dikonfigurasi.")
 
 # --- 3. Muat Model Sentence Transformer (untuk RAG) ---
 # Model ini akan mengubah pertanyaan user menjadi vektor
 MODEL_NAME = 'paraphrase-multilingual-MiniLM-L12-v2'
-try:
-    print(f"INFO:    Memuat model RAG '{MODEL_NAME}'... (Mungkin butuh beberapa saat)")
-    RAG_MODEL = SentenceTransformer(MODEL_NAME)
-    print("INFO:    Model RAG berhasil dimuat.")
-except Exception as e:
-    RAG_MODEL = None
-    print(f"!!! ERROR FATAL: Gagal memuat model RAG: {e} !!!")
+RAG_MODEL = None
+EMBEDDING_SERVICE = None # EmbeddingService (model di proses ini) atau EmbeddingSidecarClient
+EMBEDDING_DIM = None
+EMBEDDING_BACKEND = None # Label backend yang benar-benar dipakai, misal "torch" / "onnx-qint8-avx2"
+
+# ENCODER_BACKEND=onnx: encoder kueri memakai graf ONNX int8 (lihat encoder_backend.py),
+# lebih cepat & RAM lebih kecil di CPU. Jika gagal dimuat, otomatis kembali ke PyTorch.
+ENCODER_BACKEND = os.environ.get("ENCODER_BACKEND", "torch")
+ONNX_QUANTIZATION = os.environ.get("ONNX_QUANTIZATION") # default: dideteksi dari CPU
+
+# EMBEDDING_SIDECAR_SOCKET: jika diisi, model TIDAK dimuat di worker ini; encode dikirim ke
+# sidecar (embedding_sidecar.py) yang dipakai bersama semua worker uvicorn.
+EMBEDDING_SIDECAR_SOCKET = os.environ.get("EMBEDDING_SIDECAR_SOCKET")
+
+def set_embedding_service(service, dim: int, backend: str):
+    global EMBEDDING_SERVICE, EMBEDDING_DIM, EMBEDDING_BACKEND
+    EMBEDDING_SERVICE, EMBEDDING_DIM, EMBEDDING_BACKEND = service, dim, backend
+    if ANSWER_CACHE is not None:
+        ANSWER_CACHE.embedder = service
+
+def load_embedding_model():
+    global RAG_MODEL
+    logger.info(f"Memuat model RAG '{MODEL_NAME}' (backend {ENCODER_BACKEND})... (Mungkin butuh beberapa saat)")
+    RAG_MODEL, backend = load_sentence_encoder(MODEL_NAME, ENCODER_BACKEND, ONNX_QUANTIZATION)
+    # Encode dijalankan di executor + micro-batching + cache, supaya event loop tidak macet
+    set_embedding_service(EmbeddingService(RAG_MODEL), RAG_MODEL.get_sentence_embedding_dimension(), backend)
+    logger.info(f"Model RAG berhasil dimuat ({backend}).")
+
+async def connect_embedding_sidecar():
+    sidecar = EmbeddingSidecarClient(EMBEDDING_SIDECAR_SOCKET)
+    await sidecar.start()
+    if sidecar.model_name != MODEL_NAME:
+        sidecar.close()
+        raise ValueError(f"model sidecar '{sidecar.model_name}' != model RAG '{MODEL_NAME}'")
+    set_embedding_service(sidecar, sidecar.dim, sidecar.backend)
+    logger.info(f"Memakai sidecar embedding di {EMBEDDING_SIDECAR_SOCKET} (dim {sidecar.dim}, {sidecar.backend}).")
 
 # --- 4. Muat Database Vektor (FAISS) & Peta Referensi ---
 FAISS_INDEX_FILE = "quran_faiss.index"
+FAISS_META_FILE = "quran_faiss.meta.json"
 VERSE_MAP_FILE = "verse_references.json"
-try:
-    FAISS_INDEX = faiss.read_index(FAISS_INDEX_FILE)
+# FAISS_MMAP=1: indeks dibaca lewat mmap read-only. Isinya ada di page cache yang dipakai
+# bersama semua worker (dan ikut dibebaskan kernel saat RAM sempit), bukan disalin per proses.
+FAISS_MMAP = os.environ.get("FAISS_MMAP", "0") == "1"
+FAISS_INDEX = None
+FAISS_META = {}
+VERSE_REFERENCES = []
+# Rentang baris [awal, akhir) tiap surah di indeks FAISS, untuk pencarian vektor per surah
+SURAH_ROW_RANGES = {}
+
+def validate_faiss_metadata(meta: dict, index, verse_count: int, index_sha256: str | None = None) -> list[str]:
+    """Mengecek apakah indeks FAISS cocok dengan cara main.py melakukan query."""
+    errors = []
+    # Build yang terputus bisa meninggalkan indeks baru + metadata lama (atau sebaliknya)
+    if meta.get("index_sha256") and index_sha256 and meta["index_sha256"] != index_sha256:
+        errors.append(f"hash {FAISS_INDEX_FILE} tidak cocok dengan metadata (build tidak selesai?)")
+    if meta.get("model_name") != MODEL_NAME:
+        errors.append(f"model indeks '{meta.get('model_name')}' != model RAG '{MODEL_NAME}'")
+    if meta.get("dim") != index.d:
+        errors.append(f"dimensi metadata {meta.get('dim')} != dimensi indeks {index.d}")
+    if EMBEDDING_DIM is not None and EMBEDDING_DIM != index.d:
+        errors.append(f"dimensi model {EMBEDDING_DIM} != dimensi indeks {index.d}")
+    # Kueri selalu di-encode dengan normalize_embeddings=True -> indeks harus cosine (IP + normalisasi)
+    if meta.get("metric") != "inner_product" or not meta.get("normalized"):
+        errors.append(f"metrik '{meta.get('metric')}' (normalized={meta.get('normalized')}) tidak cocok dengan kueri cosine")
+    if meta.get("ntotal") != index.ntotal or index.ntotal != verse_count:
+        errors.append(f"jumlah vektor ({index.ntotal}) != metadata ({meta.get('ntotal')}) / peta referensi ({verse_count})")
+    return errors
+
+def faiss_mmap_flags() -> int:
+    # IO_FLAG_MMAP_IFC juga me-mmap kode IndexFlat/HNSW; faiss lama hanya punya IO_FLAG_MMAP (inverted list IVF)
+    return getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+def read_faiss_files():
+    if FAISS_MMAP:
+        index = faiss.read_index(FAISS_INDEX_FILE, faiss_mmap_flags())
+    else:
+        index = faiss.read_index(FAISS_INDEX_FILE)
     with open(VERSE_MAP_FILE, 'r', encoding='utf-8') as f:
-        VERSE_REFERENCES = json.load(f) # Ini adalah list ["1:1", "1:2", ...]
-    print(f"INFO:    Database Vektor ({FAISS_INDEX.ntotal} vektor) & Peta Referensi berhasil dimuat.")
-except Exception as e:
-    FAISS_INDEX = None
-    VERSE_REFERENCES = []
-    print(f"!!! ERROR FATAL: Gagal memuat database FAISS: {e} !!!")
-
-# --- 5. Muat Peta Teks (dari quran_search_index.json) ---
+        verse_references = json.load(f) # Ini adalah list ["1:1", "1:2", ...]
+    meta = None
+    index_sha256 = None
+    if os.path.exists(FAISS_META_FILE):
+        with open(FAISS_META_FILE, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get("index_sha256"):
+            digest = hashlib.sha256()
+            with open(FAISS_INDEX_FILE, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+            index_sha256 = digest.hexdigest()
+    return index, verse_references, meta, index_sha256
+
+async def load_faiss_index():
+    global FAISS_INDEX, FAISS_META, VERSE_REFERENCES, SURAH_ROW_RANGES
+    # Baca file paralel dengan pemuatan model, tapi validasi dimensi butuh modelnya
+    index, verse_references, meta, index_sha256 = await asyncio.to_thread(read_faiss_files)
+    await READINESS.wait("embedding")
+
+    if meta is not None:
+        meta_errors = validate_faiss_metadata(meta, index, len(verse_references), index_sha256)
+        if meta_errors:
+            raise ValueError("; ".join(meta_errors))
+        # Terapkan parameter pencarian yang dipakai saat build (nprobe / efSearch)
+        for param_name, param_value in meta.get("search_params", {}).items():
+            faiss.ParameterSpace().set_index_parameter(index, param_name, param_value)
+        logger.info(f"Indeks FAISS '{meta.get('index_type')}' tervalidasi (recall@10={meta.get('recall_at_10')}).")
+        index_backend = meta.get("encoder_backend", "torch")
+        if EMBEDDING_BACKEND is not None and EMBEDDING_BACKEND != index_backend:
+            # Bukan error: vektor ONNX int8 & PyTorch hampir sama, tapi sebaiknya dicek dulu
+            logger.warning(f"Indeks dibuat dengan encoder '{index_backend}', kueri memakai '{EMBEDDING_BACKEND}'. "
+                           f"Cek dengan: python encoder_backend.py parity")
+    else:
+        # Indeks lama (IndexFlatL2, vektor tidak dinormalisasi) -> tetap jalan, tapi metriknya tidak konsisten
+        logger.warning(f"{FAISS_META_FILE} tidak ada. Indeks lama? Jalankan ulang build_vector_db.py agar metrik cosine konsisten.")
+
+    row_ranges = {}
+    for row, verse_ref in enumerate(verse_references):
+        surah_number = int(verse_ref.split(":")[0])
+        start, _ = row_ranges.get(surah_number, (row, row))
+        row_ranges[surah_number] = (start, row + 1)
+
+    FAISS_META, VERSE_REFERENCES, SURAH_ROW_RANGES = meta or {}, verse_references, row_ranges
+    FAISS_INDEX = index
+    logger.info(f"Database Vektor ({FAISS_INDEX.ntotal} vektor{', mmap' if FAISS_MMAP else ''}) & Peta Referensi berhasil dimuat.")
+
+# --- 4b. Ayat Terkait (tetangga terdekat yang sudah dihitung build_vector_db.py) ---
+# Tidak butuh model maupun indeks FAISS: cukup lookup baris di array (mmap)
+RELATED_IDS_FILE = "verse_related_ids.npy"
+RELATED_SCORES_FILE = "verse_related_scores.npy"
+RELATED_IDS = None # int32 [jumlah ayat, k]: nomor baris ayat terkait
+RELATED_SCORES = None # float16 [jumlah ayat, k]: skor cosine
+RELATED_REFS = [] # Nomor baris -> "2:255" (isi verse_references.json)
+RELATED_ROWS = {} # "2:255" -> nomor baris
+RELATED_VERSION = None
+
+def load_related_verses():
+    global RELATED_IDS, RELATED_SCORES, RELATED_REFS, RELATED_ROWS, RELATED_VERSION
+    # Metadata build terakhir yang menentukan: array lama yang tertinggal di disk
+    # (build dengan --related-k 0, atau build lama beda model/teks) tidak dilayani
+    if not os.path.exists(FAISS_META_FILE):
+        raise FileNotFoundError(f"{FAISS_META_FILE} tidak ada; jalankan ulang build_vector_db.py")
+    with open(FAISS_META_FILE, 'r', encoding='utf-8') as f:
+        related_meta = json.load(f).get("related")
+    if not related_meta or not related_meta.get("version"):
+        raise ValueError(f"build terakhir tidak menghitung ayat terkait ({FAISS_META_FILE}: related kosong)")
+
+    related_ids = np.load(RELATED_IDS_FILE, mmap_mode="r")
+    related_scores = np.load(RELATED_SCORES_FILE, mmap_mode="r")
+    with open(VERSE_MAP_FILE, 'r', encoding='utf-8') as f:
+        verse_references = json.load(f)
+    if related_ids.shape != related_scores.shape or related_ids.shape[0] != len(verse_references):
+        raise ValueError(f"ukuran {RELATED_IDS_FILE} {related_ids.shape} / {RELATED_SCORES_FILE} {related_scores.shape} "
+                         f"tidak cocok dengan {len(verse_references)} referensi; jalankan ulang build_vector_db.py")
+    # Hash sama dengan yang dihitung build_vector_db.py (isi array, bukan file .npy)
+    related_version = hashlib.sha256(related_ids.tobytes() + related_scores.tobytes()).hexdigest()[:16]
+    if related_version != related_meta["version"]:
+        raise ValueError(f"isi {RELATED_IDS_FILE} / {RELATED_SCORES_FILE} tidak cocok dengan versi di {FAISS_META_FILE} "
+                         f"({related_version} != {related_meta['version']}); jalankan ulang build_vector_db.py")
+
+    RELATED_REFS, RELATED_ROWS = verse_references, {verse_ref: row for row, verse_ref in enumerate(verse_references)}
+    RELATED_SCORES, RELATED_VERSION = related_scores, related_version
+    RELATED_IDS = related_ids
+    logger.info(f"Ayat terkait dimuat ({related_ids.shape[1]} per ayat, {len(verse_references)} ayat).")
+
+# --- 5. Muat Peta Teks (dari quran_corpus.bin / quran_search_index.json) ---
 # Kita tetap butuh ini untuk mengambil teks tafsir berdasarkan referensi
+# Prioritas: korpus biner (mmap, tanpa parsing, dipakai bersama antar worker)
+CORPUS_FILE = "quran_corpus.bin"
 SOURCE_INDEX_FILE = "quran_search_index.json"
-QURAN_TEXT_MAP = {} # Kita ubah dari list jadi DICTIONARY untuk akses cepat
-try:
+QURAN_TEXT_MAP = {} # "2:255" -> data ayat (dict biasa, atau view lazy di atas korpus biner)
+QURAN_VERSE_LIST = [] # Semua ayat sesuai urutan mushaf
+ARABIC_NGRAM_INDEX = None
+FUZZY_SCORER = None # partial_ratio batch (native, multi-core) untuk kandidat lafadz
+MUSHAF_INDEX = None # Suffix array seluruh mushaf, untuk bacaan lintas ayat
+TRANSLATION_INDEX = None
+TAFSIR_INDEX = None
+
+def load_text_map() -> tuple[dict, list]:
+    try:
+        text_map = CorpusView(CORPUS_FILE)
+        logger.info(f"Berhasil memuat {len(text_map)} teks ayat dari korpus biner {CORPUS_FILE}.")
+        return text_map, text_map.records()
+    except Exception as e:
+        logger.info(f"Korpus biner {CORPUS_FILE} tidak bisa dipakai ({e}), memakai {SOURCE_INDEX_FILE}.")
     with open(SOURCE_INDEX_FILE, 'r', encoding='utf-8') as f:
         data = json.load(f)
     # Ubah list jadi dictionary (hash map)
-    for verse in data:
-        key = f"{verse['surah']}:{verse['ayah']}"
-        QURAN_TEXT_MAP[key] = verse # Simpan semua data ayat
-    print(f"INFO:    Berhasil memuat {len(QURAN_TEXT_MAP)} teks ayat ke dalam Peta.")
-except Exception as e:
-    QURAN_TEXT_MAP = {}
-    print(f"!!! ERROR FATAL: Gagal memuat {SOURCE_INDEX_FILE}: {e} !!!")
+    text_map = {f"{verse['surah']}:{verse['ayah']}": verse for verse in data}
+    logger.info(f"Berhasil memuat {len(text_map)} teks ayat ke dalam Peta.")
+    return text_map, list(text_map.values())
 
-# --- 6. Muat Peta Nama Surah (dari API) ---
+def field_texts(text_map, verse_list: list, field: str, lowered: bool = False):
+    """
+    Teks satu field semua ayat, untuk indeks & scorer. Dari korpus biner hasilnya view
+    lazy di atas mmap (halaman dipakai bersama antar worker, tidak disalin ke heap);
+    dari JSON (atau korpus lama tanpa field lowercase) berupa list biasa.
+    """
+    name = f"{field}_lc" if lowered else field
+    if isinstance(text_map, CorpusView):
+        if text_map.has_field(name):
+            return text_map.field(name)
+        logger.warning(f"Korpus {CORPUS_FILE} belum punya field '{name}' (jalankan ulang build_index.py), disalin ke memori.")
+    texts = [verse[field] for verse in verse_list]
+    return [text.lower() for text in texts] if lowered else texts
+
+def load_search_data():
+    global QURAN_TEXT_MAP, QURAN_VERSE_LIST, ARABIC_NGRAM_INDEX, FUZZY_SCORER, MUSHAF_INDEX, TRANSLATION_INDEX, TAFSIR_INDEX
+    text_map, verse_list = load_text_map()
+    normalized_texts = field_texts(text_map, verse_list, "text_normalized")
+
+    # --- 5b. Bangun Indeks N-gram untuk Pencarian Lafadz Arab ---
+    # Urutan verse_list = urutan dokumen di dalam indeks
+    try:
+        ngram_index = ArabicNgramIndex(normalized_texts)
+        logger.info(f"Indeks trigram Arab berhasil dibuat ({len(ngram_index.postings)} trigram).")
+    except Exception as e:
+        ngram_index = None
+        logger.error(f"Gagal membuat indeks trigram Arab: {e}")
+
+    fuzzy_scorer = BatchFuzzyScorer(normalized_texts)
+
+    # --- 5b'. Suffix array seluruh mushaf (pencarian lafadz yang menyambung antar ayat) ---
+    try:
+        mushaf_index = MushafSuffixIndex([(verse["surah"], verse["ayah"], verse["text_normalized"]) for verse in verse_list])
+        logger.info(f"Suffix array mushaf berhasil dibuat ({len(mushaf_index.text)} karakter).")
+    except Exception as e:
+        mushaf_index = None
+        logger.error(f"Gagal membuat suffix array mushaf: {e}")
+
+    # --- 5c. Bangun Indeks Kata untuk Terjemahan & Tafsir (Bahasa Indonesia) ---
+    # Teks lowercase untuk verifikasi dibaca dari korpus (sudah di-lowercase saat build), bukan disalin per worker
+    try:
+        translation_index = PhraseIndex(field_texts(text_map, verse_list, "translation", lowered=True), lowered=True)
+        tafsir_index = PhraseIndex(field_texts(text_map, verse_list, "tafsir", lowered=True), lowered=True)
+        logger.info(f"Indeks kata terjemahan ({len(translation_index.vocabulary)} kata) & tafsir ({len(tafsir_index.vocabulary)} kata) berhasil dibuat.")
+    except Exception as e:
+        translation_index = tafsir_index = None
+        logger.error(f"Gagal membuat indeks kata terjemahan/tafsir: {e}")
+
+    # Semua diganti sekaligus di akhir, supaya request tidak pernah melihat data setengah jadi
+    ARABIC_NGRAM_INDEX, MUSHAF_INDEX, TRANSLATION_INDEX, TAFSIR_INDEX = ngram_index, mushaf_index, translation_index, tafsir_index
+    FUZZY_SCORER = fuzzy_scorer
+    QURAN_VERSE_LIST, QURAN_TEXT_MAP = verse_list, text_map
+
+# --- 5d. Muat Penyimpanan Ayat Lengkap (dari quran_verse_store.json) ---
+# Dipakai /surah/{s}/{a} supaya tidak perlu memanggil API eksternal tiap request
+VERSE_STORE_FILE = "quran_verse_store.json"
+VERSE_STORE = {} # "2:255" -> data ayat lengkap (format sama dengan API)
+SURAH_INFO = {} # 2 -> info surah (nama, jumlah ayat, tafsir/ringkasan surah, dll)
+JUZ_REFS = {} # 30 -> ["78:1", "78:2", ...] sesuai urutan mushaf
+
+def load_verse_store():
+    global VERSE_STORE, SURAH_INFO, JUZ_REFS
+    try:
+        with open(VERSE_STORE_FILE, 'r', encoding='utf-8') as f:
+            store_data = json.load(f)
+    except Exception as e:
+        raise RuntimeError(f"{VERSE_STORE_FILE} tidak bisa dimuat, /surah akan memakai API eksternal: {e}")
+    surah_info_map = {int(number): surah_info for number, surah_info in store_data["surahs"].items()}
+    verse_store = {}
+    juz_refs = {}
+    for verse_ref, verse in store_data["verses"].items():
+        surah_info = store_data["surahs"][verse_ref.split(":")[0]]
+        # Lampirkan info surah seperti respons API /surah/{s}/{a}
+        verse_store[verse_ref] = {**verse, "surah": surah_info}
+        juz_number = verse.get("meta", {}).get("juz")
+        if juz_number:
+            juz_refs.setdefault(juz_number, []).append(verse_ref)
+    SURAH_INFO, JUZ_REFS, VERSE_STORE = surah_info_map, juz_refs, verse_store
+    logger.info(f"Berhasil memuat {len(VERSE_STORE)} ayat lengkap dari {VERSE_STORE_FILE}.")
+
+# --- 6. Peta Nama Surah (dari snapshot quran_surahs.json, cadangan: API) ---
+SURAH_META_FILE = "quran_surahs.json"
 SURAH_NAME_TO_NUMBER = {}
 SURAH_NUMBER_TO_NAME = {}
-try:
-    # (Kode untuk memuat peta nama surah tetap sama seperti sebelumnya)
-    print("INFO:    Mengambil data peta Surah...")
-    response = requests.get(f"{QURAN_API_BASE_URL}/surah") 
-    response.raise_for_status()
-    surahs_data = response.json().get("data", [])
-    
+MESSAGE_ROUTER = None # Aho-Corasick alias surah + kata kunci niat untuk routing chatbot
+SURAH_LIST = [] # Daftar 114 surah, format sama dengan API /surah
+SURAH_LIST_BODY = b"" # Respons /surahs yang sudah diserialisasi (sekali saja)
+SURAH_LIST_ETAG = None
+DATA_VERSION = None # Hash data hasil build_index.py, dasar ETag endpoint ayat
+
+def load_surah_snapshot() -> list[dict]:
+    global DATA_VERSION
+    try:
+        with open(SURAH_META_FILE, 'r', encoding='utf-8') as f:
+            surah_meta = json.load(f)
+    except Exception as e:
+        logger.warning(f"Gagal memuat {SURAH_META_FILE}, daftar surah akan diambil dari API: {e}")
+        return []
+    DATA_VERSION = surah_meta.get("data_version")
+    logger.info(f"Snapshot {len(surah_meta['surahs'])} surah dimuat dari {SURAH_META_FILE} (versi {surah_meta['version'][:12]}).")
+    return surah_meta["surahs"]
+
+def build_surah_list_response(surahs_data: list[dict]):
+    """Serialisasi respons /surahs sekali saja, lengkap dengan ETag kuat dari isinya."""
+    global SURAH_LIST_BODY, SURAH_LIST_ETAG
+    SURAH_LIST_BODY = dump_json_bytes({
+        "code": 200,
+        "status": "OK.",
+        "message": "Success fetching all surah.",
+        "data": surahs_data
+    })
+    SURAH_LIST_ETAG = f'"{hashlib.sha256(SURAH_LIST_BODY).hexdigest()[:32]}"'
+
+async def load_surah_names():
+    """Membangun peta alias nama surah dari snapshot lokal (atau API jika snapshot tidak ada)."""
+    global SURAH_LIST, SURAH_NAME_TO_NUMBER, SURAH_NUMBER_TO_NAME, MESSAGE_ROUTER
+    surahs_data = await asyncio.to_thread(load_surah_snapshot)
+    if not surahs_data:
+        logger.info("Mengambil data peta Surah dari API...")
+        surahs_data = (await QURAN_API.get_json("/surah")).get("data", [])
+
+    name_to_number = {}
+    number_to_name = {}
     for surah in surahs_data:
         number = surah["number"]
-        SURAH_NUMBER_TO_NAME[number] = surah["name"]["transliteration"]["id"]
-        
+        number_to_name[number] = surah["name"]["transliteration"]["id"]
+
         # Nama-nama dasar dari API
         base_names = [
             surah["name"]["transliteration"]["id"].lower(),
             surah["name"]["short"].lower(),
             surah["name"]["translation"]["id"].lower()
         ]
-        
+
         for name in base_names:
             if not name: continue
-            
+
             # 1. Simpan nama asli (misal: "an-naba'")
-            SURAH_NAME_TO_NUMBER[name] = number
-            
+            name_to_number[name] = number
+
             # 2. Simpan nama tanpa spasi & strip (misal: "an-naba'" -> "annaba'")
             norm1 = name.replace("-", "").replace(" ", "")
-            SURAH_NAME_TO_NUMBER[norm1] = number
-            
+            name_to_number[norm1] = number
+
             # 3. Simpan nama "BERSIH TOTAL" (Hapus kutip, strip, spasi)
             # Ini solusi untuk An-Naba', Al-An'am, dll.
-            norm2 = re.sub(r'[^a-z0-9]', '', name) 
-            SURAH_NAME_TO_NUMBER[norm2] = number
+            norm2 = re.sub(r'[^a-z0-9]', '', name)
+            name_to_number[norm2] = number
 
     # 4. Masukkan Alias Manual (Prioritas terakhir/override)
     for alias, num in MANUAL_ALIASES.items():
         # Bersihkan alias manual juga biar konsisten
         clean_alias = re.sub(r'[^a-z0-9]', '', alias)
-        SURAH_NAME_TO_NUMBER[clean_alias] = num
-    print(f"INFO:    Berhasil memuat {len(SURAH_NAME_TO_NUMBER)} alias nama Surah.")
+        name_to_number[clean_alias] = num
+
+    message_router = MessageRouter.from_surahs(surahs_data, MANUAL_ALIASES)
+
+    build_surah_list_response(surahs_data)
+    SURAH_LIST, SURAH_NAME_TO_NUMBER, SURAH_NUMBER_TO_NAME = surahs_data, name_to_number, number_to_name
+    MESSAGE_ROUTER = message_router
+    logger.info(f"Berhasil memuat {len(SURAH_NAME_TO_NUMBER)} alias nama Surah.")
+
+# --- 7. Cache Jawaban RAG ---
+# ANSWER_CACHE_BACKEND  : "memory" (default) atau "sqlite"
+# ANSWER_CACHE_PATH     : lokasi file SQLite (jika backend sqlite)
+# ANSWER_CACHE_TTL      : umur jawaban dalam detik
+# ANSWER_CACHE_SIMILARITY : opsional, ambang cosine (misal 0.95) untuk pertanyaan yang mirip
+# (embedder dipasang oleh load_embedding_model setelah model siap)
+try:
+    cache_ttl = float(os.environ.get("ANSWER_CACHE_TTL", 86400))
+    if os.environ.get("ANSWER_CACHE_BACKEND", "memory") == "sqlite":
+        cache_backend = SQLiteBackend(os.environ.get("ANSWER_CACHE_PATH", "answer_cache.sqlite3"), ttl=cache_ttl)
+    else:
+        cache_backend = MemoryBackend(ttl=cache_ttl)
+    similarity = os.environ.get("ANSWER_CACHE_SIMILARITY")
+    ANSWER_CACHE = AnswerCache(
+        cache_backend,
+        embedder=None,
+        similarity_threshold=float(similarity) if similarity else None
+    )
+    logger.info(f"Cache jawaban RAG aktif ({type(cache_backend).__name__}).")
 except Exception as e:
-    print(f"!!! ERROR FATAL: Gagal memuat peta nama Surah: {e} !!!")
+    ANSWER_CACHE = None
+    logger.warning(f"Gagal menyiapkan cache jawaban RAG: {e}")
+
+# --- 8. Daftar Subsistem ---
+# Wajib (menentukan /readyz): data untuk endpoint non-RAG. Sisanya boleh menyusul.
+READINESS.register("surahs", load_surah_names)
+READINESS.register("verses", load_verse_store)
+READINESS.register("search", load_search_data)
+READINESS.register("groq", load_groq_client, required=False)
+READINESS.register("embedding", connect_embedding_sidecar if EMBEDDING_SIDECAR_SOCKET else load_embedding_model, required=False)
+READINESS.register("faiss", load_faiss_index, required=False)
+READINESS.register("related", load_related_verses, required=False)
+CORE_SUBSYSTEMS = ("surahs", "verses", "search", "groq", "related")
+ML_SUBSYSTEMS = ("embedding", "faiss")
+
+def require_ready(*names: str):
+    """
+    503 + Retry-After jika salah satu subsistem masih dimuat (model ML yang belum
+    dimulai ikut dimulai di sini). Subsistem yang GAGAL tidak ditolak di sini:
+    endpoint tetap memakai jalur cadangan / pesan error lamanya.
+    """
+    READINESS.ensure_started(*names)
+    loading = READINESS.unsettled(*names)
+    if loading:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Server masih memuat data ({', '.join(loading)}). Coba lagi sebentar.",
+            headers={"Retry-After": "5"}
+        )
 
 # =====================================================================
 # === AKHIR BLOK STARTUP ===
 # =====================================================================
 
+# === ETAG & CACHE-CONTROL UNTUK DATA YANG (HAMPIR) TIDAK PERNAH BERUBAH ===
+# Data hanya berubah saat build_index.py dijalankan ulang (dan server di-restart)
+STATIC_CACHE_CONTROL = "public, max-age=86400, stale-while-revalidate=604800"
+
+def dump_json_bytes(payload) -> bytes:
+    # Sama dengan serialisasi JSONResponse milik FastAPI/Starlette
+    return json.dumps(payload, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Cek header If-None-Match (boleh daftar, boleh W/, boleh '*')."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag in candidates
+
+def make_request_etag(request: Request, version: str | None = None) -> str | None:
+    """
+    ETag kuat per URL, berdasarkan versi data (default: DATA_VERSION dari build_index.py).
+    None jika versi data tidak diketahui.
+    """
+    version = DATA_VERSION if version is None else version
+    if version is None:
+        return None
+    raw = f"{version}|{request.url.path}?{request.url.query}"
+    return f'"{hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]}"'
 
-def normalize_arabic(text: str) -> str:
+def cached_json_response(request: Request, etag: str | None, build_payload) -> Response | dict:
     """
-    Fungsi Normalisasi Master BARU.
-    Sinkron dengan normalizeArabicJS di frontend.
+    Mengembalikan 304 jika klien sudah punya versi yang sama (payload tidak dibuat sama sekali),
+    atau payload JSON dengan ETag & Cache-Control panjang.
+    Tanpa etag, payload dikembalikan apa adanya.
     """
-    try:
-        # 1. Hapus Harakat, Dagger Alif, Annotations, Alif Wasl, Madda
-        text = re.sub(r'[\u064B-\u065F\u0610-\u061A\u0670\u0671\u0653]', '', text)
-        
-        # 2. Hapus Tatweel
-        text = re.sub(r'\u0640', '', text)
-        
-        # 3. Normalisasi Alif (أ, إ, آ -> ا)
-        text = re.sub(r'[\u0622\u0623\u0625]', '\u0627', text)
-        
-        # 4. Normalisasi Ya (ى -> ي)
-        text = re.sub(r'\u0649', '\u064A', text)
-        
-        # 5. Normalisasi Ta Marbuta (ة -> ه)
-        text = re.sub(r'\u0629', '\u0647', text)
+    if etag is None:
+        return build_payload()
+    headers = {"ETag": etag, "Cache-Control": STATIC_CACHE_CONTROL}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    payload = build_payload()
+    body = payload if isinstance(payload, bytes) else dump_json_bytes(payload)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@app.get("/surahs")
+async def get_surah_list(request: Request):
+    """Daftar 114 surah (format sama dengan API /surah), dari snapshot lokal."""
+    require_ready("surahs")
+    if not SURAH_LIST_BODY:
+        raise HTTPException(status_code=503, detail="Daftar surah belum tersedia.")
+    return cached_json_response(request, SURAH_LIST_ETAG, lambda: SURAH_LIST_BODY)
+
 
-        # 6. Hapus semua sisa non-huruf Arab dan non-spasi
-        text = re.sub(r'[^\u0621-\u064A\s]', '', text)
-        
-        # 7. Hapus spasi berlebih
-        text = re.sub(r'\s+', ' ', text).strip()
-        
-        return text
-    except Exception as e:
-        print(f"Error normalisasi teks: {e}")
-        return text
-    
 def get_surah_number_from_name(name: str) -> int | None:
     """Mengubah string nama surah menjadi nomor surah."""
     # Normalisasi input (lowercase, hapus strip, hapus spasi)
@@ -203,236 +602,665 @@ def get_surah_number_from_name(name: str) -> int | None:
         
     # return None # Tidak ditemukan
 
+def get_arabic_candidates(query_normalized: str, min_score: int) -> set[int]:
+    """
+    Mengembalikan posisi ayat (di QURAN_VERSE_LIST) yang mungkin lolos skor lafadz.
+    Jika indeks gagal dibuat, semua ayat dianggap kandidat (perilaku lama).
+    """
+    if not query_normalized:
+        return set() # Kueri tanpa huruf Arab (misal "sabar") selalu skor 0
+    if ARABIC_NGRAM_INDEX is None:
+        return set(range(len(QURAN_VERSE_LIST)))
+    return set(ARABIC_NGRAM_INDEX.candidates(query_normalized, min_score).tolist())
+
+def get_text_hits(index: PhraseIndex | None, field: str, query_lower: str) -> set[int]:
+    """
+    Mengembalikan posisi ayat yang field-nya (translation/tafsir) mengandung kueri.
+    Jika indeks gagal dibuat, kembali ke scan biasa.
+    """
+    if index is None:
+        return {i for i, verse in enumerate(QURAN_VERSE_LIST) if query_lower in verse[field].lower()}
+    return index.search(query_lower)
+
+# === AMBIL BANYAK AYAT SEKALIGUS (SURAH / RENTANG / JUZ / DAFTAR REF) ===
+# Semua dilayani dari data yang sudah dimuat (VERSE_STORE, atau QURAN_TEXT_MAP
+# sebagai cadangan), jadi satu surah cukup satu request lokal.
+VERSE_FIELDS = ("number", "meta", "text", "translation", "audio", "tafsir")
+MAX_BATCH_VERSES = 1000
+
+def parse_verse_fields(fields) -> tuple[str, ...] | None:
+    """
+    Mengubah pilihan field ("text,translation" atau list) jadi tuple.
+    None = semua field. 'number' selalu ikut supaya ayat bisa dikenali.
+    """
+    if not fields:
+        return None
+    if isinstance(fields, str):
+        fields = fields.split(",")
+    selected = {field.strip() for field in fields if field.strip()}
+    unknown = selected - set(VERSE_FIELDS)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Field tidak dikenal: {', '.join(sorted(unknown))}. Pilihan: {', '.join(VERSE_FIELDS)}."
+        )
+    selected.add("number")
+    return tuple(field for field in VERSE_FIELDS if field in selected)
+
+def get_local_verse(surah_number: int, ayah_number: int, fields: tuple[str, ...] | None = None) -> dict | None:
+    """
+    Satu ayat dalam format API (tanpa info surah), atau None jika tidak ada.
+    Tanpa VERSE_STORE, dibentuk dari QURAN_TEXT_MAP (hanya teks, terjemahan & tafsir).
+    """
+    verse_ref = f"{surah_number}:{ayah_number}"
+    if VERSE_STORE:
+        verse = VERSE_STORE.get(verse_ref)
+        if verse is None:
+            return None
+    elif verse_ref in QURAN_TEXT_MAP:
+        text_data = QURAN_TEXT_MAP[verse_ref]
+        verse = {
+            "number": {"inSurah": ayah_number},
+            "text": {"arab": text_data["text_arab"]},
+            "translation": {"id": text_data["translation"]},
+            "tafsir": {"id": {"long": text_data["tafsir"]}}
+        }
+    else:
+        return None
+
+    if fields is None:
+        return {key: value for key, value in verse.items() if key != "surah"}
+    return {key: verse[key] for key in fields if key in verse}
+
+def get_local_verse_range(surah_number: int, ayah_start: int, ayah_end: int | None, fields) -> list[dict]:
+    """Ayat ayah_start..ayah_end (inklusif) dalam satu surah; ayah_end=None berarti sampai akhir surah."""
+    verses = []
+    ayah_number = ayah_start
+    while ayah_end is None or ayah_number <= ayah_end:
+        verse = get_local_verse(surah_number, ayah_number, fields)
+        if verse is None:
+            break
+        verses.append(verse)
+        ayah_number += 1
+    return verses
+
+def has_local_verses() -> bool:
+    # Selama data masih dimuat, anggap belum ada: jangan sampai payload dari data
+    # cadangan (QURAN_TEXT_MAP) di-cache klien dengan ETag yang sama dengan data lengkap
+    if READINESS.unsettled("verses", "search"):
+        return False
+    return bool(VERSE_STORE) or len(QURAN_TEXT_MAP) > 0
+
+def has_full_verse_store() -> bool:
+    """
+    Payload lengkap format API (info surah + transliterasi, audio, dll) tersedia.
+    Data cadangan QURAN_TEXT_MAP hanya berisi teks/terjemahan/tafsir, tidak cukup
+    untuk endpoint yang klien harapkan formatnya sama persis dengan API.
+    """
+    if READINESS.unsettled("verses"):
+        return False
+    return bool(VERSE_STORE) and bool(SURAH_INFO)
+
+def get_surah_summary(surah_number: int) -> dict:
+    """Info surah tanpa daftar ayat (dari SURAH_INFO, atau seadanya jika tidak ada)."""
+    if surah_number in SURAH_INFO:
+        return SURAH_INFO[surah_number]
+    verse_count = 0
+    while f"{surah_number}:{verse_count + 1}" in QURAN_TEXT_MAP:
+        verse_count += 1
+    return {
+        "number": surah_number,
+        "numberOfVerses": verse_count,
+        "name": {"transliteration": {"id": SURAH_NUMBER_TO_NAME.get(surah_number, "Unknown")}}
+    }
+
+@app.get("/surah/{surah_number}")
+async def get_surah(request: Request, surah_number: int, fields: str | None = None):
+    """Satu surah lengkap (info surah + semua ayat), format sama dengan API /surah/{s}."""
+    selected_fields = parse_verse_fields(fields)
+
+    # Tanpa quran_verse_store.json payload lokal tidak lengkap (tanpa revelation,
+    # transliterasi, audio), jadi tetap pakai API eksternal seperti sebelumnya
+    if has_full_verse_store():
+        def build_payload():
+            verses = get_local_verse_range(surah_number, 1, None, selected_fields)
+            if not verses:
+                raise HTTPException(status_code=404, detail=f"Surah {surah_number} tidak ditemukan.")
+            return {
+                "code": 200,
+                "status": "OK.",
+                "message": "Success fetching surah.",
+                "data": {**get_surah_summary(surah_number), "verses": verses}
+            }
+        return cached_json_response(request, make_request_etag(request), build_payload)
+
+    # Cadangan: belum ada data lokal lengkap, pakai API eksternal
+    try:
+        response = await QURAN_API.get_json(f"/surah/{surah_number}")
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=404, detail=f"Gagal mengambil data atau data tidak ditemukan: {e}")
+    if selected_fields is None:
+        return response
+    data = response["data"]
+    verses = [{key: verse[key] for key in selected_fields if key in verse} for verse in data.get("verses", [])]
+    return {**response, "data": {**data, "verses": verses}}
+
+# Harus dideklarasikan SEBELUM /surah/{surah_number}/{ayah_number}, kalau tidak "1-5" ditangkap route itu
+@app.get("/surah/{surah_number}/{ayah_start:int}-{ayah_end:int}")
+async def get_ayah_range(request: Request, surah_number: int, ayah_start: int, ayah_end: int, fields: str | None = None):
+    """Rentang ayat dalam satu surah, misal /surah/2/255-257."""
+    if ayah_start < 1 or ayah_end < ayah_start:
+        raise HTTPException(status_code=400, detail="Rentang ayat tidak valid.")
+    if ayah_end - ayah_start + 1 > MAX_BATCH_VERSES:
+        raise HTTPException(status_code=400, detail=f"Maksimal {MAX_BATCH_VERSES} ayat per request.")
+    require_ready("verses", "search")
+    if not has_local_verses():
+        raise HTTPException(status_code=503, detail="Data ayat lokal belum tersedia.")
+
+    selected_fields = parse_verse_fields(fields)
+
+    def build_payload():
+        verses = get_local_verse_range(surah_number, ayah_start, ayah_end, selected_fields)
+        if not verses:
+            raise HTTPException(status_code=404, detail=f"Ayat {surah_number}:{ayah_start}-{ayah_end} tidak ditemukan.")
+        return {
+            "code": 200,
+            "status": "OK.",
+            "message": "Success fetching ayah range.",
+            "data": {
+                "surah": get_surah_summary(surah_number),
+                "verses": verses
+            }
+        }
+    return cached_json_response(request, make_request_etag(request), build_payload)
+
+@app.get("/juz/{juz_number}")
+async def get_juz(request: Request, juz_number: int, fields: str | None = None):
+    """Semua ayat dalam satu juz, dikelompokkan per surah (butuh quran_verse_store.json)."""
+    selected_fields = parse_verse_fields(fields)
+    require_ready("verses")
+    if not JUZ_REFS:
+        raise HTTPException(status_code=503, detail="Data juz belum tersedia. Jalankan build_index.py.")
+    verse_refs = JUZ_REFS.get(juz_number)
+    if not verse_refs:
+        raise HTTPException(status_code=404, detail=f"Juz {juz_number} tidak ditemukan.")
+
+    def build_payload():
+        surahs = []
+        for verse_ref in verse_refs:
+            surah_number, ayah_number = (int(part) for part in verse_ref.split(":"))
+            if not surahs or surahs[-1]["surah"]["number"] != surah_number:
+                surahs.append({"surah": get_surah_summary(surah_number), "verses": []})
+            surahs[-1]["verses"].append(get_local_verse(surah_number, ayah_number, selected_fields))
+        return {
+            "code": 200,
+            "status": "OK.",
+            "message": "Success fetching juz.",
+            "data": {"juz": juz_number, "surahs": surahs}
+        }
+    return cached_json_response(request, make_request_etag(request), build_payload)
+
+def parse_verse_ref(verse_ref: str) -> tuple[int, int, int]:
+    """'2:255' -> (2, 255, 255), '1:1-7' -> (1, 1, 7)."""
+    try:
+        surah_part, ayah_part = verse_ref.strip().split(":")
+        ayah_start, _, ayah_end = ayah_part.partition("-")
+        surah_number, ayah_start = int(surah_part), int(ayah_start)
+        ayah_end = int(ayah_end) if ayah_end else ayah_start
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Referensi ayat tidak valid: '{verse_ref}'.")
+    if ayah_start < 1 or ayah_end < ayah_start:
+        raise HTTPException(status_code=400, detail=f"Referensi ayat tidak valid: '{verse_ref}'.")
+    return surah_number, ayah_start, ayah_end
+
+@app.post("/verses")
+async def get_verses_batch(request: VerseBatchRequest):
+    """
+    Banyak ayat sekaligus dari daftar referensi, urutan hasil = urutan permintaan.
+    Referensi yang tidak ada dikembalikan di 'missing', bukan error.
+    """
+    selected_fields = parse_verse_fields(request.fields)
+    parsed_refs = [parse_verse_ref(verse_ref) for verse_ref in request.refs]
+    if sum(ayah_end - ayah_start + 1 for _, ayah_start, ayah_end in parsed_refs) > MAX_BATCH_VERSES:
+        raise HTTPException(status_code=400, detail=f"Maksimal {MAX_BATCH_VERSES} ayat per request.")
+    require_ready("verses", "search")
+    if not has_local_verses():
+        raise HTTPException(status_code=503, detail="Data ayat lokal belum tersedia.")
+
+    verses = []
+    missing = []
+    for surah_number, ayah_start, ayah_end in parsed_refs:
+        for ayah_number in range(ayah_start, ayah_end + 1):
+            verse = get_local_verse(surah_number, ayah_number, selected_fields)
+            if verse is None:
+                missing.append(f"{surah_number}:{ayah_number}")
+            else:
+                verses.append({"ref": f"{surah_number}:{ayah_number}", **verse})
+    return {
+        "code": 200,
+        "status": "OK.",
+        "message": "Success fetching verses.",
+        "data": verses,
+        "missing": missing
+    }
+
 # Endpoint pertama: mendapatkan detail ayat sepsifik
 @app.get("/surah/{surah_number}/{ayah_number}")
-def get_spesific_ayah(surah_number: int, ayah_number: int):
-    #membentuk URL lengkap untuk direquest
-    url = f"{QURAN_API_BASE_URL}/surah/{surah_number}/{ayah_number}"
+async def get_spesific_ayah(surah_number: int, ayah_number: int):
+    # Jalur cepat: ambil dari penyimpanan lokal (tanpa jaringan)
+    if VERSE_STORE:
+        verse_data = VERSE_STORE.get(f"{surah_number}:{ayah_number}")
+        if verse_data is None:
+            raise HTTPException(status_code=404, detail=f"Ayat {surah_number}:{ayah_number} tidak ditemukan.")
+        return {
+            "code": 200,
+            "status": "OK.",
+            "message": "Success fetching ayah.",
+            "data": verse_data
+        }
 
+    # Cadangan: jika penyimpanan lokal belum dibuat, pakai API eksternal
     try:
-        # Mengirim request dari Quran API
-        response = requests.get(url)
-        response.raise_for_status() #Akan error jika status code bukan 2xx
-
-        # Mengambil data JSON dari respons
-        data = response.json()
-        return data
+        # Mengirim request ke Quran API (lewat pool + cache bersama)
+        # Akan error jika status code bukan 2xx
+        return await QURAN_API.get_json(f"/surah/{surah_number}/{ayah_number}")
     
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         #Jika gagal, akan terkirim pesan error yang jelas
         raise HTTPException(status_code=404, detail=f"Gagal mengambil data atau data tidak ditemukan: {e}")
 
-# === ENDPOINT GLOBAL BARU (VERSI UPGRADE) ===
-@app.get("/search")
-def search_global(q: str):
+MAX_RELATED_LIMIT = 50
+
+@app.get("/surah/{surah_number}/{ayah_number}/related")
+async def get_related_verses(request: Request, surah_number: int, ayah_number: int, limit: int = Query(10, ge=1, le=MAX_RELATED_LIMIT)):
     """
-    Endpoint "Otak" yang menangani semua jenis pencarian.
-    - Pola "Surah 2 Ayat 255"
-    - Pola "2:255" atau "2 255"
-    - Pola "al-baqarah:255" atau "al baqarah 255"
-    - Pola "Surah Al-Mulk"
-    - Pola "sabar" (teks Indo)
-    - Pola "بسم الله" (teks Arab)
+    Ayat-ayat yang maknanya paling mirip (terjemahan + tafsir), dari tabel tetangga
+    yang dihitung build_vector_db.py. Hanya lookup array, tanpa model/FAISS.
     """
-    query = q.strip()
+    require_ready("related", "search")
+    if RELATED_IDS is None:
+        raise HTTPException(status_code=503, detail="Data ayat terkait belum tersedia. Jalankan build_vector_db.py.")
+    verse_ref = f"{surah_number}:{ayah_number}"
+    row = RELATED_ROWS.get(verse_ref)
+    if row is None:
+        raise HTTPException(status_code=404, detail=f"Ayat {verse_ref} tidak ditemukan.")
+
+    def build_payload():
+        related = []
+        for related_row, score in zip(RELATED_IDS[row, :limit].tolist(), RELATED_SCORES[row, :limit].tolist()):
+            related_ref = RELATED_REFS[related_row]
+            related_surah, related_ayah = (int(part) for part in related_ref.split(":"))
+            item = {
+                "surah": related_surah,
+                "ayah": related_ayah,
+                "surah_name": SURAH_NUMBER_TO_NAME.get(related_surah, 'Unknown'),
+                "score": round(score, 4)
+            }
+            if related_ref in QURAN_TEXT_MAP:
+                text_data = QURAN_TEXT_MAP[related_ref]
+                item["text_arab"] = text_data["text_arab"]
+                item["translation"] = text_data["translation"]
+            related.append(item)
+        return {
+            "code": 200,
+            "status": "OK.",
+            "message": "Success fetching related verses.",
+            "data": {"surah": surah_number, "ayah": ayah_number, "related": related}
+        }
+
+    # Isi respons bergantung pada data ayat (build_index.py) DAN tabel tetangga (build_vector_db.py)
+    etag = make_request_etag(request, f"{DATA_VERSION}|{RELATED_VERSION}") if DATA_VERSION and RELATED_VERSION else None
+    return cached_json_response(request, etag, build_payload)
+
+def full_text_search(query: str, k: int) -> TopKMatches:
+    """
+    Pola 2: mencari kueri di terjemahan, tafsir, dan lafadz Arab semua ayat.
+    Hanya k hasil terbaik yang disimpan (heap), dan scan berhenti lebih awal
+    jika sudah ada k hasil terjemahan (skor 100, skor maksimal).
+    """
+    # Normalisasi kueri
+    query_norm_arab = normalize_arabic(query)
+    query_lower_indo = query.lower()
     
-    # === Pola 1: Pencarian Ayat Spesifik (di-upgrade) ===
+    top_matches = TopKMatches(k)
+    
+    MIN_ARABIC_SCORE = 95 
+
+    # Ambil hit terjemahan/tafsir dari indeks kata, dan kandidat lafadz dari indeks trigram
+    translation_hits = get_text_hits(TRANSLATION_INDEX, "translation", query_lower_indo)
+    tafsir_hits = get_text_hits(TAFSIR_INDEX, "tafsir", query_lower_indo)
+    arabic_candidates = get_arabic_candidates(query_norm_arab, MIN_ARABIC_SCORE)
+
+    # Skor lafadz dinilai sekaligus (batch native, semua core) sebelum scan.
+    # Ayat setelah hit terjemahan ke-k tidak perlu dinilai: scan pasti sudah berhenti di sana
+    sorted_translation_hits = sorted(translation_hits)
+    last_needed = sorted_translation_hits[k - 1] if len(sorted_translation_hits) >= k else len(QURAN_VERSE_LIST)
+    arabic_pending = [idx for idx in sorted(arabic_candidates - translation_hits - tafsir_hits) if idx <= last_needed]
+    arabic_scores = dict(FUZZY_SCORER.iter_matches(query_norm_arab, arabic_pending, MIN_ARABIC_SCORE))
     
+    # Urutan tetap mengikuti urutan mushaf, sama seperti scan lama
+    for verse_idx in sorted(translation_hits | tafsir_hits | arabic_candidates):
+        score = 0
+        match_type = ""
+        
+        if verse_idx in translation_hits:
+            score = 100
+            match_type = "translation"
+        
+        elif verse_idx in tafsir_hits:
+            score = 99 
+            match_type = "tafsir"
+            
+        elif verse_idx in arabic_scores:
+            score = arabic_scores[verse_idx]
+            match_type = "lafadz"
+        
+        if score > 0:
+            top_matches.push(score, verse_idx, match_type)
+            if top_matches.is_settled:
+                break # Hasil k teratas sudah pasti, sisa ayat tidak perlu dicek
+
+    return top_matches
+
+def build_text_match(verse_idx: int, score: int, match_type: str) -> dict:
+    """Membentuk satu item hasil Pola 2 (hanya untuk item yang benar-benar dikirim)."""
+    verse = QURAN_VERSE_LIST[verse_idx]
+    return {
+        "surah": verse["surah"],
+        "ayah": verse["ayah"],
+        "text_arab": verse["text_arab"],
+        "translation": verse["translation"],
+        "surah_name": SURAH_NUMBER_TO_NAME.get(verse['surah'], 'Unknown'),
+        "score": score,
+        "match_type": match_type
+    }
+
+# === PAGINATION HASIL PENCARIAN ===
+MAX_SEARCH_LIMIT = 200
+
+def encode_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"offset": offset}).encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        offset = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))["offset"]
+        if not isinstance(offset, int) or offset < 0:
+            raise ValueError(offset)
+        return offset
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor tidak valid.")
+
+def paginate(top_matches: TopKMatches, offset: int, limit: int, build_item) -> dict:
+    """
+    Memotong hasil peringkat menjadi satu halaman.
+    `total` hanya diisi jika scan selesai (tidak berhenti lebih awal).
+    """
+    ranked = top_matches.ranked()
+    page = [build_item(verse_idx, score, payload) for score, verse_idx, payload in ranked[offset:offset + limit]]
+    has_more = len(ranked) > offset + limit
+    return {
+        "match_type": "multiple",
+        "results": page,
+        "offset": offset,
+        "limit": limit,
+        "has_more": has_more,
+        "next_cursor": encode_cursor(offset + limit) if has_more else None,
+        "total": None if top_matches.is_settled else top_matches.count
+    }
+
+# === HEALTH & READINESS ===
+@app.get("/healthz")
+def get_health():
+    """Liveness: proses hidup. Selalu 200, berisi status tiap subsistem."""
+    return {
+        "status": "ok",
+        "uptime_seconds": round(time.monotonic() - READINESS.started_at, 1),
+        "subsystems": READINESS.snapshot()
+    }
+
+@app.get("/readyz")
+def get_readiness(response: Response, full: bool = False):
+    """
+    Readiness: 200 jika semua subsistem wajib (surahs, verses, search) sudah selesai dimuat,
+    503 jika belum. full=true ikut menunggu model RAG & FAISS.
+    Subsistem yang gagal tetap dihitung selesai (endpoint memakai jalur cadangan), tercantum di 'degraded'.
+    """
+    snapshot = READINESS.snapshot()
+    ready = not READINESS.unsettled() if full else READINESS.required_settled()
+    if not ready:
+        response.status_code = 503
+    return {
+        "ready": ready,
+        "degraded": [name for name, info in snapshot.items() if info["state"] == "failed"],
+        "subsystems": snapshot
+    }
+
+# === METRIK (format Prometheus) ===
+@app.get("/metrics")
+def get_metrics():
+    return Response(content=render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@dataclass
+class SearchRoute:
+    """Hasil routing /search: "ayah" (Pola 1), "surah" (Pola 1.5), atau "text" (Pola 2)."""
+    kind: str
+    surah: int | None = None
+    ayah: int | None = None
+    pattern: str = "2"
+
+def route_search_query(query: str) -> SearchRoute:
+    """
+    Menentukan pola kueri /search (tanpa I/O, cukup regex + peta nama surah):
+    - Pola 1A "Surah 2 Ayat 255", 1B "2:255" / "2 255", 1C "al-baqarah:255" / "al baqarah 255"
+    - Pola 1.5 "Surah Al-Mulk"
+    - Pola 2 sisanya (teks Indo/Arab)
+    """
+    # === Pola 1: Pencarian Ayat Spesifik (di-upgrade) ===
+
     # Pola A: "Surah 2 Ayat 255" (Natural Language)
     # re.IGNORECASE membuatnya tidak peduli huruf besar/kecil
     match_natural = re.match(r'^(surah|surat)\s+(\d+)\s+(ayat)\s+(\d+)$', query, re.IGNORECASE)
     if match_natural:
-        try:
-            surah_number = int(match_natural.group(2)) # Ambil angka surah
-            ayah_number = int(match_natural.group(4))  # Ambil angka ayat
-            print(f"INFO: Pola 1A (Natural) terdeteksi: {surah_number}:{ayah_number}")
-            return get_spesific_ayah(surah_number, ayah_number)
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error mengambil ayat: {e}")
+        route = SearchRoute("ayah", int(match_natural.group(2)), int(match_natural.group(4)), "1A")
+        logger.debug("Pola 1A (Natural) terdeteksi", extra={"surah": route.surah, "ayah": route.ayah})
+        return route
 
     # Pola B: "2:255" atau "2 255" (Hanya Angka)
     # [:\s]+ artinya separator bisa berupa ":" atau spasi (atau keduanya)
     match_num_num = re.match(r'^(\d+)[:\s]+(\d+)$', query)
     if match_num_num:
-        try:
-            surah_number = int(match_num_num.group(1))
-            ayah_number = int(match_num_num.group(2))
-            print(f"INFO: Pola 1B (Num-Num) terdeteksi: {surah_number}:{ayah_number}")
-            return get_spesific_ayah(surah_number, ayah_number)
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error mengambil ayat: {e}")
+        route = SearchRoute("ayah", int(match_num_num.group(1)), int(match_num_num.group(2)), "1B")
+        logger.debug("Pola 1B (Num-Num) terdeteksi", extra={"surah": route.surah, "ayah": route.ayah})
+        return route
 
     # Pola C: "al-fatihah:7" atau "al fatihah 7" (Nama Surah + Angka)
     match_name_num = re.match(r'^(.*?)[:\s]+(\d+)$', query)
     if match_name_num:
         surah_part = match_name_num.group(1).strip()
         ayah_part = int(match_name_num.group(2))
-        
+
         # Gunakan helper kita untuk mengubah "al fatihah" menjadi 1
-        surah_number = get_surah_number_from_name(surah_part) 
-            
+        surah_number = get_surah_number_from_name(surah_part)
         if surah_number:
-            try:
-                print(f"INFO: Pola 1C (Name-Num) terdeteksi: {surah_number}:{ayah_part}")
-                return get_spesific_ayah(surah_number, ayah_part)
-            except HTTPException as e:
-                raise e # Lemparkan error jika ayat tidak ada
-            except Exception as e:
-                raise HTTPException(status_code=500, detail=f"Error mengambil ayat: {e}")
-        else:
-            # Jika nama surah tidak ditemukan, kita biarkan jatuh ke Pola 2
-            print(f"INFO: Pola 1C gagal, '{surah_part}' bukan nama surah. Jatuh ke Pola 2.")
-            pass
+            logger.debug("Pola 1C (Name-Num) terdeteksi", extra={"surah": surah_number, "ayah": ayah_part})
+            return SearchRoute("ayah", surah_number, ayah_part, "1C")
+        # Jika nama surah tidak ditemukan, kita biarkan jatuh ke Pola 2
+        logger.debug("Pola 1C gagal, bukan nama surah. Jatuh ke Pola 2.")
 
     # === Pola 1.5: Pencarian "Nama Surah Saja" ===
-    
+
     # Bersihkan awalan "surah"/"surat" dulu
     clean_q = re.sub(r'^(surah|surat)\s+', '', query, flags=re.IGNORECASE).strip()
-    
     surah_number_match = get_surah_number_from_name(clean_q)
-    
     if surah_number_match:
-        print(f"INFO: Pola 1.5 (Nama Surah) terdeteksi: {clean_q} -> {surah_number_match}")
-        
+        logger.debug("Pola 1.5 (Nama Surah) terdeteksi", extra={"surah": surah_number_match})
+        return SearchRoute("surah", surah_number_match, pattern="1.5")
+
+    logger.debug("Tidak ada pola cocok, memakai Full-Text Search", extra={"query_chars": len(query)})
+    return SearchRoute("text")
+
+# === ENDPOINT GLOBAL BARU (VERSI UPGRADE) ===
+@app.get("/search")
+async def search_global(
+    q: str,
+    limit: int = Query(50, ge=1, le=MAX_SEARCH_LIMIT),
+    offset: int = Query(0, ge=0),
+    cursor: str | None = None
+):
+    """
+    Endpoint "Otak" yang menangani semua jenis pencarian.
+    - Pola "Surah 2 Ayat 255"
+    - Pola "2:255" atau "2 255"
+    - Pola "al-baqarah:255" atau "al baqarah 255"
+    - Pola "Surah Al-Mulk"
+    - Pola "sabar" (teks Indo)
+    - Pola "بسم الله" (teks Arab)
+    Hasil Pola 2 dipaginasi dengan limit/offset, atau cursor dari `next_cursor`.
+    """
+    query = q.strip()
+    require_ready("surahs", "search")
+
+    with stage_timer("routing"):
+        route = route_search_query(query)
+
+    if route.kind == "ayah":
+        try:
+            return await get_spesific_ayah(route.surah, route.ayah)
+        except HTTPException as e:
+            raise e # Lemparkan error jika ayat tidak ada
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error mengambil ayat: {e}")
+
+    if route.kind == "surah":
         # KITA KEMBALIKAN FORMAT SPESIAL UNTUK REDIRECT
         return {
             "match_type": "single_surah", # Tipe baru!
             "data": {
                 "surah": {
-                    "number": surah_number_match,
-                    "name": SURAH_NUMBER_TO_NAME.get(surah_number_match)
+                    "number": route.surah,
+                    "name": SURAH_NUMBER_TO_NAME.get(route.surah)
                 }
             }
         }
 
     # === Pola 2: Pencarian Teks (Full-Text Search) ===
     # Jika tidak ada pola di atas yang cocok, baru jalankan ini
-    print(f"INFO: Tidak ada pola cocok. Melakukan Full-Text Search untuk: '{query}'")
-    
-    # Normalisasi kueri
-    query_norm_arab = normalize_arabic(query)
-    query_lower_indo = query.lower()
-    
-    matches = []
-    found_ids = set() 
-    
-    MIN_ARABIC_SCORE = 95 
-    
-    for verse in QURAN_TEXT_MAP.values():
-        verse_id = f"{verse['surah']}:{verse['ayah']}"
-        if verse_id in found_ids:
-            continue 
+    if cursor:
+        offset = decode_cursor(cursor)
 
-        score = 0
-        match_type = ""
-        
-        if query_lower_indo in verse["translation"].lower():
-            score = 100
-            match_type = "translation"
-        
-        elif query_lower_indo in verse["tafsir"].lower():
-            score = 99 
-            match_type = "tafsir"
-            
-        else:
-            arabic_score = fuzz.partial_ratio(query_norm_arab, verse["text_normalized"])
-            if arabic_score >= MIN_ARABIC_SCORE:
-                score = arabic_score
-                match_type = "lafadz"
-        
-        if score > 0:
-            matches.append({
-                "surah": verse["surah"],
-                "ayah": verse["ayah"],
-                "text_arab": verse["text_arab"],
-                "translation": verse["translation"],
-                "surah_name": SURAH_NUMBER_TO_NAME.get(verse['surah'], 'Unknown'),
-                "score": score,
-                "match_type": match_type
-            })
-            found_ids.add(verse_id)
-
-    if not matches:
+    # Scan korpus berat di CPU -> jalankan di threadpool agar event loop tetap bebas
+    # +1 supaya kita tahu masih ada halaman berikutnya atau tidak
+    with stage_timer("scan"):
+        top_matches = await run_in_threadpool(full_text_search, query, offset + limit + 1)
+
+    if top_matches.count == 0:
         raise HTTPException(status_code=404, detail="Tidak ada hasil yang cocok ditemukan.")
-        
-    matches.sort(key=lambda x: x['score'], reverse=True)
     
+    return paginate(top_matches, offset, limit, build_text_match)
+
+
+def find_spoken_matches(spoken_text_normalized: str, min_score: int, k: int) -> TopKMatches:
+    """
+    Mencari ayat yang lafadznya cocok (skor >= min_score) dengan teks ucapan.
+    Hanya k hasil terbaik yang disimpan; scan berhenti jika sudah ada k skor 100.
+    """
+    top_matches = TopKMatches(k)
+    # Persempit dulu pakai indeks trigram, baru nilai kandidatnya dengan partial_ratio (batch, urut mushaf).
+    # skip_muqattaat: ayat huruf muqatta'at (الم) tidak dinilai jika ucapan jauh lebih panjang,
+    # supaya tidak jadi 'false positive' (الم cocok di dalam الملك)
+    candidates = sorted(get_arabic_candidates(spoken_text_normalized, min_score))
+    for verse_idx, current_score in FUZZY_SCORER.iter_matches(spoken_text_normalized, candidates, min_score, skip_muqattaat=True):
+        top_matches.push(current_score, verse_idx, None)
+        if top_matches.is_settled:
+            break
+
+    return top_matches
+
+def build_spoken_match(verse_idx: int, score: int, _payload=None) -> dict:
+    verse = QURAN_VERSE_LIST[verse_idx]
     return {
-        "match_type": "multiple",
-        "results": matches
+        "surah": verse["surah"],
+        "ayah": verse["ayah"],
+        "text_arab": verse["text_arab"], # Ambil teks asli
+        "score": score
     }
 
+def find_spoken_spans(spoken_text_normalized: str, min_score: int, k: int) -> TopKMatches:
+    """
+    Cadangan Pola lafadz: cari bacaan di seluruh mushaf (bisa menyambung antar ayat).
+    Setiap ayat yang dilewati bacaan jadi satu hasil, payload = bacaannya (SpanMatch).
+    """
+    top_matches = TopKMatches(k)
+    seen = set()
+    for span in MUSHAF_INDEX.find(spoken_text_normalized, min_score):
+        for verse_idx in span.verse_indices():
+            if verse_idx not in seen: # Satu ayat cukup sekali (bacaan dengan skor terbaik)
+                seen.add(verse_idx)
+                top_matches.push(span.score, verse_idx, span)
+    return top_matches
+
+def build_span_match(verse_idx: int, score: int, span: SpanMatch) -> dict:
+    return {**build_spoken_match(verse_idx, score), "match_type": "span", "span": span.to_dict()}
 
     # === ENDPOINT UNTUK VOICE SEARCH ===
 @app.post("/search-by-text")
-def search_by_text(request: VoiceSearchRequest):
+async def search_by_text(
+    request: VoiceSearchRequest,
+    limit: int = Query(50, ge=1, le=MAX_SEARCH_LIMIT),
+    offset: int = Query(0, ge=0),
+    cursor: str | None = None
+):
+    require_ready("search")
     if not QURAN_TEXT_MAP.values():
         raise HTTPException(status_code=500, detail="Indeks pencarian Qur'an tidak bisa dimuat.")
 
-    spoken_text_normalized = normalize_arabic(request.text)
+    with stage_timer("normalize"):
+        spoken_text_normalized = normalize_arabic(request.text)
 
     # === LOGIKA PENCARIAN BARU ===
 
-    # Kita tidak lagi mencari 'best_score', tapi 'semua skor bagus'
-    matches = []
-
     # Skor minimal untuk dianggap sebagai kecocokan (sangat tinggi)
     MIN_CONFIDENCE_SCORE = 95 
 
-    print("-" * 30)
-    print(f"==> Menerima Teks: {request.text}")
-    print(f"==> Teks Normalisasi: {spoken_text_normalized}")
-    print("==> Memulai Pencarian... (Mencari skor >= {MIN_CONFIDENCE_SCORE}%)")
-
-    for verse in QURAN_TEXT_MAP.values():
-        # Bandingkan dengan 'text_normalized' yang baru
-        verse_text_normalized = verse["text_normalized"]
-
-        # Kita tetap pakai partial_ratio, sangat bagus untuk ucapan
-        current_score = fuzz.partial_ratio(spoken_text_normalized, verse_text_normalized)
-        
-        # =======================================================
-        # === FILTER UNTUK HURUFUL MUQATTA'AT ===
-
-        # Cek apakah teks indeks sangat pendek DAN tidak ada spasi
-        is_muqattaat_like = len(verse_text_normalized) < 10 and ' ' not in verse_text_normalized
-
-        # Cek apakah teks ucapan jauh lebih panjang
-        is_spoken_text_long = len(spoken_text_normalized) > (len(verse_text_normalized) * 2)
+    if cursor:
+        offset = decode_cursor(cursor)
 
-        # Jika ini adalah 'false positive' (الم cocok di dalam الملك)
-        if is_muqattaat_like and is_spoken_text_long:
-            current_score = 0 # Buang skor ini, jangan dilaporkan
+    # Kita tidak lagi mencari 'best_score', tapi 'semua skor bagus' (per halaman)
+    # Scan kandidat di threadpool agar event loop tetap bebas
+    with stage_timer("scan"):
+        top_matches = await run_in_threadpool(find_spoken_matches, spoken_text_normalized, MIN_CONFIDENCE_SCORE, offset + limit + 1)
 
-        # =======================================================
-
-        # Jika skornya lolos threshold, masukkan ke daftar
-        if current_score >= MIN_CONFIDENCE_SCORE:
-            matches.append({
-                "surah": verse["surah"],
-                "ayah": verse["ayah"],
-                "text_arab": verse["text_arab"], # Ambil teks asli
-                "score": current_score
-            })
-
-    print(f"==> Pencarian Selesai. Ditemukan {len(matches)} kecocokan.")
-    print("-" * 30)
+    logger.debug("Pencarian lafadz selesai", extra={
+        "text_chars": len(request.text),
+        "normalized_chars": len(spoken_text_normalized),
+        "min_score": MIN_CONFIDENCE_SCORE,
+        "matches": top_matches.count
+    })
 
     # --- Bagian Paling Penting: Mengembalikan Respons ---
 
-    if not matches:
+    if top_matches.count == 0 and MUSHAF_INDEX is not None:
+        # Tidak ada satu ayat pun yang cocok: mungkin bacaannya menyambung dari ayat ke ayat berikutnya
+        with stage_timer("span_search"):
+            span_matches = await run_in_threadpool(find_spoken_spans, spoken_text_normalized, MIN_CONFIDENCE_SCORE, offset + limit + 1)
+        if span_matches.count > 0:
+            # Selalu "multiple": tiap ayat yang dilewati bacaan ditampilkan, lengkap dengan awal/akhir bacaannya
+            return paginate(span_matches, offset, limit, build_span_match)
+
+    if top_matches.count == 0:
         # Jika tidak ada yang cocok sama sekali
         raise HTTPException(status_code=404, detail="Ayat yang Anda ucapkan tidak ditemukan.")
 
-    elif len(matches) == 1:
+    elif top_matches.count == 1 and offset == 0:
         # --- KASUS 1: HANYA ADA 1 HASIL ---
         # Ini adalah kasus normal (misal: Al-Mulk 18)
         # Kita panggil endpoint lama untuk dapat data LENGKAP (termasuk tafsir)
-        match = matches[0]
+        score, verse_idx, _ = top_matches.ranked()[0]
+        match = build_spoken_match(verse_idx, score)
         try:
             # Kita ubah formatnya agar SAMA dengan respons 'get_spesific_ayah'
             # Ini PENTING agar frontend tidak bingung
-            full_ayat_data = get_spesific_ayah(match["surah"], match["ayah"])
+            full_ayat_data = await get_spesific_ayah(match["surah"], match["ayah"])
             return full_ayat_data
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Gagal mengambil detail ayat: {e}")
@@ -441,67 +1269,26 @@ def search_by_text(request: VoiceSearchRequest):
         # --- KASUS 2: ADA BANYAK HASIL (Ar-Rahman) ---
         # Kita kembalikan format JSON baru yang menandakan "pilihan ganda"
 
-        # Sortir berdasarkan skor (walau mungkin semua sama)
-        matches.sort(key=lambda x: x['score'], reverse=True)
-
-        return {
-            "match_type": "multiple",
-            "results": matches
-        }
-        
-# Helper Function
-def extract_ayat_numbers(message: str) -> list[int]:
-    """Mengekstrak nomor ayat (termasuk rentang) dari pesan."""
-    numbers = set()
-
-    # 1. Cari angka individual (misal: "ayat 5" atau "10")
-    for match in re.finditer(r'\b(\d+)\b', message):
-        num = int(match.group(1))
-        if num > 0: # <-- Hapus batasan 30
-            numbers.add(num)
-
-    # 2. Cari rentang angka (misal: "1-5" atau "10-15")
-    for match in re.finditer(r'(\d+)\s*-\s*(\d+)', message):
-        start = int(match.group(1))
-        end = int(match.group(2))
-        if start < end: # <-- Hapus batasan 30
-            for num in range(start, end + 1):
-                numbers.add(num)
-
-    return sorted(list(numbers)) 
-
-# Helper pendeteksi nama surah
-def find_surah_in_query(query: str) -> int | None:
-    """Mencari nama surah yang dinormalisasi di dalam kueri."""
-    # Bersihkan kueri dan pecah jadi kata-kata
-    query = query.lower().replace("surat", "").replace("surah", "").strip()
-    
-    # Cek apakah seluruh kueri adalah nama surah (Paling cepat)
-    num = get_surah_number_from_name(query)
-    if num:
-        return num
+        # Sudah terurut berdasarkan skor (walau mungkin semua sama), tinggal dipotong per halaman
+        return paginate(top_matches, offset, limit, build_spoken_match)
         
-    # Cek apakah bagian dari kueri adalah nama surah
-    parts = re.split(r'\s+|-', query)
-    for part in parts:
-        num = get_surah_number_from_name(part)
-        if num:
-            return num
-    
-    # Cek gabungan 2 kata (untuk "al mulk" dll)
-    if len(parts) > 1:
-        for i in range(len(parts) - 1):
-            two_words = f"{parts[i]}{parts[i+1]}" # "almulk"
-            num = get_surah_number_from_name(two_words)
-            if num:
-                return num
-                
-    return None  
-
-async def run_rag_generation(user_message: str, dynamic_context: str, context_source_text: str):
-    """Fungsi helper terpusat untuk memanggil Groq RAG."""
-    
-    # Susun Prompt RAG
+# Model LLM yang dipakai untuk semua jawaban RAG
+RAG_LLM_MODEL = "llama-3.3-70b-versatile"
+
+# Batas token konteks untuk RAG per surah (Kasus 3), supaya tidak kena error 413
+RAG_CONTEXT_TOKEN_BUDGET = int(os.environ.get("RAG_CONTEXT_TOKEN_BUDGET", 3000))
+
+@dataclass
+class RagContext:
+    """Hasil routing chatbot yang butuh jawaban LLM (Kasus 2, 3, 4)."""
+    case: str
+    refs: list[str] # Referensi ayat yang dipakai sebagai konteks, misal ["67:1", "67:2"]
+    dynamic_context: str
+    context_source_text: str
+    context_tokens: int = 0 # Perkiraan token konteks (diisi oleh context builder)
+
+def build_rag_messages(user_message: str, dynamic_context: str, context_source_text: str) -> list[dict]:
+    """Menyusun prompt RAG (system + user) untuk dikirim ke Groq."""
     prompt = f"""
     Anda adalah asisten AI yang ahli dalam Tafsir Al-Qur'an.
     Tugas Anda adalah menjawab pertanyaan pengguna HANYA berdasarkan konteks tafsir dari {context_source_text} yang saya berikan.
@@ -513,39 +1300,111 @@ async def run_rag_generation(user_message: str, dynamic_context: str, context_so
     {dynamic_context}
     --- AKHIR KONTEKS ---
     """
-    
+    return [
+        {"role": "system", "content": prompt},
+        {"role": "user", "content": user_message}
+    ]
+
+def rag_error_to_http(e: Exception) -> HTTPException:
+    """Mengubah error Groq menjadi HTTPException dengan pesan yang ramah."""
+    logger.warning(f"Error Groq API atau RAG: {e}")
+    if "413" in str(e):
+        return HTTPException(status_code=500, detail="Permintaan Anda terlalu besar (melebihi batas token). Coba ajukan pertanyaan yang lebih spesifik.")
+    return HTTPException(status_code=500, detail=f"Terjadi kesalahan saat menghubungi model AI: {e}")
+
+async def run_rag_generation(user_message: str, dynamic_context: str, context_source_text: str):
+    """Fungsi helper terpusat untuk memanggil Groq RAG."""
     try:
-        print("INFO:    Mengirim prompt RAG ke Groq...")
-        
-        chat_completion = await client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": prompt},
-                {"role": "user", "content": user_message}
-            ],
-            model="llama-3.3-70b-versatile", 
-        )
+        logger.debug("Mengirim prompt RAG ke Groq...")
+
+        with stage_timer("groq"):
+            chat_completion = await client.chat.completions.create(
+                messages=build_rag_messages(user_message, dynamic_context, context_source_text),
+                model=RAG_LLM_MODEL,
+            )
         
         return {"answer_type": "text", "content": chat_completion.choices[0].message.content}
 
     except Exception as e:
-        print(f"Error Groq API atau RAG: {e}")
-        if "413" in str(e):
-             raise HTTPException(status_code=500, detail="Permintaan Anda terlalu besar (melebihi batas token). Coba ajukan pertanyaan yang lebih spesifik.")
-        raise HTTPException(status_code=500, detail=f"Terjadi kesalahan saat menghubungi model AI: {e}")
+        raise rag_error_to_http(e)
+
+async def answer_rag(user_message: str, rag: RagContext) -> dict:
+    """run_rag_generation dengan cache jawaban di depannya."""
+    if ANSWER_CACHE is not None:
+        cached = await ANSWER_CACHE.get(rag.case, rag.refs, user_message)
+        if cached is not None:
+            logger.debug("Jawaban RAG diambil dari cache", extra={"case": rag.case})
+            return {"answer_type": "text", "content": cached}
+
+    result = await run_rag_generation(user_message, rag.dynamic_context, rag.context_source_text)
+    if ANSWER_CACHE is not None:
+        await ANSWER_CACHE.set(rag.case, rag.refs, user_message, result["content"])
+    return result
+
+async def stream_rag_generation(user_message: str, dynamic_context: str, context_source_text: str):
+    """Versi streaming dari run_rag_generation: menghasilkan potongan teks (token delta) dari Groq."""
+    try:
+        logger.debug("Mengirim prompt RAG ke Groq (streaming)...")
+        # "groq_first_token" = sampai token pertama, "groq" = sampai stream selesai
+        with stage_timer("groq"):
+            start = time.perf_counter()
+            first_token = True
+            stream = await client.chat.completions.create(
+                messages=build_rag_messages(user_message, dynamic_context, context_source_text),
+                model=RAG_LLM_MODEL,
+                stream=True,
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if first_token:
+                        STAGE_SECONDS.observe(time.perf_counter() - start, stage="groq_first_token")
+                        first_token = False
+                    yield chunk.choices[0].delta.content
 
-#
+    except Exception as e:
+        raise rag_error_to_http(e)
 
+def sse_event(event: str, data) -> str:
+    """Memformat satu event Server-Sent Events."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
-# === ENDPOINT CHATBOT (FINAL DENGAN LOGIKA 5 KASUS) ===
-@app.post("/chatbot")
-async def handle_chatbot_message(request: VoiceSearchRequest):
-    user_message = request.text.lower()
-    
+
+async def rank_surah_ayat(surah_number: int, question: str) -> list[int]:
+    """
+    Mengurutkan nomor ayat sebuah surah dari yang paling relevan dengan pertanyaan,
+    memakai FAISS yang dibatasi ke baris surah tersebut.
+    Jika pencarian vektor tidak tersedia, kembali ke urutan mushaf.
+    """
+    in_order = list(range(1, 287))
+    row_range = SURAH_ROW_RANGES.get(surah_number)
+    if FAISS_INDEX is None or EMBEDDING_SERVICE is None or row_range is None:
+        # Model belum dimuat (PRELOAD_ML=0)? Mulai sekarang, request ini pakai urutan mushaf dulu
+        READINESS.ensure_started(*ML_SUBSYSTEMS)
+        return in_order
+    try:
+        with stage_timer("embedding"):
+            query_vector = await EMBEDDING_SERVICE.encode(question)
+        with stage_timer("faiss"):
+            rows = rank_rows_by_relevance(FAISS_INDEX, query_vector, *row_range)
+        return [int(VERSE_REFERENCES[row].split(":")[1]) for row in rows]
+    except Exception as e:
+        logger.warning(f"Gagal mengurutkan ayat Surah {surah_number} dengan vektor: {e}")
+        return in_order
+
+# === ROUTING CHATBOT (LOGIKA 5 KASUS) ===
+async def resolve_chatbot_message(user_message: str) -> dict | RagContext:
+    """
+    Menentukan kasus chatbot dari pesan (sudah lowercase).
+    Kasus 1 & 5 langsung mengembalikan jawaban akhir (dict),
+    Kasus 2, 3 & 4 mengembalikan RagContext yang masih harus dijawab LLM.
+    """
     # --- 1. DETEKSI NIAT ---
-    rag_keywords = ["hubungan", "jelaskan", "apa", "kenapa", "mengapa", "ringkasan", "rangkuman", "tentang", "bagaimana", "pelajaran"]
-    is_rag_question = any(word in user_message for word in rag_keywords) or re.search(r'\d+-\d+', user_message)
-    ayat_list = extract_ayat_numbers(user_message)
-    surah_found = find_surah_in_query(user_message)
+    # Satu lintasan: nama surah, nomor/rentang ayat, dan kata kunci niat (lihat message_router.py)
+    with stage_timer("chat_routing"):
+        route = MESSAGE_ROUTER.route(user_message)
+    is_rag_question = route.is_rag_question
+    ayat_list = route.numbers
+    surah_found = route.surah
 
     # --- 2. PENENTUAN KEPUTUSAN ---
 
@@ -557,15 +1416,15 @@ async def handle_chatbot_message(request: VoiceSearchRequest):
             if ayah_number > 30: # Jika "tafsir 35" (di luar Al-Mulk)
                  raise HTTPException(status_code=404, detail="Maaf, untuk permintaan ayat spesifik (tanpa nama surah), saya hanya bisa mengambil dari Surah Al-Mulk (1-30).")
             
-            print(f"INFO: Chatbot (Kasus 1: Simple Al-Mulk) terdeteksi. Mencari 67:{ayah_number}")
-            return get_spesific_ayah(surah_number=67, ayah_number=ayah_number)
+            logger.info("Chatbot: Kasus 1 (Simple Al-Mulk)", extra={"case": "kasus_1", "ayah": ayah_number})
+            return await get_spesific_ayah(surah_number=67, ayah_number=ayah_number)
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error saat mengambil ayat: {e}")
 
     # KASUS 2: Pertanyaan RAG spesifik Al-Mulk (Contoh: "hubungan 1-5")
     # -> ADA angka, INI RAG, DAN (tidak sebut surah ATAU sebut Al-Mulk)
     elif len(ayat_list) > 0 and is_rag_question and (surah_found is None or surah_found == 67):
-        print(f"INFO: Chatbot (Kasus 2: Al-Mulk RAG) terdeteksi untuk ayat: {ayat_list}")
+        logger.info("Chatbot: Kasus 2 (Al-Mulk RAG)", extra={"case": "kasus_2", "ayat": ayat_list})
         dynamic_context = ""
         valid_ayat_list = [num for num in ayat_list if num <= 30] # Filter hanya 1-30
         if not valid_ayat_list:
@@ -578,48 +1437,70 @@ async def handle_chatbot_message(request: VoiceSearchRequest):
         
         context_source_text = f"Tafsir Al-Mulk ayat {', '.join(map(str, valid_ayat_list))}"
         
-        return await run_rag_generation(user_message, dynamic_context, context_source_text)
+        return RagContext("kasus_2", [f"67:{num}" for num in valid_ayat_list], dynamic_context, context_source_text)
 
     # KASUS 3: Pertanyaan RAG Global (TAPI SPESIFIK SURAH)
     # (Contoh: "rangkuman ar-rahman", "pelajaran al-baqarah 1-5")
     elif is_rag_question and surah_found is not None and surah_found != 67:
-        print(f"INFO: Chatbot (Kasus 3: Global Surah RAG) terdeteksi untuk Surah {surah_found}")
-        
-        ayat_to_fetch = ayat_list if ayat_list else range(1, 287) # Ambil semua ayat jika tidak spesifik (misal 286 u/ Baqarah)
-        
-        dynamic_context = ""
-        context_source = []
+        logger.info("Chatbot: Kasus 3 (Global Surah RAG)", extra={"case": "kasus_3", "surah": surah_found})
         
+        surah_name = SURAH_NUMBER_TO_NAME[surah_found]
+
+        # Urutan prioritas: ayat yang disebut user, atau ayat yang paling relevan dengan pertanyaan
+        ayat_to_fetch = ayat_list if ayat_list else await rank_surah_ayat(surah_found, user_message)
+
+        entries = []
+        # Ringkasan surah (dari info surah API) paling berguna untuk "rangkuman ..." tanpa nomor ayat
+        surah_summary = SURAH_INFO.get(surah_found, {}).get("tafsir", {}).get("id")
+        if surah_summary and not ayat_list:
+            entries.append((None, f"Ringkasan Surah {surah_name}: {surah_summary}"))
         for num in ayat_to_fetch:
-            verse_ref = f"{surah_found}:{num}"
-            verse_data = QURAN_TEXT_MAP.get(verse_ref)
+            verse_data = QURAN_TEXT_MAP.get(f"{surah_found}:{num}")
             if verse_data:
                 # KITA PAKAI TERJEMAHAN, KARENA TAFSIR PASTI MELEDAK
-                dynamic_context += f"Terjemahan Ayat {num}: {verse_data['translation']}\n"
-                context_source.append(str(num))
-        
-        if not dynamic_context:
-             raise HTTPException(status_code=404, detail=f"Saya menemukan Surah {SURAH_NUMBER_TO_NAME[surah_found]}, tapi gagal mengambil konteks ayatnya.")
+                entries.append((num, f"Terjemahan Ayat {num}: {verse_data['translation']}"))
+
+        if not any(num is not None for num, _ in entries):
+             raise HTTPException(status_code=404, detail=f"Saya menemukan Surah {surah_name}, tapi gagal mengambil konteks ayatnya.")
+
+        # Ambil sebanyak mungkin sesuai budget token, lalu susun ulang sesuai urutan mushaf
+        selected, context_tokens = assemble_context(entries, RAG_CONTEXT_TOKEN_BUDGET)
+        selected.sort(key=lambda entry: -1 if entry[0] is None else entry[0])
+        dynamic_context = "\n".join(line for _, line in selected) + "\n"
+        context_source = [str(num) for num, _ in selected if num is not None]
+        total_ayat = sum(1 for num, _ in entries if num is not None)
+        logger.debug("Konteks Kasus 3", extra={
+            "ayat": len(context_source), "total_ayat": total_ayat,
+            "tokens": context_tokens, "budget": RAG_CONTEXT_TOKEN_BUDGET
+        })
 
-        context_source_text = f"Terjemahan {SURAH_NUMBER_TO_NAME[surah_found]} ayat {', '.join(context_source)}"
-        return await run_rag_generation(user_message, dynamic_context, context_source_text)
+        context_source_text = f"Terjemahan {surah_name} ayat {', '.join(context_source)}"
+        return RagContext("kasus_3", [f"{surah_found}:{num}" for num in context_source], dynamic_context, context_source_text, context_tokens)
 
     # KASUS 4: Pertanyaan RAG Umum/Vektor (Contoh: "apa itu sabar?")
     # -> INI RAG, TAPI TIDAK ADA angka, DAN TIDAK ADA nama surah
     elif is_rag_question and len(ayat_list) == 0 and surah_found is None:
-        print(f"INFO: Chatbot (Kasus 4: Vector RAG) terdeteksi. Menerima: {user_message}")
+        logger.info("Chatbot: Kasus 4 (Vector RAG)", extra={"case": "kasus_4", "message_chars": len(user_message)})
+        require_ready(*ML_SUBSYSTEMS)
         
         try:
-            query_vector = RAG_MODEL.encode([user_message], normalize_embeddings=True)
+            with stage_timer("embedding"):
+                query_vector = await EMBEDDING_SERVICE.encode(user_message)
             k = 5
-            distances, indices = FAISS_INDEX.search(np.array(query_vector).astype('float32'), k)
+            with stage_timer("faiss"):
+                distances, indices = FAISS_INDEX.search(query_vector.reshape(1, -1), k)
             
             dynamic_context = ""
             context_source = []
+            context_refs = []
+            # -1 = slot kosong (indeks IVF/HNSW bisa kurang kandidat); jangan sampai jadi VERSE_REFERENCES[-1]
             for i in indices[0]:
+                if i < 0:
+                    continue
                 verse_ref = VERSE_REFERENCES[i]
                 verse_data = QURAN_TEXT_MAP.get(verse_ref)
                 if verse_data:
+                    context_refs.append(verse_ref)
                     surah_name = SURAH_NUMBER_TO_NAME.get(verse_data['surah'], 'Unknown')
                     context_source.append(f"QS. {surah_name} ({verse_ref})")
                     # Kita pakai tafsir + terjemahan di sini, karena konteksnya kecil (hanya 5)
@@ -630,19 +1511,86 @@ async def handle_chatbot_message(request: VoiceSearchRequest):
                  raise HTTPException(status_code=404, detail="Tidak ditemukan konteks yang relevan untuk pertanyaan Anda.")
             
             context_source_text = f"konteks {', '.join(context_source)}"
-            return await run_rag_generation(user_message, dynamic_context, context_source_text)
+            return RagContext("kasus_4", context_refs, dynamic_context, context_source_text)
 
         except Exception as e:
-            print(f"Error Vector RAG: {e}")
+            logger.warning(f"Error Vector RAG: {e}")
             raise HTTPException(status_code=500, detail=f"Gagal melakukan pencarian vektor: {e}")
             
     # KASUS 5: Obrolan Ringan / Tidak Dikenali
     # -> BUKAN pertanyaan RAG DAN tidak ada angka
     else:
-        print(f"INFO: Chatbot (Kasus 5: Small Talk) terdeteksi.")
-        if "halo" in user_message or "hai" in user_message or "salam" in user_message:
+        logger.info("Chatbot: Kasus 5 (Small Talk)", extra={"case": "kasus_5"})
+        if "greeting" in route.intents:
             return {"answer_type": "text", "content": "Halo! Saya adalah asisten AI yang bisa membantu Anda mencari tafsir di seluruh Al-Qur'an. Silakan tanyakan apa saja (misal: 'apa itu sabar?' atau 'rangkuman surah ar-rahman')."}
-        elif "terima kasih" in user_message or "makasih" in user_message:
+        elif "thanks" in route.intents:
             return {"answer_type": "text", "content": "Sama-sama! Senang bisa membantu."}
         else:
-            return {"answer_type": "text", "content": "Maaf, saya tidak mengerti pertanyaan Anda. Coba tanyakan tentang tema, ayat, atau surah tertentu (misal: 'apa itu sabar?')."}
\ No newline at end of file
+            return {"answer_type": "text", "content": "Maaf, saya tidak mengerti pertanyaan Anda. Coba tanyakan tentang tema, ayat, atau surah tertentu (misal: 'apa itu sabar?')."}
+
+
+# === ENDPOINT CHATBOT (FINAL DENGAN LOGIKA 5 KASUS) ===
+@app.post("/chatbot")
+async def handle_chatbot_message(request: VoiceSearchRequest):
+    require_ready("surahs", "search")
+    user_message = request.text.lower()
+    result = await resolve_chatbot_message(user_message)
+    if isinstance(result, RagContext):
+        require_ready("groq")
+        return await answer_rag(user_message, result)
+    return result
+
+
+# === STATISTIK CACHE JAWABAN RAG ===
+@app.get("/chatbot/cache/stats")
+def get_answer_cache_stats():
+    if ANSWER_CACHE is None:
+        return {"enabled": False}
+    return {"enabled": True, **ANSWER_CACHE.stats()}
+
+
+# === ENDPOINT CHATBOT STREAMING (Server-Sent Events) ===
+@app.post("/chatbot/stream")
+async def handle_chatbot_message_stream(request: VoiceSearchRequest):
+    """
+    Sama dengan /chatbot, tapi jawaban LLM dikirim per potongan token lewat SSE.
+    Event yang dikirim:
+    - "delta"  : {"content": "..."} potongan jawaban RAG
+    - "result" : jawaban utuh untuk kasus non-LLM (format sama dengan /chatbot)
+    - "error"  : {"detail": "..."} jika gagal di tengah stream
+    - "done"   : {} penanda selesai
+    Error sebelum stream dimulai (misal ayat di luar jangkauan) tetap dikirim sebagai HTTP error biasa.
+    """
+    require_ready("surahs", "search")
+    user_message = request.text.lower()
+    result = await resolve_chatbot_message(user_message)
+    if isinstance(result, RagContext):
+        require_ready("groq")
+
+    async def event_stream():
+        if isinstance(result, RagContext):
+            cached = None
+            if ANSWER_CACHE is not None:
+                cached = await ANSWER_CACHE.get(result.case, result.refs, user_message)
+            if cached is not None:
+                # Jawaban dari cache dikirim sekaligus sebagai satu delta
+                yield sse_event("delta", {"content": cached})
+            else:
+                answer_parts = []
+                try:
+                    async for delta in stream_rag_generation(user_message, result.dynamic_context, result.context_source_text):
+                        answer_parts.append(delta)
+                        yield sse_event("delta", {"content": delta})
+                    if ANSWER_CACHE is not None:
+                        await ANSWER_CACHE.set(result.case, result.refs, user_message, "".join(answer_parts))
+                except HTTPException as e:
+                    yield sse_event("error", {"detail": e.detail})
+        else:
+            yield sse_event("result", result)
+        yield sse_event("done", {})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,260 @@
+import re
+import unicodedata
+from dataclasses import dataclass, field
+
+# =====================================================================
+# Router pesan chatbot: semua yang dibutuhkan resolve_chatbot_message (Kasus 1-5)
+# didapat dari SATU lintasan automaton Aho-Corasick atas pesan ternormalisasi:
+#   - sebutan nama surah (alias dari data surah + MANUAL_ALIASES), hanya di batas kata
+#   - niat (kata kunci RAG, sapaan, terima kasih)
+# Nomor ayat & rentang ("5", "1-5", "10 - 15") dibaca dari pesan asli dengan satu
+# regex \d+ (tanda "-" rentang hilang saat normalisasi).
+#
+# Normalisasi: huruf kecil, harakat & tanda kutip dibuang, selain huruf/angka jadi
+# satu spasi. "Al-An'am" -> "al anam", "QS. Al-Mulk" -> "qs al mulk".
+# =====================================================================
+
+# === KAMUS ALIAS MANUAL (Untuk Typo/Ejaan Umum) ===
+MANUAL_ALIASES = {
+    "yasin": 36,
+    "yaasin": 36,
+    "yaseen": 36,
+    "alfatihah": 1,
+    "al fatihah": 1,
+    "fatihah": 1,
+    "annaba": 78,
+    "an naba": 78,
+    "annisa": 4,
+    "an nisa": 4,
+    "alanam": 6,
+    "al anam": 6,
+    "alkahfi": 18,
+    "alkahf": 18,
+    "al mulk": 67,
+    "almulk": 67,
+    "arrahman": 55,
+    "ar rahman": 55
+    # Tambahkan lainnya sesuai kebutuhan
+}
+
+# Kata kunci niat. Dicocokkan sebagai potongan teks (bukan kata utuh), sama seperti
+# cek `in` lama: "apakah" & "siapa" tetap terhitung pertanyaan.
+INTENT_KEYWORDS = {
+    "rag": ("hubungan", "jelaskan", "apa", "kenapa", "mengapa", "ringkasan", "rangkuman", "tentang", "bagaimana", "pelajaran"),
+    "greeting": ("halo", "hai", "salam"),
+    "thanks": ("terima kasih", "makasih"),
+}
+
+SURAH_PREFIXES = ("surah", "surat", "qs")
+# Kata sandang Arab di awal nama surah; "alkahfi" juga dicocokkan sebagai "al kahfi"
+ARTICLE_PREFIXES = ("asy", "al", "an", "ar", "as", "at", "az", "ad")
+APOSTROPHES = "'`‘’ʼ"
+MAX_AYAH_NUMBER = 286  # Ayat terbanyak (Al-Baqarah); rentang "1-99999" tidak perlu dijabarkan semua
+
+
+# Tanda kutip, tatweel & tanda diakritik Latin/Arab (harakat) dihapus, bukan jadi pemisah kata
+_DROP_TABLE = dict.fromkeys(
+    [ord(ch) for ch in APOSTROPHES + "\u0640"] + [cp for cp in range(0x0300, 0x0900) if unicodedata.combining(chr(cp))]
+)
+_SEPARATORS = re.compile(r"[\W_]+")
+_NUMBER_RUN = re.compile(r"\d+")
+# Jalur cepat pesan ASCII (mayoritas): bytes.translate jauh lebih murah dari regex/str.translate
+_ASCII_TABLE = bytes(c if chr(c).isalnum() else 32 for c in range(256)).lower()
+_ASCII_DROP = APOSTROPHES[:2].encode("ascii")
+
+
+def normalize_text(text: str) -> str:
+    """Normalisasi pesan & alias (harus sama persis di kedua sisi)."""
+    if text.isascii():
+        return " ".join(text.encode("ascii").translate(_ASCII_TABLE, _ASCII_DROP).decode("ascii").split())
+    return _SEPARATORS.sub(" ", text.lower().translate(_DROP_TABLE)).strip()
+
+
+def scan_numbers(message: str) -> tuple[set[int], bool]:
+    """
+    Nomor ayat dengan aturan yang sama seperti regex lama: angka utuh \b(\d+)\b (> 0), plus
+    isi rentang (\d+)\s*-\s*(\d+) (dijabarkan sampai MAX_AYAH_NUMBER). Flag kedua: ada
+    "angka-angka" tanpa spasi (tanda pertanyaan rentang).
+    """
+    numbers = set()
+    has_dash_range = False
+    prev_end, prev_value, prev_is_range_end = None, 0, False
+    for match in _NUMBER_RUN.finditer(message):
+        start, end = match.span()
+        value = int(match.group())
+        if value > 0 and (start == 0 or not _is_word(message[start - 1])) \
+                and (end == len(message) or not _is_word(message[end])):
+            numbers.add(value)
+        is_range_end = False
+        if prev_end is not None:
+            gap = message[prev_end:start]
+            has_dash_range = has_dash_range or gap == "-"
+            # Seperti finditer: ujung kanan rentang tidak bisa jadi awal rentang berikutnya
+            if not prev_is_range_end and gap.strip() == "-":
+                is_range_end = True
+                if prev_value < value:
+                    numbers.update(range(prev_value, min(value, MAX_AYAH_NUMBER) + 1))
+        prev_end, prev_value, prev_is_range_end = end, value, is_range_end
+    return numbers, has_dash_range
+
+
+def _is_word(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+class AhoCorasick:
+    """
+    Automaton Aho-Corasick (Python murni): semua pola dicari dalam satu lintasan teks,
+    berapa pun jumlah polanya. Setelah build(), transisi (termasuk lewat fungsi gagal)
+    sudah dihitung semua, jadi tiap karakter cukup satu-dua lookup dict.
+    """
+
+    def __init__(self):
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[list[tuple[int, object]]] = [[]]  # (panjang pola, payload)
+        self._delta: list[dict[str, int]] = []            # Transisi lengkap, kecuali yang kembali ke root
+
+    def add(self, pattern: str, payload):
+        node = 0
+        for ch in pattern:
+            child = self._goto[node].get(ch)
+            if child is None:
+                child = len(self._goto)
+                self._goto[node][ch] = child
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = child
+        self._out[node].append((len(pattern), payload))
+
+    def build(self):
+        """Menghitung fungsi gagal & tabel transisi (BFS); panggil sekali setelah semua pola ditambahkan."""
+        goto, fail, out = self._goto, self._fail, self._out
+        delta = [{} for _ in goto]
+        root = goto[0]
+        queue = list(root.values())
+        for node in queue:
+            # State yang lebih dangkal (termasuk fail[node]) sudah selesai diproses
+            delta[node] = {**delta[fail[node]], **goto[node]}
+            for ch, child in goto[node].items():
+                fail[child] = (delta[fail[node]].get(ch) or root.get(ch, 0)) if node else 0
+                # Pola yang berakhir di state gagal juga berakhir di sini
+                out[child] = out[child] + out[fail[child]]
+                queue.append(child)
+        self._delta = delta
+
+    def find_all(self, text: str) -> list[tuple[int, int, object]]:
+        """Semua kemunculan pola di `text` sebagai (awal, akhir, payload)."""
+        delta, root, out = self._delta, self._goto[0], self._out
+        hits = []
+        node = 0
+        for end, ch in enumerate(text, 1):
+            node = delta[node].get(ch) or root.get(ch, 0)
+            if out[node]:
+                hits.extend((end - length, end, payload) for length, payload in out[node])
+        return hits
+
+
+@dataclass
+class SurahMention:
+    surah: int
+    alias: str
+    start: int          # Posisi di teks ternormalisasi
+    end: int
+    explicit: bool      # Didahului "surah"/"surat"/"qs"
+    meaning: bool       # Alias dari arti nama surah ("manusia", "cahaya"), kata umum
+
+
+@dataclass
+class MessageRoute:
+    text: str                                   # Pesan ternormalisasi
+    numbers: list[int] = field(default_factory=list)
+    has_dash_range: bool = False                # Ada "angka-angka" tanpa spasi
+    intents: set[str] = field(default_factory=set)
+    mentions: list[SurahMention] = field(default_factory=list)
+
+    @property
+    def is_rag_question(self) -> bool:
+        return "rag" in self.intents or self.has_dash_range
+
+    @property
+    def surah(self) -> int | None:
+        """
+        Surah yang dimaksud pesan. Prioritas: yang didahului "surah ..." lalu nama surah
+        lalu posisi paling awal. Arti nama surah ("manusia", "cahaya") hanya dihitung jika
+        didahului "surah ...", supaya "apa kata al-quran tentang manusia" tidak jadi An-Nas.
+        """
+        candidates = [m for m in self.mentions if m.explicit or not m.meaning]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda m: (not m.explicit, m.meaning, m.start)).surah
+
+
+class MessageRouter:
+    def __init__(self, names: dict[str, int], meanings: dict[str, int] | None = None,
+                 intents: dict[str, tuple[str, ...]] = INTENT_KEYWORDS):
+        """
+        `names`    : alias nama surah -> nomor (transliterasi, nama Arab, alias manual)
+        `meanings` : arti nama surah -> nomor (kata umum, lihat MessageRoute.surah)
+        Alias dengan spasi/strip juga didaftarkan versi tanpa spasinya ("al mulk" -> "almulk"),
+        dan nama tanpa spasi versi dengan kata sandang terpisah ("alkahfi" -> "al kahfi").
+        """
+        aliases: dict[str, tuple[int, bool]] = {}
+        for alias_map, meaning in ((meanings or {}, True), (names, False)):
+            for alias, number in alias_map.items():
+                normalized = normalize_text(alias)
+                if not normalized:
+                    continue
+                variants = {normalized, normalized.replace(" ", "")}
+                if not meaning and " " not in normalized:
+                    article = next((p for p in ARTICLE_PREFIXES if normalized.startswith(p)), None)
+                    if article and len(normalized) - len(article) >= 3:
+                        variants.add(f"{article} {normalized[len(article):]}")
+                for variant in variants:
+                    # Nama surah menimpa arti yang kebetulan sama
+                    aliases[variant] = (number, meaning)
+
+        self.automaton = AhoCorasick()
+        for alias, (number, meaning) in aliases.items():
+            self.automaton.add(alias, ("surah", number, meaning, alias))
+        for intent, keywords in intents.items():
+            for keyword in keywords:
+                self.automaton.add(normalize_text(keyword), ("intent", intent))
+        self.automaton.build()
+        self.alias_count = len(aliases)
+
+    @classmethod
+    def from_surahs(cls, surahs_data: list[dict], manual_aliases: dict[str, int] = MANUAL_ALIASES) -> "MessageRouter":
+        """Dari daftar surah format API /surah (quran_surahs.json)."""
+        names, meanings = {}, {}
+        for surah in surahs_data:
+            number = surah["number"]
+            names[surah["name"]["transliteration"]["id"]] = number
+            names[surah["name"]["short"]] = number
+            meanings[surah["name"]["translation"]["id"]] = number
+        names.update(manual_aliases)
+        return cls(names, meanings)
+
+    def route(self, message: str) -> MessageRoute:
+        text = normalize_text(message)
+        numbers, has_dash_range = scan_numbers(message)
+        route = MessageRoute(text=text, numbers=sorted(numbers), has_dash_range=has_dash_range)
+
+        # Sebutan surah: hanya di batas kata, yang tumpang tindih -> ambil yang paling kiri & terpanjang
+        mentions = []
+        covered_until = 0
+        for start, end, payload in sorted(self.automaton.find_all(text), key=lambda hit: (hit[0], -hit[1])):
+            if payload[0] == "intent":
+                route.intents.add(payload[1])
+                continue
+            if start < covered_until:
+                continue
+            if (start > 0 and text[start - 1] != " ") or (end < len(text) and text[end] != " "):
+                continue
+            _, number, meaning, alias = payload
+            previous_word = text[:max(start - 1, 0)].rsplit(" ", 1)[-1]
+            mentions.append(SurahMention(number, alias, start, end, previous_word in SURAH_PREFIXES, meaning))
+            covered_until = end
+        route.mentions = mentions
+        return route
@@ -0,0 +1,143 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# =====================================================================
+# Metrik ringan (tanpa dependensi) dengan format teks Prometheus.
+#   STAGE_SECONDS        : durasi per tahap (routing, normalisasi, scan, upstream, embedding, faiss, groq)
+#   HTTP_REQUEST_SECONDS : durasi per endpoint (label = template route, bukan URL mentah)
+# Dibaca lewat GET /metrics di main.py.
+# Catatan: metrik disimpan per proses. Jika uvicorn jalan dengan beberapa worker,
+# tiap worker punya angka sendiri (scrape per worker atau pakai satu worker).
+# =====================================================================
+
+# Batas bucket (detik): dari 0.5 ms (normalisasi) sampai 30 detik (Groq yang lambat)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(pairs: list[tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """
+    Histogram Prometheus sederhana. Aman dipanggil dari banyak thread
+    (scan jalan di threadpool, encode di executor sendiri).
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # label -> [jumlah per bucket (bukan kumulatif, + satu untuk +Inf), total durasi, jumlah observasi]
+        self._series: dict[tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(key, list(series[0]), series[1], series[2]) for key, series in sorted(self._series.items())]
+        for key, counts, total, count in snapshot:
+            base = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(base + [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(base)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(base)} {count}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = sorted(self._values.items())
+        for key, value in snapshot:
+            lines.append(f"{self.name}{_format_labels(list(zip(self.labelnames, key)))} {_format_value(value)}")
+        return lines
+
+
+REGISTRY: list = []
+
+
+def register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+
+STAGE_SECONDS = register(Histogram(
+    "quran_stage_duration_seconds", "Durasi tiap tahap pemrosesan request.", ("stage",)
+))
+HTTP_REQUEST_SECONDS = register(Histogram(
+    "quran_http_request_duration_seconds", "Durasi request HTTP sampai header respons dikirim.",
+    ("method", "route", "status")
+))
+STAGE_ERRORS = register(Counter(
+    "quran_stage_errors_total", "Jumlah tahap yang berakhir dengan exception.", ("stage",)
+))
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """
+    Mengukur durasi blok kode sebagai satu tahap:
+        with stage_timer("scan"):
+            ...
+    Durasi tetap dicatat walau blok melempar exception (dan exception-nya dihitung).
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+
+
+def render_metrics() -> str:
+    """Semua metrik dalam format teks Prometheus (text/plain; version=0.0.4)."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,261 @@
+import bisect
+import json
+import sys
+import time
+from array import array
+from dataclasses import dataclass
+
+import numpy as np
+from rapidfuzz import fuzz
+
+# =====================================================================
+# Suffix array atas SELURUH mushaf (teks Arab ternormalisasi, urut mushaf,
+# antar ayat dipisah satu spasi). Dipakai /search-by-text untuk bacaan yang
+# menyambung melewati batas ayat: per ayat skornya < 95, padahal teksnya ada.
+#
+# - Cocok persis   : dua binary search di suffix array, O(m log n)
+# - Hampir persis  : seed (2-3 kata berurutan / kata panjang dari kueri) dicari persis,
+#                    posisinya di-vote per "diagonal" (posisi awal bacaan di mushaf),
+#                    lalu kandidat terbaik dinilai dengan partial_ratio di jendela kecil
+# Hasil: awal & akhir bacaan sebagai (surah, ayat, kata ke-), bisa lintas ayat/surah.
+# =====================================================================
+
+MIN_QUERY_CHARS = 8       # Kueri lebih pendek dari ini terlalu ambigu untuk dicari di seluruh mushaf
+MIN_SEED_CHARS = 6
+MAX_SEED_HITS = 256       # Seed yang muncul lebih sering dari ini (frasa umum) tidak dipakai untuk vote
+MAX_CANDIDATES = 16       # Jumlah diagonal terbaik yang dinilai dengan fuzz
+
+
+def build_suffix_array(text: str) -> np.ndarray:
+    """
+    Suffix array dengan prefix doubling (semua langkah di numpy, tanpa loop per karakter).
+    Urutannya sama dengan perbandingan str Python (per code point, prefix lebih dulu),
+    jadi binary search bisa langsung membandingkan potongan teks.
+    """
+    n = len(text)
+    if n == 0:
+        return np.zeros(0, dtype=np.int32)
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+    _, rank = np.unique(codes, return_inverse=True)
+    rank = rank.astype(np.int64).reshape(-1)
+    step = 1
+    while True:
+        # Kunci = (rank[i], rank[i + step]); 0 = sudah lewat akhir teks (paling kecil)
+        second = np.zeros(n, dtype=np.int64)
+        second[:n - step] = rank[step:] + 1
+        key = rank * (n + 1) + second
+        order = np.argsort(key, kind="stable")
+        sorted_key = key[order]
+        new_rank = np.empty(n, dtype=np.int64)
+        new_rank[order] = np.concatenate(([0], np.cumsum(sorted_key[1:] != sorted_key[:-1])))
+        rank = new_rank
+        if rank[order[-1]] == n - 1:  # Semua suffix sudah berbeda
+            return order.astype(np.int32)
+        step *= 2
+
+
+@dataclass
+class SpanMatch:
+    """Satu bacaan yang ditemukan di mushaf. start/end = (surah, ayat, kata ke-), inklusif."""
+    score: int
+    start: tuple[int, int, int]
+    end: tuple[int, int, int]
+    start_verse: int  # Posisi ayat (urutan mushaf) awal & akhir bacaan
+    end_verse: int
+    char_start: int
+    char_end: int
+
+    @property
+    def crosses_verses(self) -> bool:
+        return self.start_verse != self.end_verse
+
+    def verse_indices(self) -> range:
+        return range(self.start_verse, self.end_verse + 1)
+
+    def to_dict(self) -> dict:
+        return {
+            "score": self.score,
+            "start": dict(zip(("surah", "ayah", "word"), self.start)),
+            "end": dict(zip(("surah", "ayah", "word"), self.end))
+        }
+
+
+class MushafSuffixIndex:
+    def __init__(self, verses: list[tuple[int, int, str]]):
+        """`verses` = (surah, ayat, teks_ternormalisasi) sesuai urutan mushaf."""
+        self.refs = [(surah, ayah) for surah, ayah, _ in verses]
+        self.verse_starts = []       # Offset karakter awal tiap ayat
+        self.verse_first_word = []   # Nomor kata global pertama tiap ayat
+        self.word_starts = []        # Offset karakter awal tiap kata (global)
+        offset = 0
+        for _, _, text in verses:
+            self.verse_starts.append(offset)
+            self.verse_first_word.append(len(self.word_starts))
+            position = offset
+            for word in text.split():
+                self.word_starts.append(position)
+                position += len(word) + 1
+            offset += len(text) + 1
+        self.text = " ".join(text for _, _, text in verses)
+        self.suffix_array = array("i", build_suffix_array(self.text).tobytes())
+
+    # --- Pencarian persis ---
+
+    def _range(self, pattern: str) -> tuple[int, int]:
+        """Rentang [lo, hi) di suffix array berisi semua posisi kemunculan `pattern`."""
+        text, m = self.text, len(pattern)
+        prefix = lambda position: text[position:position + m]
+        lo = bisect.bisect_left(self.suffix_array, pattern, key=prefix)
+        hi = bisect.bisect_right(self.suffix_array, pattern, lo=lo, key=prefix)
+        return lo, hi
+
+    def occurrences(self, pattern: str, limit: int | None = None) -> list[int]:
+        """Posisi karakter semua kemunculan persis `pattern`, urut mushaf."""
+        lo, hi = self._range(pattern)
+        if limit is not None:
+            hi = min(hi, lo + limit)
+        return sorted(self.suffix_array[lo:hi])
+
+    # --- Konversi posisi karakter -> (surah, ayat, kata) ---
+
+    def _locate(self, position: int) -> tuple[int, tuple[int, int, int]]:
+        verse_idx = bisect.bisect_right(self.verse_starts, position) - 1
+        word = bisect.bisect_right(self.word_starts, position) - 1 - self.verse_first_word[verse_idx] + 1
+        surah, ayah = self.refs[verse_idx]
+        return verse_idx, (surah, ayah, word)
+
+    def _span(self, char_start: int, char_end: int, score: int) -> SpanMatch:
+        # Jangan mulai/berakhir di spasi pemisah
+        while char_start < char_end and self.text[char_start] == " ":
+            char_start += 1
+        while char_end > char_start and self.text[char_end - 1] == " ":
+            char_end -= 1
+        start_verse, start = self._locate(char_start)
+        end_verse, end = self._locate(char_end - 1)
+        return SpanMatch(score, start, end, start_verse, end_verse, char_start, char_end)
+
+    # --- Pencarian hampir persis (seed & extend) ---
+
+    def _seeds(self, query: str) -> list[tuple[int, str]]:
+        """
+        (offset di kueri, seed): 2 dan 3 kata berurutan, plus kata tunggal yang panjang.
+        Seed 3 kata tetap spesifik walau kata-katanya umum; seed pendek tetap selamat
+        walau ada kata di dekatnya yang salah ucap.
+        """
+        words = query.split()
+        offsets = []
+        position = 0
+        for word in words:
+            offsets.append(position)
+            position += len(word) + 1
+        seeds = []
+        for i, word in enumerate(words):
+            for size in (2, 3):
+                if i + size <= len(words):
+                    seed = " ".join(words[i:i + size])
+                    if len(seed) >= MIN_SEED_CHARS:
+                        seeds.append((offsets[i], seed))
+            if len(word) >= MIN_SEED_CHARS:
+                seeds.append((offsets[i], word))
+        return seeds
+
+    def _candidate_diagonals(self, query: str) -> list[int]:
+        """
+        Posisi awal bacaan di mushaf yang paling didukung seed
+        (bobot = jumlah huruf kueri yang tertutup seed-seed yang cocok di posisi itu).
+        """
+        seeds = self._seeds(query)
+        hits = []  # (diagonal, nomor seed)
+        for seed_id, (query_offset, seed) in enumerate(seeds):
+            lo, hi = self._range(seed)
+            if hi - lo > MAX_SEED_HITS:
+                continue
+            hits.extend((position - query_offset, seed_id) for position in self.suffix_array[lo:hi])
+        if not hits:
+            return []
+
+        # Kelompokkan diagonal yang berdekatan (ucapan bisa kelebihan/kekurangan beberapa huruf)
+        tolerance = max(3, len(query) // 10)
+        hits.sort()
+        groups = []  # (bobot, diagonal)
+        covered = lambda seed_ids: len(set().union(*(range(seeds[i][0], seeds[i][0] + len(seeds[i][1])) for i in seed_ids)))
+        group_start, group_seeds, group_diagonals = None, set(), []
+        for diagonal, seed_id in hits:
+            if group_start is not None and diagonal - group_start > tolerance:
+                groups.append((covered(group_seeds), group_diagonals[len(group_diagonals) // 2]))
+                group_seeds, group_diagonals = set(), []
+            if not group_diagonals:
+                group_start = diagonal
+            group_seeds.add(seed_id)
+            group_diagonals.append(diagonal)
+        groups.append((covered(group_seeds), group_diagonals[len(group_diagonals) // 2]))
+        groups.sort(key=lambda group: (-group[0], group[1]))
+        return [diagonal for _, diagonal in groups[:MAX_CANDIDATES]]
+
+    def find(self, query: str, min_score: int = 95, max_results: int = 10) -> list[SpanMatch]:
+        """
+        Mencari `query` (teks Arab ternormalisasi) di seluruh mushaf.
+        Skor = partial_ratio (0-100, sama dengan skala pencarian per ayat).
+        Hasil terurut skor tertinggi dulu, lalu urutan mushaf; bacaan yang tumpang tindih digabung.
+        """
+        query = " ".join(query.split())
+        m = len(query)
+        if m < MIN_QUERY_CHARS:
+            return []
+
+        exact = self.occurrences(query, limit=max_results)
+        if exact:
+            return [self._span(position, position + m, 100) for position in exact]
+
+        matches = []
+        slack = m // 4 + 4
+        for diagonal in self._candidate_diagonals(query):
+            window_start = max(0, diagonal - slack)
+            window = self.text[window_start:diagonal + m + slack]
+            alignment = fuzz.partial_ratio_alignment(query, window, score_cutoff=min_score)
+            if alignment is None:
+                continue
+            score = int(round(alignment.score))
+            if score >= min_score:
+                matches.append(self._span(window_start + alignment.dest_start, window_start + alignment.dest_end, score))
+
+        matches.sort(key=lambda match: (-match.score, match.char_start))
+        results = []
+        for match in matches:
+            if all(match.char_end <= kept.char_start or match.char_start >= kept.char_end for kept in results):
+                results.append(match)
+        return results[:max_results]
+
+
+if __name__ == "__main__":
+    # Cek cepat: python mushaf_index.py [quran_search_index.json]
+    # Membangun indeks, lalu mencari potongan yang menyambung antar ayat (persis & dengan salah ucap).
+    source = sys.argv[1] if len(sys.argv) > 1 else "quran_search_index.json"
+    with open(source, "r", encoding="utf-8") as f:
+        data = [v for v in json.load(f) if v.get("text_normalized")]
+
+    start = time.perf_counter()
+    index = MushafSuffixIndex([(v["surah"], v["ayah"], v["text_normalized"]) for v in data])
+    print(f"Indeks {len(index.text)} karakter, {len(data)} ayat dibangun dalam {time.perf_counter() - start:.2f} detik.")
+
+    rng = np.random.default_rng(0)
+    failures = 0
+    timings = []
+    for _ in range(200):
+        i = int(rng.integers(0, len(data) - 1))
+        if data[i]["surah"] != data[i + 1]["surah"]:
+            continue
+        tail = data[i]["text_normalized"].split()[-3:]
+        head = data[i + 1]["text_normalized"].split()[:3]
+        query = " ".join(tail + head)
+        if rng.random() < 0.5 and len(query) > 20:
+            cut = int(rng.integers(1, len(query) - 1))
+            query = query[:cut] + query[cut + 1:]  # Satu huruf hilang (salah dengar)
+        t = time.perf_counter()
+        found = index.find(query)
+        timings.append(time.perf_counter() - t)
+        if not any(m.start_verse <= i and m.end_verse >= i + 1 for m in found):
+            failures += 1
+    print(f"{len(timings)} kueri lintas ayat, {failures} tidak ditemukan, "
+          f"p50 {np.percentile(timings, 50) * 1000:.2f} ms, maks {max(timings) * 1000:.2f} ms")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,108 @@
+import asyncio
+import inspect
+import logging
+import time
+
+logger = logging.getLogger("quran_api.startup")
+
+PENDING = "pending"   # belum mulai dimuat (misal model ML yang dimuat saat pertama dibutuhkan)
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"     # gagal dimuat; endpoint memakai jalur cadangannya masing-masing
+
+
+class Subsystem:
+    def __init__(self, name: str, loader, required: bool):
+        self.name = name
+        self.loader = loader
+        self.required = required
+        self.state = PENDING
+        self.error: str | None = None
+        self.duration: float | None = None
+        self.task: asyncio.Task | None = None
+
+
+class Readiness:
+    """
+    Daftar sumber daya yang dimuat saat startup (data, indeks, model) beserta statusnya.
+    - start(name) menjalankan loader di background (fungsi biasa -> thread, coroutine -> event loop);
+      aman dipanggil berkali-kali, loader hanya jalan sekali
+    - subsistem `required` menentukan /readyz; sisanya (model ML) boleh menyusul
+    - wait(name) dipakai loader yang bergantung pada loader lain
+    """
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self._subsystems: dict[str, Subsystem] = {}
+
+    def register(self, name: str, loader, required: bool = True):
+        """Mendaftarkan (atau mengganti, sebelum dimulai) loader sebuah subsistem."""
+        self._subsystems[name] = Subsystem(name, loader, required)
+
+    def start(self, name: str) -> asyncio.Task:
+        subsystem = self._subsystems[name]
+        if subsystem.task is None:
+            subsystem.state = LOADING
+            subsystem.task = asyncio.get_running_loop().create_task(self._run(subsystem))
+        return subsystem.task
+
+    async def _run(self, subsystem: Subsystem):
+        start = time.perf_counter()
+        try:
+            if inspect.iscoroutinefunction(subsystem.loader):
+                await subsystem.loader()
+            else:
+                await asyncio.to_thread(subsystem.loader)
+        except Exception as e:
+            subsystem.state = FAILED
+            subsystem.error = str(e)
+            logger.error(f"Gagal memuat '{subsystem.name}': {e}")
+        else:
+            subsystem.state = READY
+            logger.info(f"Subsistem '{subsystem.name}' siap.", extra={"duration_ms": round((time.perf_counter() - start) * 1000, 1)})
+        finally:
+            subsystem.duration = time.perf_counter() - start
+
+    def ensure_started(self, *names: str):
+        """Memulai subsistem yang masih PENDING (dipakai untuk pemuatan lazy)."""
+        for name in names:
+            if self._subsystems[name].state == PENDING:
+                self.start(name)
+
+    async def wait(self, *names: str):
+        """Menunggu subsistem selesai (siap atau gagal), memulainya jika belum."""
+        await asyncio.gather(*(asyncio.shield(self.start(name)) for name in names))
+
+    def state(self, name: str) -> str:
+        return self._subsystems[name].state
+
+    def is_ready(self, name: str) -> bool:
+        return self._subsystems[name].state == READY
+
+    def is_settled(self, name: str) -> bool:
+        return self._subsystems[name].state in (READY, FAILED)
+
+    def unsettled(self, *names: str) -> list[str]:
+        """Subsistem (dari `names`, atau semua) yang belum selesai dimuat."""
+        return [name for name in (names or self._subsystems) if not self.is_settled(name)]
+
+    def required_settled(self) -> bool:
+        return all(self.is_settled(s.name) for s in self._subsystems.values() if s.required)
+
+    async def shutdown(self):
+        """Membatalkan loader yang masih jalan (thread-nya dibiarkan selesai sendiri)."""
+        tasks = [s.task for s in self._subsystems.values() if s.task is not None and not s.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def snapshot(self) -> dict:
+        return {
+            name: {
+                "state": s.state,
+                "required": s.required,
+                "duration_ms": round(s.duration * 1000, 1) if s.duration is not None else None,
+                **({"error": s.error} if s.error else {})
+            }
+            for name, s in self._subsystems.items()
+        }
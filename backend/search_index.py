@@ -0,0 +1,301 @@
+import heapq
+import json
+import sys
+import time
+from array import array
+from collections.abc import Sequence
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+
+class ArabicNgramIndex:
+    """
+    Indeks terbalik (inverted index) n-gram karakter untuk teks Arab yang sudah
+    dinormalisasi. Dipakai untuk mempersempit kandidat sebelum dinilai dengan
+    fuzz.partial_ratio, supaya kita tidak perlu menilai 6236 ayat satu per satu.
+
+    Filter ini AMAN (tidak membuang hasil yang benar): ayat yang dibuang dijamin
+    tidak akan mendapat skor partial_ratio >= min_score.
+    """
+
+    def __init__(self, texts: list[str], n: int = 3):
+        self.n = n
+        self.size = len(texts)
+        self.lengths = np.fromiter((len(t) for t in texts), dtype=np.int32, count=self.size)
+
+        postings = {}
+        distinct_counts = np.zeros(self.size, dtype=np.int32)
+        for doc_id, text in enumerate(texts):
+            grams = self._ngrams(text)
+            distinct_counts[doc_id] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(doc_id)
+
+        # Simpan posting list sebagai array int32 (hemat memori & cepat di-bincount)
+        self.postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+        self.distinct_counts = distinct_counts
+
+        # Batas bawah n-gram yang harus sama jika AYAT-nya yang lebih pendek dari kueri
+        # (partial_ratio selalu menggeser string yang lebih pendek di atas yang lebih panjang)
+        self._short_doc_required = self.distinct_counts - n * self._max_indel(self.lengths)
+
+    def _ngrams(self, text: str) -> set[str]:
+        n = self.n
+        return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+    @staticmethod
+    def _max_indel(length, min_score: int = 95):
+        """
+        Jumlah maksimal operasi sisip/hapus agar partial_ratio masih >= min_score.
+        thefuzz membulatkan skor, jadi skor mentah minimal (min_score - 0.5).
+        ratio = 1 - indel / (L + w) dengan w <= L, sehingga indel <= (100 - min_score + 0.5) * 2L / 100.
+        """
+        return ((200 - 2 * min_score + 1) * length) // 100
+
+    def candidates(self, query: str, min_score: int = 95) -> np.ndarray:
+        """
+        Mengembalikan indeks (urut naik) ayat yang MUNGKIN mencapai skor >= min_score.
+        Setiap operasi sisip/hapus paling banyak merusak n buah n-gram, jadi ayat
+        yang berbagi terlalu sedikit n-gram dengan kueri pasti tidak lolos.
+        """
+        query_len = len(query)
+        query_grams = self._ngrams(query)
+
+        # Hitung berapa n-gram kueri yang muncul di tiap ayat (sekali jalan, di numpy)
+        lists = [self.postings[g] for g in query_grams if g in self.postings]
+        if lists:
+            shared = np.bincount(np.concatenate(lists), minlength=self.size)
+        else:
+            shared = np.zeros(self.size, dtype=np.int64)
+
+        query_required = len(query_grams) - self.n * self._max_indel(query_len, min_score)
+        if min_score == 95:
+            doc_required = self._short_doc_required
+        else:
+            doc_required = self.distinct_counts - self.n * self._max_indel(self.lengths, min_score)
+
+        mask = np.where(
+            self.lengths >= query_len,
+            shared >= query_required,  # Kueri yang digeser di atas ayat
+            shared >= doc_required     # Ayat (lebih pendek) yang digeser di atas kueri
+        )
+        return np.flatnonzero(mask)
+
+
+class BatchFuzzyScorer:
+    """
+    Menilai fuzz.partial_ratio SATU kueri terhadap BANYAK ayat dalam satu panggilan native
+    (rapidfuzz.process.cdist), dibagi ke semua core, dengan score_cutoff supaya ayat yang
+    jelas tidak lolos berhenti dinilai lebih awal.
+
+    Hasilnya sama persis dengan loop lama `thefuzz.fuzz.partial_ratio(kueri, ayat) >= min_score`:
+    thefuzz mengembalikan int(round(skor)) -- round ala Python, 94.5 -> 94 -- jadi cutoff mentahnya
+    min_score - 0.5 dan skor dicek ulang setelah dibulatkan dengan cara yang sama (np.rint).
+
+    `texts` boleh berupa sequence lazy (corpus_store.FieldView): teks kandidat baru
+    di-decode per chunk, jadi korpus tidak disalin ke heap tiap worker.
+    """
+
+    def __init__(self, texts: Sequence[str], chunk_size: int = 1024, min_parallel: int = 64):
+        self.texts = texts
+        self.lengths = np.fromiter((len(t) for t in texts), dtype=np.int32, count=len(texts))
+        # Huruf muqatta'at (الم, حم, يس, ...): teks pendek tanpa spasi
+        self.muqattaat = np.fromiter((len(t) < 10 and " " not in t for t in texts), dtype=bool, count=len(texts))
+        self.chunk_size = chunk_size      # Dinilai per chunk supaya pemanggil bisa berhenti lebih awal
+        self.min_parallel = min_parallel  # Di bawah ini, biaya membagi kerja ke thread lebih mahal
+
+    def prune(self, query: str, doc_ids: np.ndarray, skip_muqattaat: bool = False) -> np.ndarray:
+        """Membuang (tanpa menilai) ayat yang skornya pasti tidak dipakai, berdasarkan panjang teks."""
+        lengths = self.lengths[doc_ids]
+        keep = lengths > 0  # Teks kosong selalu skor 0
+        if skip_muqattaat:
+            # Filter muqatta'at (الم cocok di dalam الملك): skornya dibuang jika ucapan > 2x panjang ayat
+            keep &= ~(self.muqattaat[doc_ids] & (len(query) > 2 * lengths))
+        return doc_ids[keep]
+
+    def iter_matches(self, query: str, doc_ids, min_score: int, skip_muqattaat: bool = False):
+        """
+        Yield (doc_id, skor) untuk ayat dengan skor >= min_score, dalam urutan `doc_ids`.
+        skip_muqattaat=True menerapkan filter muqatta'at pencarian suara.
+        """
+        if not query:
+            return
+        doc_ids = self.prune(query, np.asarray(doc_ids, dtype=np.int64), skip_muqattaat)
+        take = getattr(self.texts, "take", None)  # FieldView: decode sekaligus per chunk
+        for start in range(0, len(doc_ids), self.chunk_size):
+            chunk = doc_ids[start:start + self.chunk_size]
+            chunk_texts = take(chunk.tolist()) if take else [self.texts[doc_id] for doc_id in chunk]
+            raw_scores = process.cdist(
+                [query], chunk_texts,
+                scorer=fuzz.partial_ratio,
+                score_cutoff=min_score - 0.5,
+                dtype=np.float64,
+                workers=-1 if len(chunk) >= self.min_parallel else 1
+            )[0]
+            scores = np.rint(raw_scores)  # Pembulatan sama dengan round() Python (ke genap terdekat)
+            passed = scores >= min_score
+            yield from zip(chunk[passed].tolist(), scores[passed].astype(int).tolist())
+
+
+class PhraseIndex:
+    """
+    Indeks kata posisional untuk teks Indonesia (terjemahan / tafsir).
+    Korpus di-lowercase SEKALI saat startup, lalu pencarian "kueri in teks"
+    dijawab lewat posting list tanpa men-scan (dan me-lowercase) semua ayat.
+
+    Hasilnya SAMA PERSIS dengan `query in text.lower()`:
+    - kata pertama kueri boleh berupa AKHIRAN sebuah kata di teks
+    - kata terakhir kueri boleh berupa AWALAN sebuah kata di teks
+    - kata di tengah harus sama persis
+    - kueri satu kata boleh muncul di bagian mana pun dari sebuah kata
+    Kandidat dari indeks selalu diverifikasi ulang dengan operator `in`.
+
+    Dengan `lowered=True`, `texts` dianggap sudah lowercase dan dipakai langsung untuk
+    verifikasi (misal view mmap corpus_store.FieldView, dipakai bersama antar worker).
+    """
+
+    # Posting = (id_dokumen << 32) | posisi_kata, disimpan di array 64-bit
+    _DOC_SHIFT = 32
+
+    def __init__(self, texts: Sequence[str], lowered: bool = False):
+        self.lowered = texts if lowered else [t.lower() for t in texts]
+
+        postings = {}
+        for doc_id, text in enumerate(self.lowered):
+            base = doc_id << self._DOC_SHIFT
+            for pos, word in enumerate(text.split()):
+                posting = postings.get(word)
+                if posting is None:
+                    posting = postings[word] = array('Q')
+                posting.append(base | pos)
+        self.postings = postings
+        self.vocabulary = list(postings)
+
+    def _positions(self, words) -> set[int]:
+        result = set()
+        for word in words:
+            result.update(self.postings[word])
+        return result
+
+    def search(self, query_lower: str) -> set[int]:
+        """Mengembalikan id dokumen yang mengandung `query_lower` (sudah lowercase)."""
+        tokens = query_lower.split()
+        if not tokens:
+            # Kueri kosong/hanya spasi: jarang terjadi, pakai cara lama saja
+            return {i for i, text in enumerate(self.lowered) if query_lower in text}
+
+        if len(tokens) == 1:
+            token = tokens[0]
+            positions = self._positions(w for w in self.vocabulary if token in w)
+        else:
+            first, last = tokens[0], tokens[-1]
+            positions = self._positions(w for w in self.vocabulary if w.endswith(first))
+            for i, token in enumerate(tokens[1:], start=1):
+                if not positions:
+                    break
+                if i == len(tokens) - 1:
+                    next_words = [w for w in self.vocabulary if w.startswith(last)]
+                else:
+                    next_words = [token] if token in self.postings else []
+                # Geser posisi satu kata ke kanan, lalu irisan dengan posisi kata berikutnya
+                positions = {p + 1 for p in positions} & self._positions(next_words)
+
+        doc_ids = {p >> self._DOC_SHIFT for p in positions}
+        # Verifikasi akhir (misal: spasi ganda di kueri) -> hasil identik dengan `in`
+        return {d for d in doc_ids if query_lower in self.lowered[d]}
+
+
+class TopKMatches:
+    """
+    Menyimpan k hasil terbaik selama scan dengan heap berukuran tetap.
+    Urutan hasil = skor tertinggi dulu, lalu urutan mushaf (sama dengan sort stabil lama).
+    """
+
+    def __init__(self, k: int, max_score: int = 100):
+        self.k = k
+        self.max_score = max_score
+        self.count = 0          # Jumlah semua hasil yang lolos (bukan hanya k terbaik)
+        self.max_score_count = 0
+        self._heap = []         # (skor, -posisi_ayat, payload), elemen terkecil di puncak
+
+    def push(self, score: int, verse_idx: int, payload):
+        self.count += 1
+        if score >= self.max_score:
+            self.max_score_count += 1
+        item = (score, -verse_idx, payload)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, item)
+        elif item[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, item)
+
+    @property
+    def is_settled(self) -> bool:
+        """
+        True jika k hasil dengan skor maksimal sudah ditemukan. Karena scan berjalan
+        sesuai urutan mushaf, ayat berikutnya tidak mungkin masuk k besar -> scan boleh berhenti.
+        """
+        return self.max_score_count >= self.k
+
+    def ranked(self) -> list[tuple[int, int, object]]:
+        """Mengembalikan (skor, posisi_ayat, payload) terurut dari yang terbaik."""
+        return [(score, -neg_idx, payload) for score, neg_idx, payload in sorted(self._heap, reverse=True)]
+
+
+if __name__ == "__main__":
+    # Uji paritas BatchFuzzyScorer vs loop lama thefuzz (harus identik):
+    #   python search_index.py [quran_search_index.json] [jumlah_kueri]
+    from thefuzz import fuzz as thefuzz_fuzz
+
+    source = sys.argv[1] if len(sys.argv) > 1 else "quran_search_index.json"
+    query_count = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    with open(source, "r", encoding="utf-8") as f:
+        texts = [verse["text_normalized"] for verse in json.load(f)]
+    scorer = BatchFuzzyScorer(texts)
+    ngram_index = ArabicNgramIndex(texts)
+    rng = np.random.default_rng(0)
+    letters = sorted({ch for text in texts for ch in text if ch != " "})
+
+    def make_query() -> str:
+        """Potongan ayat (kadang menyambung ke ayat berikutnya) dengan 0-4 huruf diubah/dihapus/disisipkan."""
+        i = int(rng.integers(0, len(texts)))
+        text = texts[i] if rng.random() < 0.8 else f"{texts[i]} {texts[(i + 1) % len(texts)]}"
+        if not text:
+            return ""
+        start = int(rng.integers(0, max(1, len(text) - 4)))
+        query = text[start:start + int(rng.integers(3, 80))]
+        for _ in range(int(rng.integers(0, 5))):
+            pos = int(rng.integers(0, len(query) + 1))
+            op = rng.integers(0, 3)
+            letter = str(rng.choice(letters))
+            query = query[:pos] + letter + query[pos + 1:] if op == 0 else query[:pos] + query[pos + 1:] if op == 1 else query[:pos] + letter + query[pos:]
+        return " ".join(query.split())
+
+    def old_matches(query: str, doc_ids, min_score: int, skip_muqattaat: bool) -> list[tuple[int, int]]:
+        matches = []
+        for doc_id in doc_ids:
+            score = thefuzz_fuzz.partial_ratio(query, texts[doc_id])
+            if skip_muqattaat and len(texts[doc_id]) < 10 and " " not in texts[doc_id] and len(query) > len(texts[doc_id]) * 2:
+                score = 0
+            if score >= min_score:
+                matches.append((doc_id, score))
+        return matches
+
+    queries = ["الم", "حم", "الملك", "طسم تلك"] + [make_query() for _ in range(query_count)]
+    mismatches = 0
+    old_time = new_time = 0.0
+    for n, query in enumerate(queries):
+        # Sebagian kueri dinilai terhadap SEMUA ayat (tanpa filter trigram) supaya batas skor ikut teruji
+        doc_ids = range(len(texts)) if n % 10 == 0 else ngram_index.candidates(query, 95).tolist()
+        for skip_muqattaat in (False, True):
+            t = time.perf_counter()
+            expected = old_matches(query, doc_ids, 95, skip_muqattaat)
+            old_time += time.perf_counter() - t
+            t = time.perf_counter()
+            found = list(scorer.iter_matches(query, doc_ids, 95, skip_muqattaat))
+            new_time += time.perf_counter() - t
+            if found != expected:
+                mismatches += 1
+                print(f"BEDA: {query!r} muqattaat={skip_muqattaat}: lama {expected[:5]} baru {found[:5]}")
+    print(f"{len(queries)} kueri x 2 mode, {mismatches} beda. thefuzz {old_time:.2f} detik, batch {new_time:.2f} detik.")
+    sys.exit(1 if mismatches else 0)
@@ -0,0 +1,74 @@
+import asyncio
+
+import httpx
+from cachetools import TTLCache
+
+from metrics import stage_timer
+
+
+class UpstreamClient:
+    """
+    Klien HTTP async untuk API Qur'an eksternal.
+    - Satu connection pool keep-alive yang dipakai bersama (tidak buka TLS baru tiap request)
+    - Timeout per request
+    - Cache LRU + TTL di memori, dengan key = path URL
+    - Request identik yang datang bersamaan saat cache kosong digabung jadi satu fetch
+    """
+
+    def __init__(self, base_url: str, timeout: float = 10.0, connect_timeout: float = 5.0,
+                 max_connections: int = 20, cache_size: int = 2048, cache_ttl: float = 3600):
+        self.base_url = base_url
+        self._timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self._limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self._client: httpx.AsyncClient | None = None
+        self._cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self._inflight: dict[str, asyncio.Task] = {}
+
+    async def start(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(base_url=self.base_url, timeout=self._timeout, limits=self._limits)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def get_json(self, path: str) -> dict:
+        """
+        Mengambil JSON dari `path` (misal "/surah/2/255").
+        Melempar httpx.HTTPError jika request gagal atau status bukan 2xx.
+        Data yang dikembalikan dipakai bersama lewat cache, JANGAN diubah.
+        """
+        cached = self._cache.get(path)
+        if cached is not None:
+            return cached
+
+        # Fetch jalan di task sendiri; semua pemanggil menunggu lewat shield. Jadi pemanggil
+        # yang dibatalkan (misal klien putus) tidak ikut membatalkan pemanggil lain.
+        task = self._inflight.get(path)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._fetch(path))
+            self._inflight[path] = task
+            task.add_done_callback(lambda done: self._fetch_done(path, done))
+        return await asyncio.shield(task)
+
+    async def _fetch(self, path: str) -> dict:
+        if self._client is None:
+            await self.start()
+        # Hanya fetch sungguhan (bukan cache hit) yang tercatat sebagai tahap "upstream"
+        with stage_timer("upstream"):
+            response = await self._client.get(path)
+        response.raise_for_status()
+        try:
+            data = response.json()
+        except ValueError as e:
+            # Body bukan JSON: tetap httpx.HTTPError, supaya pemanggil menanganinya seperti error upstream lain
+            raise httpx.DecodingError(f"Respons {path} bukan JSON: {e}", request=response.request) from e
+        self._cache[path] = data
+        return data
+
+    def _fetch_done(self, path: str, task: asyncio.Task):
+        if self._inflight.get(path) is task:
+            del self._inflight[path]
+        if not task.cancelled():
+            task.exception()  # Tandai sudah dibaca, supaya tidak ada warning jika semua pemanggil batal
@@ -0,0 +1,23 @@
+// Cek paritas normalizeArabicJS dengan backend/arabic_text.py
+// memakai vektor uji yang sama: node scripts/check-arabic-text.mjs
+import { readFileSync } from 'node:fs';
+import { fileURLToPath } from 'node:url';
+import { normalizeArabicJS } from '../src/utils/arabicText.js';
+
+const vectorsPath = fileURLToPath(new URL('../../backend/arabic_text_vectors.json', import.meta.url));
+const { vectors } = JSON.parse(readFileSync(vectorsPath, 'utf-8'));
+
+let failures = 0;
+for (const vector of vectors) {
+  const result = normalizeArabicJS(vector.input);
+  if (result !== vector.expected) {
+    failures += 1;
+    console.log(`GAGAL [${vector.name}]: ${JSON.stringify(result)} !== ${JSON.stringify(vector.expected)}`);
+  }
+}
+
+if (failures) {
+  console.log(`${failures} kegagalan.`);
+  process.exit(1);
+}
+console.log(`OK: ${vectors.length} vektor uji cocok dengan backend.`);
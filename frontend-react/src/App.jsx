@@ -21,6 +21,9 @@ if (recognition) {
   recognition.interimResults = false;
 }
 
+// Jumlah hasil per halaman untuk pencarian yang menghasilkan banyak ayat
+const SEARCH_PAGE_SIZE = 20;
+
 
 
 // =====================================================================
@@ -41,14 +44,21 @@ function App() {
   const [initialTargetAyah, setInitialTargetAyah] = useState(null);
   const [allSurahs, setAllSurahs] = useState([]);
   const [isSurahListLoading, setIsSurahListLoading] = useState(true); 
+  // === STATE PAGINATION HASIL GANDA ===
+  const [lastSearch, setLastSearch] = useState(null); // { type: 'text' | 'voice', query }
+  const [nextCursor, setNextCursor] = useState(null);
+  const [totalResults, setTotalResults] = useState(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
 
   // === FETCH DAFTAR 114 SURAT SAAT STARTUP ===
   useEffect(() => {
     const fetchAllSurahs = async () => {
       try {
         setIsSurahListLoading(true);
-        // memanggil endpoint yang memberikan list semua surat
-        const response = await fetch('https://quran-api-id.vercel.app/surah');
+        // Daftar surat dari snapshot di backend (ETag + Cache-Control, jadi
+        // kunjungan berikutnya cukup dijawab 304 / langsung dari cache browser)
+        const response = await fetch('http://127.0.0.1:8000/surahs');
+        if (!response.ok) throw new Error(`Status ${response.status}`);
         const data = await response.json();
         
         setAllSurahs(data.data); 
@@ -82,13 +92,55 @@ function App() {
     );
   }
 
+  // Request ke backend untuk satu halaman hasil (cursor = null -> halaman pertama)
+  const fetchSearchPage = (search, cursor = null) => {
+    const cursorParam = cursor ? `cursor=${encodeURIComponent(cursor)}` : '';
+    if (search.type === 'voice') {
+      return fetch(`http://127.0.0.1:8000/search-by-text?limit=${SEARCH_PAGE_SIZE}&${cursorParam}`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ text: search.query })
+      });
+    }
+    return fetch(`http://127.0.0.1:8000/search?q=${encodeURIComponent(search.query)}&limit=${SEARCH_PAGE_SIZE}&${cursorParam}`);
+  };
+
+  // Simpan info halaman berikutnya dari respons "multiple"
+  const applyPagination = (apiResponse) => {
+    setNextCursor(apiResponse.has_more ? apiResponse.next_cursor : null);
+    setTotalResults(apiResponse.total ?? null);
+  };
+
+  // Tombol "Muat lebih banyak": ambil halaman berikutnya lalu tambahkan ke daftar
+  const handleLoadMore = async () => {
+    if (!lastSearch || !nextCursor || isLoadingMore) return;
+    setIsLoadingMore(true);
+    try {
+      const response = await fetchSearchPage(lastSearch, nextCursor);
+      if (!response.ok) {
+        const errorData = await response.json();
+        throw new Error(errorData.detail || 'Gagal memuat hasil berikutnya.');
+      }
+      const apiResponse = await response.json();
+      setMultipleResults(prev => [...prev, ...apiResponse.results]);
+      applyPagination(apiResponse);
+    } catch (err) {
+      setError(err.message);
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
   const handleSearch = async () => {
     setIsLoading(true);
     setError(null);
     setSearchResult(null);
     setMultipleResults([]);
+    setNextCursor(null);
     try {
-      const response = await fetch(`http://127.0.0.1:8000/search?q=${encodeURIComponent(searchInput)}`);
+      const search = { type: 'text', query: searchInput };
+      setLastSearch(search);
+      const response = await fetchSearchPage(search);
       if (!response.ok) {
         const errorData = await response.json();
         throw new Error(errorData.detail || 'Pencarian gagal.');
@@ -99,6 +151,7 @@ function App() {
       // Kasus A: Hasil Banyak (Vector Search / Pencarian Teks)
       if (apiResponse.match_type === "multiple") {
         setMultipleResults(apiResponse.results);
+        applyPagination(apiResponse);
         setSearchResult(null);
       } 
       
@@ -138,12 +191,11 @@ function App() {
     setError(null);
     setSearchResult(null);
     setMultipleResults([]);
+    setNextCursor(null);
     try {
-      const response = await fetch('http://127.0.0.1:8000/search-by-text', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ text: text })
-      });
+      const search = { type: 'voice', query: text };
+      setLastSearch(search);
+      const response = await fetchSearchPage(search);
       if (!response.ok) {
         const errorData = await response.json();
         throw new Error(errorData.detail || 'Ayat tidak ditemukan!');
@@ -151,6 +203,7 @@ function App() {
       const apiResponse = await response.json();
       if (apiResponse.match_type === "multiple") {
         setMultipleResults(apiResponse.results);
+        applyPagination(apiResponse);
         setSearchResult(null);
       } else {
         const data = apiResponse.data; // Data ayat lengkap
@@ -256,6 +309,10 @@ function App() {
             multipleResults={multipleResults}
             spokenQuery={spokenQuery}
             handleMultipleResultClick={handleMultipleResultClick}
+            hasMore={Boolean(nextCursor)}
+            totalResults={totalResults}
+            onLoadMore={handleLoadMore}
+            isLoadingMore={isLoadingMore}
           />
 
         ) : (
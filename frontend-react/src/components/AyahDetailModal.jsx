@@ -1,13 +1,47 @@
-import React from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import AyahCard from './AyahCard';
 
-function AyahDetailModal({ data, onClose }) {
+const RELATED_LIMIT = 5;
+
+function AyahDetailModal({ data, onClose, onSelectRelated }) {
+  const [related, setRelated] = useState([]);
+  const [isLoadingRelated, setIsLoadingRelated] = useState(false);
+  const contentRef = useRef(null);
+
+  const surahNumber = data?.surah?.number;
+  const ayahNumber = data?.number?.inSurah;
+
+  // Ayat terkait sudah dihitung di backend (build_vector_db.py), cukup satu request ringan per ayat
+  useEffect(() => {
+    if (!surahNumber || !ayahNumber) return;
+    let cancelled = false;
+    contentRef.current?.scrollTo(0, 0); // Ganti ayat (klik ayat terkait) -> mulai dari atas lagi
+
+    const fetchRelated = async () => {
+      setIsLoadingRelated(true);
+      try {
+        const response = await fetch(`http://127.0.0.1:8000/surah/${surahNumber}/${ayahNumber}/related?limit=${RELATED_LIMIT}`);
+        if (!response.ok) throw new Error(`Status ${response.status}`);
+        const apiResponse = await response.json();
+        if (!cancelled) setRelated(apiResponse.data.related);
+      } catch (error) {
+        console.error("Gagal mengambil ayat terkait:", error);
+        if (!cancelled) setRelated([]);
+      } finally {
+        if (!cancelled) setIsLoadingRelated(false);
+      }
+    };
+
+    fetchRelated();
+    return () => { cancelled = true; };
+  }, [surahNumber, ayahNumber]);
+
   if (!data) return null;
 
   return (
     <div className="fixed inset-0 z-[100] flex items-center justify-center p-4 bg-black/50 backdrop-blur-sm" onClick={onClose}>
       {/* Modal Content */}
-      <div className="bg-white rounded-xl shadow-2xl w-full max-w-2xl max-h-[90vh] overflow-y-auto" onClick={(e) => e.stopPropagation()}>
+      <div ref={contentRef} className="bg-white rounded-xl shadow-2xl w-full max-w-2xl max-h-[90vh] overflow-y-auto" onClick={(e) => e.stopPropagation()}>
         
         {/* Header */}
         <div className="bg-green-50 px-6 py-4 border-b border-green-100 flex justify-between items-center sticky top-0 z-10">
@@ -45,6 +79,40 @@ function AyahDetailModal({ data, onClose }) {
           </p>
         </div>
 
+        {/* Ayat Terkait (makna paling mirip) */}
+        {(isLoadingRelated || related.length > 0) && (
+          <div className="px-6 pb-6">
+            <h3 className="text-sm font-bold text-gray-500 uppercase mb-3 tracking-wider border-b pb-2">
+              Ayat Terkait
+            </h3>
+            {isLoadingRelated ? (
+              <p className="text-sm text-gray-400 animate-pulse">Memuat ayat terkait...</p>
+            ) : (
+              <div className="grid gap-2">
+                {related.map((item) => (
+                  <div
+                    key={`${item.surah}:${item.ayah}`}
+                    onClick={() => onSelectRelated?.(item.surah, item.ayah)}
+                    className={`p-3 rounded-lg border border-gray-200 ${onSelectRelated ? 'cursor-pointer hover:border-green-500 hover:shadow-sm transition-all duration-200' : ''}`}
+                  >
+                    <div className="flex justify-between items-center mb-1">
+                      <span className="bg-green-100 text-green-800 text-xs font-bold px-2 py-1 rounded-md">
+                        QS. {item.surah_name} {item.surah}:{item.ayah}
+                      </span>
+                      <span className="text-xs text-gray-400 font-mono">
+                        Kemiripan: {Math.round(item.score * 100)}%
+                      </span>
+                    </div>
+                    {item.translation && (
+                      <p className="text-sm text-gray-700 line-clamp-2">{item.translation}</p>
+                    )}
+                  </div>
+                ))}
+              </div>
+            )}
+          </div>
+        )}
+
       </div>
     </div>
   );
@@ -43,43 +43,77 @@ function Chatbot({ onClose }) {
     setInput('');
     setIsLoading(true);
 
-      try {
-          const response = await fetch('http://127.0.0.1:8000/chatbot', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ text: userMessage.content })
-          });
-          
-          const botResponseData = await response.json();
+    // Pesan bot yang sedang di-stream (dibuat saat token pertama datang)
+    const botMessageId = Date.now() + 1;
+    let streamedText = '';
+    const addBotMessage = (content) => {
+      setMessages(prev => [...prev, { id: botMessageId, sender: 'bot', content }]);
+    };
+
+    try {
+      const response = await fetch('http://127.0.0.1:8000/chatbot/stream', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ text: userMessage.content })
+      });
+
+      if (!response.ok) {
+        // Error sebelum stream dimulai (misal ayat di luar jangkauan)
+        const errorData = await response.json();
+        addBotMessage(errorData.detail || "Terjadi kesalahan.");
+        return;
+      }
 
-          let botMessage;
-          if (!response.ok) {
-            // Jika error
-            botMessage = {
-              id: Date.now() + 1,
-              sender: 'bot',
-              content: botResponseData.detail || "Terjadi kesalahan."
-            };
+      // === BACA STREAM SSE (event: delta / result / error / done) ===
+      const handleEvent = (event, data) => {
+        if (event === 'delta') {
+          if (!streamedText) {
+            // Token pertama: ganti indikator "Mengetik..." dengan balasan yang tumbuh
+            setIsLoading(false);
+            addBotMessage(data.content);
+          } else {
+            const content = streamedText + data.content;
+            setMessages(prev => prev.map(msg => msg.id === botMessageId ? { ...msg, content } : msg));
+          }
+          streamedText += data.content;
+        } else if (event === 'result') {
+          // Jawaban utuh non-LLM: teks biasa ATAU objek ayat (Logika lama)
+          addBotMessage(data.answer_type === "text" ? data.content : <BotAyahResponse data={data.data} />);
+        } else if (event === 'error') {
+          const detail = data.detail || "Terjadi kesalahan.";
+          if (streamedText) {
+            // Stream terputus di tengah jalan: tempelkan pesan error di balasan yang sudah ada
+            const content = `${streamedText}\n\n${detail}`;
+            setMessages(prev => prev.map(msg => msg.id === botMessageId ? { ...msg, content } : msg));
           } else {
-            // === LOGIKA BARU UNTUK 2 TIPE JAWABAN ===
-            if (botResponseData.answer_type === "text") {
-              // KASUS 2: Jawaban teks dari RAG
-              botMessage = {
-                id: Date.now() + 1,
-                sender: 'bot',
-                content: botResponseData.content // Ini adalah string teks biasa
-              };
-            } else {
-              // KASUS 1: Jawaban objek ayat (Logika lama)
-              botMessage = {
-                id: Date.now() + 1,
-                sender: 'bot',
-                content: <BotAyahResponse data={botResponseData.data} />
-              };
-            }
-            // =======================================
+            addBotMessage(detail);
+          }
+        }
+      };
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // Setiap event SSE dipisahkan oleh baris kosong
+        let separatorIndex;
+        while ((separatorIndex = buffer.indexOf('\n\n')) !== -1) {
+          const rawEvent = buffer.slice(0, separatorIndex);
+          buffer = buffer.slice(separatorIndex + 2);
+
+          let event = 'message';
+          let data = '';
+          for (const line of rawEvent.split('\n')) {
+            if (line.startsWith('event:')) event = line.slice(6).trim();
+            else if (line.startsWith('data:')) data += line.slice(5).trim();
           }
-          setMessages(prev => [...prev, botMessage]);
+          if (data) handleEvent(event, JSON.parse(data));
+        }
+      }
     } catch (err) {
       const errorMessage = {
         id: Date.now() + 1,
@@ -1,24 +1,7 @@
 import React from 'react';
 
-// Fungsi normalisasi (tetap sama)
-const normalizeArabicJS = (text) => {
-  if (!text) return "";
-  return text
-    // 1. Hapus Harakat etc.
-    .replace(/[\u064B-\u065F\u0610-\u061A\u0670\u0671\u0653]/g, '')
-    // 2. Hapus Tatweel
-    .replace(/\u0640/g, '')
-    // 3. Normalisasi Alif
-    .replace(/[\u0622\u0623\u0625]/g, '\u0627')
-    // 4. Normalisasi Ya
-    .replace(/\u0649/g, '\u064A')
-    // 5. Normalisasi Ta Marbuta
-    .replace(/\u0629/g, '\u0647')
-    // 6. Hapus sisa non-huruf/spasi
-    .replace(/[^\u0621-\u064A\s]/g, '')
-    // 7. Trim spasi
-    .replace(/\s+/g, ' ').trim();
-};
+// Normalisasi yang sama dengan backend (lihat utils/arabicText.js)
+import { normalizeArabicJS } from '../utils/arabicText';
 
 
 function Highlight({ text, query }) {
@@ -8,7 +8,11 @@ function ResultsArea({
   searchResult,
   multipleResults,
   spokenQuery,
-  handleMultipleResultClick
+  handleMultipleResultClick,
+  hasMore = false,
+  totalResults = null,
+  onLoadMore,
+  isLoadingMore = false
 }) {
   
   // --- LOADING STATE ---
@@ -41,7 +45,11 @@ function ResultsArea({
       {multipleResults.length > 0 && (
         <div className="space-y-4">
           <h3 className="text-lg font-semibold text-gray-700 px-2">
-            Ditemukan {multipleResults.length} ayat yang relevan:
+            {totalResults !== null
+              ? `Ditemukan ${totalResults} ayat yang relevan (menampilkan ${multipleResults.length}):`
+              : hasMore
+                ? `Menampilkan ${multipleResults.length} ayat paling relevan:`
+                : `Ditemukan ${multipleResults.length} ayat yang relevan:`}
           </h3>
           
           <div className="grid gap-3">
@@ -77,6 +85,19 @@ function ResultsArea({
               </div>
             ))}
           </div>
+
+          {/* Halaman berikutnya diambil hanya saat diminta */}
+          {hasMore && (
+            <div className="flex justify-center pt-2">
+              <button
+                onClick={onLoadMore}
+                disabled={isLoadingMore}
+                className="px-5 py-2 text-sm font-medium text-green-700 bg-white border border-green-500 rounded-lg hover:bg-green-50 disabled:opacity-50 transition-colors"
+              >
+                {isLoadingMore ? 'Memuat...' : 'Muat lebih banyak'}
+              </button>
+            </div>
+          )}
         </div>
       )}
     </div>
@@ -28,12 +28,13 @@ function SurahDetail({ surahNumber, initialTargetAyah, onBack }) {
 
   const ayahRefs = useRef({});
 
-  // Fetch Data (Tidak Berubah)
+  // Fetch Data: satu request ke backend lokal untuk satu surah lengkap (termasuk tafsir)
   useEffect(() => {
     const fetchSurah = async () => {
       setIsLoading(true);
       try {
-        const response = await fetch(`https://quran-api-id.vercel.app/surah/${surahNumber}`);
+        const response = await fetch(`http://127.0.0.1:8000/surah/${surahNumber}`);
+        if (!response.ok) throw new Error(`Status ${response.status}`);
         const apiResponse = await response.json();
         setSurahData(apiResponse.data);
       } catch (error) {
@@ -117,10 +118,20 @@ function SurahDetail({ surahNumber, initialTargetAyah, onBack }) {
 
   // === Fungsi Membuka Modal Detail ===
   const openAyahDetail = async (ayahNum) => {
-    // Kita panggil backend kita sendiri untuk dapat Tafsir Lengkap
-    // (Karena API 'quran-api-id' di list surah mungkin tafsirnya pendek/tidak lengkap)
+    // Data surah dari backend sudah berisi tafsir lengkap -> pakai ulang, tanpa request lagi
+    const loadedVerse = surahData?.verses?.find((verse) => verse.number.inSurah === ayahNum);
+    if (loadedVerse?.tafsir?.id?.long) {
+      setModalData({ ...loadedVerse, surah: surahData }); // Modal hanya butuh info nama surah
+      return;
+    }
+
+    // Cadangan: ambil detail satu ayat dari backend
+    await fetchAyahDetail(surahNumber, ayahNum);
+  };
+
+  const fetchAyahDetail = async (targetSurah, ayahNum) => {
     try {
-      const response = await fetch(`http://127.0.0.1:8000/surah/${surahNumber}/${ayahNum}`);
+      const response = await fetch(`http://127.0.0.1:8000/surah/${targetSurah}/${ayahNum}`);
       if (!response.ok) throw new Error("Gagal ambil detail");
       const apiResponse = await response.json();
       setModalData(apiResponse.data); // Isi data modal
@@ -129,6 +140,15 @@ function SurahDetail({ surahNumber, initialTargetAyah, onBack }) {
     }
   };
 
+  // === Klik "Ayat Terkait" di modal: ayat di surat ini pakai data yang sudah ada, surat lain diambil dulu ===
+  const openRelatedAyah = (relatedSurah, relatedAyah) => {
+    if (Number(relatedSurah) === Number(surahNumber)) {
+      openAyahDetail(relatedAyah);
+    } else {
+      fetchAyahDetail(relatedSurah, relatedAyah);
+    }
+  };
+
   if (isLoading) {
     return (
       <div className="flex justify-center items-center min-h-screen text-green-600">
@@ -142,7 +162,7 @@ function SurahDetail({ surahNumber, initialTargetAyah, onBack }) {
   return (
     <div className="bg-white min-h-screen pb-20">
       {modalData && (
-        <AyahDetailModal data={modalData} onClose={() => setModalData(null)} />
+        <AyahDetailModal data={modalData} onClose={() => setModalData(null)} onSelectRelated={openRelatedAyah} />
       )}
       {/* --- Header Sticky --- */}
       <div className="sticky top-0 z-40 bg-white border-b border-gray-200 shadow-sm px-4 py-3">
@@ -0,0 +1,32 @@
+// Normalisasi teks Arab, sinkron dengan backend/arabic_text.py (normalize_arabic).
+// Paritasnya dicek dengan: node scripts/check-arabic-text.mjs
+
+// Spasi versi Python (str.isspace), BUKAN \s milik JS:
+// Python menganggap \x1c-\x1f dan \x85 spasi, tapi tidak menganggap ﻿ spasi.
+const PY_SPACE = '\\t\\n\\v\\f\\r\\x1c-\\x20\\x85\\xa0\\u1680\\u2000-\\u200a\\u2028\\u2029\\u202f\\u205f\\u3000';
+
+// Huruf yang disamakan: أ إ آ -> ا, ى -> ي, ة -> ه
+const LETTER_MAP = {
+  'آ': 'ا',
+  'أ': 'ا',
+  'إ': 'ا',
+  'ى': 'ي',
+  'ة': 'ه'
+};
+
+// Regex dibuat sekali saja, bukan setiap pemanggilan
+const LETTER_RE = /[آأإىة]/g;
+// Semua selain huruf Arab U+0621..U+064A (kecuali tatweel U+0640) dan spasi dihapus.
+// Harakat, alif wasl, madda, dll. ada di luar rentang itu, jadi ikut terhapus di sini.
+const NON_LETTER_RE = new RegExp(`[^\\u0621-\\u063F\\u0641-\\u064A${PY_SPACE}]`, 'gu');
+const SPACE_RUN_RE = new RegExp(`[${PY_SPACE}]+`, 'g');
+const EDGE_SPACE_RE = /^ | $/g;
+
+export const normalizeArabicJS = (text) => {
+  if (!text) return "";
+  return text
+    .replace(LETTER_RE, (ch) => LETTER_MAP[ch])
+    .replace(NON_LETTER_RE, '')
+    .replace(SPACE_RUN_RE, ' ')
+    .replace(EDGE_SPACE_RE, '');
+};